@@ -0,0 +1,83 @@
+import struct
+import tempfile
+import itertools
+import threading
+from array import array
+from collections import deque
+from typing import List
+
+# Each line spilled to disk is stored as its length followed by its UTF-8 bytes, so lines may hold any text
+LENGTH = struct.Struct("<I")
+
+
+class ActivityLog:
+    def __init__(self, capacity: int = 1000, index_interval: int = 64):
+        """
+        The File Watcher's activity log, with a fixed memory budget for long sessions. The most recent lines are
+        kept in a ring buffer, and older lines spill to a temporary file on disk. Every index_interval-th spilled
+        line has its file offset recorded, so any range of the log can be paged back in with one seek.
+        Lines are only ever appended, so a range of the log never changes once it has been written. Appending and
+        reading may happen from different threads.
+        :param capacity: Number of the most recent lines held in memory.
+        :param index_interval: Number of spilled lines between two entries of the offset index.
+        """
+        self.capacity = capacity
+        self.index_interval = index_interval
+        self.recent = deque()
+        # Lines on disk, which are always the oldest ones, and the spill file's size and offset index
+        self.spilled = 0
+        self.spill_file = None
+        self.spill_size = 0
+        self.offsets = array('Q')
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.spilled + len(self.recent)
+
+    def append(self, line: str):
+        with self.lock:
+            self.recent.append(line)
+            if len(self.recent) > self.capacity:
+                self.spill(self.recent.popleft())
+
+    def spill(self, line: str):
+        if self.spill_file is None:
+            self.spill_file = tempfile.TemporaryFile()
+        if self.spilled % self.index_interval == 0:
+            self.offsets.append(self.spill_size)
+        data = line.encode('utf-8')
+        self.spill_file.seek(self.spill_size)
+        self.spill_file.write(LENGTH.pack(len(data)) + data)
+        self.spill_size += LENGTH.size + len(data)
+        self.spilled += 1
+
+    def __getitem__(self, index: slice) -> List[str]:
+        """
+        Read a range of the log, from memory or from the spill file.
+        :param index: A slice of line positions. Steps are not supported.
+        :return: The lines in the range.
+        """
+        with self.lock:
+            start, stop, _ = index.indices(len(self))
+            lines = self.read_spilled(start, min(stop, self.spilled)) if start < self.spilled else list()
+            lines += itertools.islice(self.recent, max(0, start - self.spilled), max(0, stop - self.spilled))
+            return lines
+
+    def read_spilled(self, start: int, stop: int) -> List[str]:
+        # Seek to the indexed line at or before start, then read forward
+        block = start // self.index_interval
+        self.spill_file.flush()
+        self.spill_file.seek(self.offsets[block])
+        lines = list()
+        for position in range(block * self.index_interval, stop):
+            length, = LENGTH.unpack(self.spill_file.read(LENGTH.size))
+            data = self.spill_file.read(length)
+            if position >= start:
+                lines.append(data.decode('utf-8'))
+        return lines
+
+    def close(self):
+        with self.lock:
+            if self.spill_file is not None:
+                self.spill_file.close()
+                self.spill_file = None
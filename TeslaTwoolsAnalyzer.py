@@ -0,0 +1,144 @@
+import time
+from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import Teslagrad2Data
+import Teslagrad2Diff
+from Teslagrad2Diff import SlotChange, SlotIndex
+from TeslaTwoolsStatus import States
+
+
+class SaveAnalysis:
+    def __init__(self, state: States, save_file: Teslagrad2Data.SaveFile = None):
+        """
+        The outcome of parsing one version of the save file and comparing it with the previous version.
+        :param state: SAVE_FILE_FOUND, SAVE_SLOT_ADDED, SAVE_SLOT_DELETED, SAVE_SLOT_UPDATED or UNCHANGED.
+        :param save_file: The parsed save file. Left out of compact analyses.
+        """
+        self.state: States = state
+        self.save_file: Teslagrad2Data.SaveFile = save_file
+        # 1-based number of the slot that was added, deleted or updated
+        self.slot_number: int = None
+        # The added or updated slot, and for updates the same slot as of the previous version
+        self.slot: Teslagrad2Data.SaveSlot = None
+        self.prev_slot: Teslagrad2Data.SaveSlot = None
+        self.differences: List[SlotChange] = list()
+        # Time spent parsing the save file and comparing it with the previous version
+        self.parse_ns: int = 0
+        self.diff_ns: int = 0
+
+    def compact(self):
+        """
+        Strip everything the watcher does not need, so the analysis is cheap to send back from a worker process:
+        the parsed save file, the previous slot, the slot's list attributes and the full lists in each change.
+        :return: This analysis.
+        """
+        self.save_file = None
+        self.prev_slot = None
+        if self.slot is not None:
+            slot = Teslagrad2Data.SaveSlot.__new__(Teslagrad2Data.SaveSlot)
+            slot.__dict__.update((key, value) for key, value in vars(self.slot).items()
+                                 if key not in Teslagrad2Diff.list_fields)
+            self.slot = slot
+        for change in self.differences:
+            if change.is_list():
+                change.old = change.new = None
+        return self
+
+
+class SaveAnalyzer:
+    def __init__(self):
+        """
+        Parse each new version of the save file and work out what changed since the version before it.
+        Holds the previous version, so one analyzer must see every version in order.
+        """
+        self.prev_save_file: Teslagrad2Data.SaveFile = None
+        self.prev_slot_index: SlotIndex = None
+
+    def analyze(self, data: bytes) -> SaveAnalysis:
+        """
+        Parse the save file contents and classify the change from the previous version.
+        :param data: The raw contents of the save file.
+        :return: A SaveAnalysis of the new version.
+        """
+        start_ns = time.perf_counter_ns()
+        save_file = Teslagrad2Data.SaveFile()
+        save_file.read(data)
+        slot_index = SlotIndex(save_file.fingerprints)
+        parsed_ns = time.perf_counter_ns()
+
+        if self.prev_save_file is None:
+            analysis = SaveAnalysis(States.SAVE_FILE_FOUND, save_file)
+        else:
+            prev_save_list = self.prev_save_file.saveDataSlots
+            save_list = save_file.saveDataSlots
+            # Slots whose fingerprint is new since the last read have been added or updated,
+            # and slots whose fingerprint has disappeared have been deleted or updated
+            changed_slots = self.prev_slot_index.unmatched(slot_index)
+            if len(save_list) > len(prev_save_list):
+                # A new save slot was added
+                analysis = SaveAnalysis(States.SAVE_SLOT_ADDED, save_file)
+                added_index = changed_slots[-1] if changed_slots else len(save_list) - 1
+                analysis.slot_number = added_index + 1
+                analysis.slot = save_list[added_index]
+            elif len(save_list) < len(prev_save_list):
+                # A save slot was deleted, and its fingerprint tells us which one
+                analysis = SaveAnalysis(States.SAVE_SLOT_DELETED, save_file)
+                deleted_slots = slot_index.unmatched(self.prev_slot_index)
+                analysis.slot_number = (deleted_slots[0] if deleted_slots else len(save_list)) + 1
+            else:
+                # A save changed its data. If no fingerprint is new, the slots were only reordered.
+                analysis = SaveAnalysis(States.UNCHANGED, save_file)
+                for index in changed_slots:
+                    # Compare the save slots field by field to see if anything has been changed, added, or removed
+                    differences = Teslagrad2Diff.diff_slots(prev_save_list[index], save_list[index])
+                    if len(differences) > 0:
+                        analysis.state = States.SAVE_SLOT_UPDATED
+                        analysis.slot_number = index + 1
+                        analysis.slot = save_list[index]
+                        analysis.prev_slot = prev_save_list[index]
+                        analysis.differences = differences
+                        break
+
+        self.prev_save_file = save_file
+        self.prev_slot_index = slot_index
+        analysis.parse_ns = parsed_ns - start_ns
+        analysis.diff_ns = time.perf_counter_ns() - parsed_ns
+        return analysis
+
+    def close(self):
+        pass
+
+
+# The analyzer living in the worker process. The pool has a single worker, so it sees every version in order.
+worker_analyzer = None
+
+
+def reset_worker():
+    global worker_analyzer
+    worker_analyzer = SaveAnalyzer()
+
+
+def analyze_in_worker(data: bytes) -> SaveAnalysis:
+    return worker_analyzer.analyze(data).compact()
+
+
+class WorkerSaveAnalyzer:
+    def __init__(self):
+        """
+        A SaveAnalyzer running in a separate process, so parsing and diffing large save files does not hold the GIL
+        while the Tk main loop is drawing. Only compact analyses are sent back.
+        """
+        self.pool = ProcessPoolExecutor(max_workers=1, initializer=reset_worker)
+
+    def analyze(self, data: bytes) -> SaveAnalysis:
+        try:
+            return self.pool.submit(analyze_in_worker, data).result()
+        except BrokenProcessPool:
+            # The worker died and took the previous version with it. Start over as if the file was just found.
+            self.pool = ProcessPoolExecutor(max_workers=1, initializer=reset_worker)
+            return self.pool.submit(analyze_in_worker, data).result()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
@@ -0,0 +1,388 @@
+#!/usr/bin/python3
+import re
+import csv
+import sys
+import time
+import queue
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+import numpy
+
+import Teslagrad2Data
+import Teslagrad2Diff
+from TeslaTwoolsSplits import SplitSet
+from TeslaTwoolsStatistics import SplitStatistics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started TEXT,
+    completed TEXT,
+    slot INTEGER
+);
+CREATE TABLE IF NOT EXISTS splits (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    position INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    value TEXT NOT NULL,
+    time_secs REAL NOT NULL,
+    segment_secs REAL NOT NULL,
+    PRIMARY KEY (run_id, position)
+);
+CREATE TABLE IF NOT EXISTS events (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    playtime_secs REAL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS imports (
+    source TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id)
+);
+CREATE INDEX IF NOT EXISTS events_run ON events (run_id);
+CREATE INDEX IF NOT EXISTS events_key_value ON events (key, value);
+CREATE INDEX IF NOT EXISTS splits_event_value ON splits (event, value);
+CREATE INDEX IF NOT EXISTS splits_segments ON splits (position, event, value, segment_secs);
+CREATE INDEX IF NOT EXISTS splits_times ON splits (position, event, value, run_id, time_secs);
+"""
+
+# An activity log line, e.g. "[0:12:34.560000] triggersSet: +HulderJumpscare1" or "[...] respawnPoint['x']: 1.5"
+activity_line = re.compile(r"\[(?P<playtime>[^\]]*)\] (?P<key>(?P<field>\w+)(?:\['\w+'\])?): (?P<value>.*)")
+new_game_line = re.compile(r"New Game started at (?P<started>.*)")
+# Log files are named after the time they were created
+log_file_time = re.compile(r"(?:File_Watcher|Completed_Run)_(?P<time>\d{8}_\d{6})\.log")
+event_keys = set(Teslagrad2Data.SaveSlot.__annotations__)
+
+
+# A duration as str(timedelta) writes it, e.g. "1 day, 2:03:04.500000", in seconds. None for anything else.
+def timespan_secs(text: str) -> float:
+    days, _, clock = text.rpartition(", ")
+    try:
+        hours, minutes, seconds = clock.split(":")
+        secs = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+        return secs + int(days.split()[0]) * 86400 if days else secs
+    except (ValueError, IndexError):
+        return None
+
+
+class RunArchive(threading.Thread):
+    def __init__(self, path: Path, commit_interval_secs: float = 0.5, batch_writes: int = 1000):
+        """
+        A SQLite database of runs, their completed splits and every event the File Watcher saw during them.
+        The watcher's writes are queued and committed from the archive's own thread, in one transaction per batch,
+        so the watcher never waits on the disk. Queries open their own connection and can run from any thread.
+        :param path: The database file, created if it does not exist.
+        :param commit_interval_secs: Longest time a write waits for others to share its transaction.
+        :param batch_writes: Most writes in one transaction.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.path = Path(path)
+        self.commit_interval_secs = commit_interval_secs
+        self.batch_writes = batch_writes
+        with closing(self.connect()) as connection:
+            # Write-ahead logging lets queries read while the archive's thread writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+        self.pending = queue.SimpleQueue()
+        self.transactions = 0
+        # The run being recorded and the time of its latest split, only used from the archive's thread
+        self.run_id: int = None
+        self.last_split_secs = 0.0
+        self.start()
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def start_run(self, started: datetime, slot_number: int, source: str = None):
+        """
+        Start recording a new run, which the events and splits that follow belong to.
+        :param started: When the save slot was created.
+        :param slot_number: The save slot's number.
+        :param source: Name of the activity log file of the run, so importing the file later does not repeat it.
+        """
+        self.pending.put((self.insert_run, (started, slot_number, source)))
+
+    def add_events(self, playtime: timedelta, events: List[Tuple[str, str]]):
+        """
+        Record the events of one save of the run.
+        :param playtime: The run's time at the save.
+        :param events: The (key, value) of each event, one per item added to a list, with values written as the
+        activity log writes them, so events imported from activity logs match them.
+        """
+        self.pending.put((self.insert_events, (playtime, events)))
+
+    def add_splits(self, splits: List[Tuple[int, str, str, timedelta]]):
+        # Splits completed by one save, as (position, event, value, time)
+        self.pending.put((self.insert_splits, (splits,)))
+
+    def complete_run(self, completed: datetime, source: str = None):
+        self.pending.put((self.update_completed, (completed, source)))
+
+    def end_run(self):
+        # The run's save slot was deleted. Whatever comes next is another run.
+        self.pending.put((self.clear_run, ()))
+
+    def close(self):
+        # Commit everything still queued and stop the thread
+        self.pending.put(None)
+        self.join()
+
+    def run(self):
+        connection = self.connect()
+        connection.execute("PRAGMA synchronous=NORMAL")
+        closing_archive = False
+        while not closing_archive:
+            batch = [self.pending.get()]
+            # Gather whatever else is written before the commit is due into the same transaction
+            deadline = time.monotonic() + self.commit_interval_secs
+            while batch[-1] is not None and len(batch) < self.batch_writes:
+                try:
+                    batch.append(self.pending.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+                if time.monotonic() >= deadline:
+                    break
+            if batch[-1] is None:
+                closing_archive = True
+                batch.pop()
+            if batch:
+                with connection:
+                    for write, args in batch:
+                        write(connection, *args)
+                self.transactions += 1
+        connection.close()
+
+    def insert_run(self, connection: sqlite3.Connection, started: datetime, slot_number: int, source: str):
+        cursor = connection.execute("INSERT INTO runs (started, slot) VALUES (?, ?)",
+                                    (started.isoformat() if started is not None else None, slot_number))
+        self.run_id = cursor.lastrowid
+        self.last_split_secs = 0.0
+        if source is not None:
+            connection.execute("INSERT OR IGNORE INTO imports (source, run_id) VALUES (?, ?)", (source, self.run_id))
+
+    def current_run(self, connection: sqlite3.Connection) -> int:
+        # Events seen before any new game, as when the watcher was started halfway through a run, get a run too
+        if self.run_id is None:
+            self.insert_run(connection, None, None, None)
+        return self.run_id
+
+    def insert_events(self, connection: sqlite3.Connection, playtime: timedelta, events: List[Tuple[str, str]]):
+        run_id = self.current_run(connection)
+        playtime_secs = playtime.total_seconds() if playtime is not None else None
+        connection.executemany("INSERT INTO events (run_id, playtime_secs, key, value) VALUES (?, ?, ?, ?)",
+                               ((run_id, playtime_secs, key, value) for key, value in events))
+
+    def insert_splits(self, connection: sqlite3.Connection, splits: List[Tuple[int, str, str, timedelta]]):
+        run_id = self.current_run(connection)
+        rows = list()
+        for position, event, value, timespan in splits:
+            time_secs = timespan.total_seconds()
+            rows.append((run_id, position, event, value, time_secs, time_secs - self.last_split_secs))
+            self.last_split_secs = time_secs
+        connection.executemany("INSERT OR REPLACE INTO splits (run_id, position, event, value, time_secs, "
+                               "segment_secs) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def update_completed(self, connection: sqlite3.Connection, completed: datetime, source: str):
+        run_id = self.current_run(connection)
+        connection.execute("UPDATE runs SET completed = ? WHERE id = ?", (completed.isoformat(), run_id))
+        if source is not None:
+            connection.execute("INSERT OR IGNORE INTO imports (source, run_id) VALUES (?, ?)", (source, run_id))
+
+    def clear_run(self, connection: sqlite3.Connection):
+        self.run_id = None
+
+    def query(self, sql: str, parameters: Tuple = ()) -> List[Tuple]:
+        with closing(self.connect()) as connection:
+            return connection.execute(sql, parameters).fetchall()
+
+    def event_hits(self, key: str, value: str = None) -> List[Tuple[int, str, float, str]]:
+        """
+        Every time an event was seen, e.g. every time hulderBossfightBeaten became True.
+        :param key: The save slot attribute.
+        :param value: The value it took, or the item added to it for lists. Any value if left out.
+        :return: Rows of run id, when the run started, playtime in seconds and value, oldest run first.
+        """
+        condition, parameters = ("key = ? AND value = ?", (key, value)) if value is not None else ("key = ?", (key,))
+        return self.query(f"SELECT run_id, started, playtime_secs, value FROM events JOIN runs ON runs.id = run_id "
+                          f"WHERE {condition} ORDER BY run_id, playtime_secs", parameters)
+
+    def best_segments(self) -> List[Tuple[int, str, str, float, int]]:
+        """
+        The best time of each split's segment over every completed run, for the splits at each position.
+        :return: Rows of position, event, value, best segment in seconds and number of runs, by position.
+        """
+        return self.query("SELECT position, event, value, MIN(segment_secs), COUNT(*) FROM splits "
+                          "JOIN runs ON runs.id = run_id WHERE completed IS NOT NULL "
+                          "GROUP BY position, event, value ORDER BY position")
+
+    def split_times(self, splits: List[Tuple[str, str]]) -> numpy.ndarray:
+        """
+        The split times of every completed run that completed all of the given splits, in their positions.
+        Each split's runs and times come back from SQLite as one comma-separated string, read by NumPy at once,
+        as fetching a row per split of each run costs far more than the query itself.
+        :param splits: The (event, value) of each split, in order.
+        :return: Split times in seconds, of shape runs by splits, oldest run first.
+        """
+        with closing(self.connect()) as connection:
+            return self.read_split_times(connection, splits)
+
+    def load_statistics(self, splits: List[Tuple[str, str]], loaded):
+        """
+        Compute the segment statistics of the archived runs of a split list on the archive's thread, once the writes
+        queued before have been made, so the File Watcher has them in hand when a run completes.
+        :param splits: The (event, value) of each split, in order.
+        :param loaded: Called from the archive's thread with the SplitStatistics.
+        """
+        self.pending.put((self.read_statistics, (splits, loaded)))
+
+    def read_statistics(self, connection: sqlite3.Connection, splits: List[Tuple[str, str]], loaded):
+        loaded(SplitStatistics.from_times(self.read_split_times(connection, splits)))
+
+    @staticmethod
+    def read_split_times(connection: sqlite3.Connection, splits: List[Tuple[str, str]]) -> numpy.ndarray:
+        wanted = ", ".join(["(?, ?, ?)"] * len(splits))
+        parameters = [item for position, (event, value) in enumerate(splits) for item in (position, event, value)]
+        completed, = connection.execute("SELECT group_concat(id) FROM runs WHERE completed IS NOT NULL").fetchone()
+        columns = connection.execute(
+            f"WITH wanted (position, event, value) AS (VALUES {wanted}) "
+            f"SELECT wanted.position, group_concat(run_id), group_concat(time_secs) FROM wanted CROSS JOIN splits "
+            f"USING (position, event, value) GROUP BY wanted.position", parameters).fetchall() if splits else []
+        if len(columns) < len(splits) or completed is None:
+            return numpy.empty((0, len(splits)))
+        # Runs that completed every split, sorted, then each split's times for those runs
+        run_ids = numpy.array(completed.split(","), dtype=numpy.int64)
+        split_columns = list()
+        for _, column_run_ids, column_times in columns:
+            column_run_ids = numpy.array(column_run_ids.split(","), dtype=numpy.int64)
+            split_columns.append((column_run_ids, numpy.array(column_times.split(","), dtype=float)))
+            run_ids = numpy.intersect1d(run_ids, column_run_ids, assume_unique=True)
+        times = numpy.empty((len(run_ids), len(splits)))
+        for position, (column_run_ids, column_times) in enumerate(split_columns):
+            order = numpy.argsort(column_run_ids)
+            times[:, position] = column_times[order][numpy.searchsorted(column_run_ids[order], run_ids)]
+        return times
+
+    def import_logs(self, directory: Path) -> Tuple[int, int]:
+        """
+        Import the File_Watcher_*.log and Completed_Run_*.log files of a directory, in one transaction. A completed
+        run log is added to the activity log of the run it completed, that is the latest one before it.
+        Files imported before, or written while the archive was recording, are skipped.
+        :param directory: The directory holding the log files.
+        :return: The number of files imported and the number skipped.
+        """
+        paths = sorted((path for path in Path(directory).glob("*.log") if log_file_time.fullmatch(path.name)),
+                       key=lambda path: (log_file_time.fullmatch(path.name)["time"],
+                                         not path.name.startswith("File_Watcher")))
+        imported = skipped = 0
+        with closing(self.connect()) as connection, connection:
+            sources = dict(connection.execute("SELECT source, run_id FROM imports"))
+            # The run of the latest activity log, until a completed run log is added to it
+            open_run_id = None
+            for path in paths:
+                is_activity_log = path.name.startswith("File_Watcher")
+                if path.name in sources:
+                    skipped += 1
+                    open_run_id = sources[path.name] if is_activity_log else None
+                    continue
+                if is_activity_log:
+                    open_run_id = self.import_activity_log(connection, path)
+                    run_id = open_run_id
+                else:
+                    run_id = self.import_completed_run(connection, path, open_run_id)
+                    open_run_id = None
+                connection.execute("INSERT INTO imports (source, run_id) VALUES (?, ?)", (path.name, run_id))
+                imported += 1
+        return imported, skipped
+
+    @staticmethod
+    def import_activity_log(connection: sqlite3.Connection, path: Path) -> int:
+        started = None
+        rows = list()
+        with path.open('r') as log_file:
+            for line in log_file:
+                line = line.rstrip("\n")
+                match = activity_line.fullmatch(line)
+                if match is not None and match["field"] in event_keys:
+                    value = match["value"]
+                    if match["key"] in Teslagrad2Diff.list_fields and value.startswith("+"):
+                        value = value[1:]
+                    rows.append((timespan_secs(match["playtime"]), match["key"], value))
+                elif started is None and new_game_line.fullmatch(line):
+                    started = datetime.strptime(new_game_line.fullmatch(line)["started"], '%Y-%m-%d %H:%M:%S.%f')
+        run_id = connection.execute("INSERT INTO runs (started) VALUES (?)",
+                                    (started.isoformat() if started is not None else None,)).lastrowid
+        connection.executemany("INSERT INTO events (run_id, playtime_secs, key, value) VALUES (?, ?, ?, ?)",
+                               ((run_id, *row) for row in rows))
+        return run_id
+
+    @staticmethod
+    def import_completed_run(connection: sqlite3.Connection, path: Path, run_id: int) -> int:
+        completed = datetime.strptime(log_file_time.fullmatch(path.name)["time"], '%Y%m%d_%H%M%S')
+        if run_id is None:
+            run_id = connection.execute("INSERT INTO runs DEFAULT VALUES").lastrowid
+        connection.execute("UPDATE runs SET completed = ? WHERE id = ?", (completed.isoformat(), run_id))
+        splits = list()
+        with path.open('r') as run_log:
+            for row in csv.reader(run_log, delimiter='|'):
+                time_secs = timespan_secs(row[2]) if len(row) >= 3 else None
+                if time_secs is None:
+                    continue
+                event, _, value = row[1].partition(": ")
+                splits.append((int(row[0]) - 1, event, value, time_secs))
+        # The log lists the splits by position, but segments run in the order the splits were completed, as
+        # insert_splits records them. Splits completed by the same save stay in position order.
+        rows = list()
+        last_split_secs = 0.0
+        for position, event, value, time_secs in sorted(splits, key=lambda split: split[3]):
+            rows.append((run_id, position, event, value, time_secs, time_secs - last_split_secs))
+            last_split_secs = time_secs
+        connection.executemany("INSERT OR REPLACE INTO splits (run_id, position, event, value, time_secs, "
+                               "segment_secs) VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return run_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import and query the TeslaTwools run archive")
+    parser.add_argument("--database", type=Path, default=Teslagrad2Data.save_directory() / 'TeslaTwools_Runs.sqlite3',
+                        help="The run archive, by default in the save directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_command = commands.add_parser("import", help="Import File_Watcher and Completed_Run logs")
+    import_command.add_argument("directory", type=Path, nargs="?", default=Teslagrad2Data.save_directory(),
+                                help="Directory holding the logs, by default the save directory")
+    hits_command = commands.add_parser("hits", help="List every time an event was seen")
+    hits_command.add_argument("key", help="Save slot attribute, e.g. hulderBossfightBeaten")
+    hits_command.add_argument("value", nargs="?", help="Value or added item, e.g. True")
+    commands.add_parser("best-segments", help="List the best segment of each split over every completed run")
+    statistics_command = commands.add_parser("statistics", help="Segment statistics of the runs of a splits file")
+    statistics_command.add_argument("splits", type=Path, help="A splits file saved from the Splits tab")
+    args = parser.parse_args()
+
+    archive = RunArchive(args.database)
+    try:
+        if args.command == "import":
+            imported, skipped = archive.import_logs(args.directory)
+            print(f"Imported {imported} log files, skipped {skipped} imported before")
+        elif args.command == "hits":
+            for run_id, started, playtime_secs, value in archive.event_hits(args.key, args.value):
+                playtime = timedelta(seconds=playtime_secs) if playtime_secs is not None else None
+                print(f"Run {run_id} started {started}: {args.key}: {value} at {playtime}")
+        elif args.command == "best-segments":
+            for position, event, value, best_secs, runs in archive.best_segments():
+                print(f"{position + 1}|{event}: {value}|{timedelta(seconds=best_secs)}|{runs} runs")
+        elif args.command == "statistics":
+            with args.splits.open('r') as splits_file:
+                splits = SplitSet.from_rows(csv.reader(splits_file, delimiter='|'))
+            times = archive.split_times([(split.event, split.value) for split in splits])
+            SplitStatistics.from_times(times).write_csv(sys.stdout, splits)
+    finally:
+        archive.close()
+
+
+if __name__ == '__main__':
+    main()
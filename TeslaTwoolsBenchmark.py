@@ -0,0 +1,1269 @@
+#!/usr/bin/python3
+import os
+import sys
+import json
+import zlib
+import time
+import random
+import socket
+import threading
+import subprocess
+import itertools
+import argparse
+import tempfile
+import tracemalloc
+import statistics
+import multiprocessing
+from pathlib import Path
+from datetime import datetime, timedelta
+
+from deepdiff import DeepDiff
+
+import Teslagrad2Data
+import Teslagrad2Diff
+from Teslagrad2Snapshots import SlotSnapshotStore
+from Teslagrad2Generator import generate_slot, generate_save_file, next_checkpoint, save_file_text, progression
+from TeslaTwoolsNotify import create_change_notifier
+from TeslaTwoolsAnalyzer import SaveAnalyzer, WorkerSaveAnalyzer
+from TeslaTwoolsLogSink import LogSink
+from TeslaTwoolsActivityLog import ActivityLog
+from TeslaTwoolsLiveSplit import LiveSplitClient
+from TeslaTwoolsArchive import RunArchive
+from TeslaTwoolsStatistics import SplitStatistics
+from TeslaTwoolsHistory import SaveHistoryRecorder, SaveHistoryReplay, read_save_history
+from TeslaTwoolsChannel import UpdateChannel
+from TeslaTwoolsWatcher import FileWatcher
+from TeslaTwoolsTimings import PipelineTimings, StageHistogram
+from TeslaTwoolsSplits import Split, SplitSet, SplitTracker, split_value_dict, dict_items_match
+
+# Tk and the UI are imported by the UI benchmarks only, so the others run without them. The stand-ins for Tk widgets
+# take the same index as tkinter.END.
+END = "end"
+
+
+# Helper to print a benchmark result line in a consistent format
+def report(name, **results):
+    print(f"{name:<40}" + "  ".join(f"{key}={value}" for key, value in results.items()))
+
+
+# Writer process standing in for Teslagrad 2: rewrites the file with the wall clock time of each write
+def notify_writer(path: str, count: int, interval_secs: float):
+    for _ in range(count):
+        time.sleep(interval_secs)
+        with open(path, 'w') as save:
+            save.write(str(time.time_ns()))
+
+
+def bench_notify(backend: str, writes: int = 50, interval_secs: float = 0.15, idle_secs: float = 5.0):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'Saves.yaml'
+        path.write_text(str(time.time_ns()))
+        notifier = create_change_notifier(path, 0.1, backend)
+
+        # Detection latency: time between the writer finishing a write and the watch loop reading it
+        writer = multiprocessing.Process(target=notify_writer, args=(str(path), writes, interval_secs))
+        writer.start()
+        latencies = list()
+        prev_mtime = os.stat(path).st_mtime_ns
+        deadline = time.monotonic() + writes * interval_secs + 2.0
+        while len(latencies) < writes and time.monotonic() < deadline:
+            if not notifier.wait(0.5):
+                continue
+            mtime = os.stat(path).st_mtime_ns
+            if mtime == prev_mtime:
+                continue
+            prev_mtime = mtime
+            content = path.read_text()
+            if content:
+                latencies.append((time.time_ns() - int(content)) / 1e6)
+        writer.join()
+
+        # Idle CPU: run the wait loop with no writer and measure the CPU time it burns
+        cpu_start = time.process_time()
+        wall_start = time.monotonic()
+        wakeups = 0
+        while time.monotonic() - wall_start < idle_secs:
+            notifier.wait(1.0)
+            os.stat(path)
+            wakeups += 1
+        cpu_used = time.process_time() - cpu_start
+        notifier.close()
+
+    report(f"notify[{notifier.name}]",
+           detected=f"{len(latencies)}/{writes}",
+           latency_median_ms=f"{statistics.median(latencies):.2f}" if latencies else "n/a",
+           latency_max_ms=f"{max(latencies):.2f}" if latencies else "n/a",
+           idle_wakeups_per_sec=f"{wakeups / idle_secs:.1f}",
+           idle_cpu_pct=f"{100 * cpu_used / idle_secs:.3f}")
+
+
+def bench_parse(slot_count: int = 10, repeat: int = 20):
+    rng = random.Random(2)
+    with tempfile.TemporaryDirectory() as directory:
+        slots = [generate_slot(rng.random(), rng) for _ in range(slot_count)]
+        base_text = save_file_text(slots, Path(directory))
+
+    # Parse time for the fast parser against the ruamel.yaml path
+    data = base_text.encode('utf-8')
+    for name, read in (("fast", lambda save_file: save_file.read(data)),
+                       ("ruamel", lambda save_file: save_file.read_yaml(data.decode('utf-8')))):
+        timings = list()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            read(Teslagrad2Data.SaveFile())
+            timings.append(time.perf_counter() - start)
+        report(f"parse[{name}]", slots=slot_count, kib=len(data) // 1024,
+               median_ms=f"{1000 * statistics.median(timings):.2f}",
+               mib_per_sec=f"{len(data) / statistics.median(timings) / 2 ** 20:.1f}")
+
+
+# The events FileWatcher.watch derived from DeepDiff before the schema-aware differ replaced it.
+# The watch loop used to drop DeepDiff's type_changes, so a respawnPoint moving from 970 to 970.5 went unreported.
+# The differ reports those, so they are counted as value changes here.
+def deepdiff_events(prev_slot, slot):
+    differences = DeepDiff(prev_slot, slot)
+    events = list()
+    for key, value_dict in itertools.chain(differences.get("values_changed", dict()).items(),
+                                           differences.get("type_changes", dict()).items()):
+        key = key.replace("root.", "")
+        if key not in {"dateModified", "timeSpent", "respawnFacingRight"}:
+            events.append({key: str(value_dict.get("new_value"))})
+    iterable_item_added = differences.get("iterable_item_added", dict())
+    for list_key in Teslagrad2Diff.list_fields:
+        events.append({list_key: [str(value) for key, value in iterable_item_added.items() if list_key in key]})
+    return events
+
+
+def differ_events(prev_slot, slot):
+    events = list()
+    changes = Teslagrad2Diff.diff_slots(prev_slot, slot)
+    for change in changes:
+        if not change.is_list() and change.field not in {"dateModified", "timeSpent", "respawnFacingRight"}:
+            events.append({change.field: str(change.new)})
+    list_changes = {change.field: change for change in changes if change.is_list()}
+    for list_key in Teslagrad2Diff.list_fields:
+        events.append({list_key: [str(value) for value in list_changes[list_key].added]
+                       if list_key in list_changes else list()})
+    return events
+
+
+def bench_diff(pairs: int = 200):
+    rng = random.Random(5)
+    checkpoints = list()
+    for _ in range(pairs):
+        slot = generate_slot(rng.random(), rng)
+        checkpoints.append((slot, next_checkpoint(slot, rng)))
+
+    # The differ must produce the same events the DeepDiff-based watch loop did
+    mismatches = sum(1 for prev_slot, slot in checkpoints
+                     if sorted(map(repr, deepdiff_events(prev_slot, slot))) !=
+                     sorted(map(repr, differ_events(prev_slot, slot))))
+    report("diff[equivalence]", checkpoints=pairs, mismatches=mismatches)
+
+    medians = dict()
+    for name, events in (("deepdiff", deepdiff_events), ("schema", differ_events)):
+        timings = list()
+        for prev_slot, slot in checkpoints:
+            start = time.perf_counter()
+            events(prev_slot, slot)
+            timings.append(time.perf_counter() - start)
+        medians[name] = statistics.median(timings)
+        report(f"diff[{name}]", checkpoints=pairs, median_us=f"{1e6 * medians[name]:.1f}")
+    report("diff[speedup]", factor=f"{medians['deepdiff'] / medians['schema']:.0f}x")
+
+
+# Percentile of a sorted list of samples
+def percentile(samples, fraction: float):
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def bench_jitter(slot_count: int = 30, frames: int = 300, frame_secs: float = 1 / 60):
+    rng = random.Random(8)
+    with tempfile.TemporaryDirectory() as directory:
+        slots = [generate_slot(0.5 + rng.random() / 2, rng) for _ in range(slot_count)]
+        versions = [save_file_text(slots, Path(directory)).encode('utf-8')]
+        slots[-1] = next_checkpoint(slots[-1], rng)
+        versions.append(save_file_text(slots, Path(directory)).encode('utf-8'))
+
+    for name, analyzer in (("in-process", SaveAnalyzer()), ("worker-process", WorkerSaveAnalyzer())):
+        # The watcher thread keeps parsing and diffing alternating versions of a large save file...
+        running = True
+        analyses = 0
+
+        def watcher():
+            nonlocal analyses
+            while running:
+                analyzer.analyze(versions[analyses % 2])
+                analyses += 1
+
+        analyzer.analyze(versions[1])
+        thread = threading.Thread(target=watcher)
+        thread.start()
+        # ...while the main thread stands in for the Tk main loop, drawing a frame every 1/60th of a second
+        lateness = list()
+        deadline = time.perf_counter() + frame_secs
+        for _ in range(frames):
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+            lateness.append(1000 * (time.perf_counter() - deadline))
+            deadline = time.perf_counter() + frame_secs
+        running = False
+        thread.join()
+        analyzer.close()
+        lateness.sort()
+        report(f"jitter[{name}]", slots=slot_count, analyses=analyses,
+               frame_late_p50_ms=f"{percentile(lateness, 0.5):.2f}",
+               frame_late_p99_ms=f"{percentile(lateness, 0.99):.2f}", frame_late_max_ms=f"{lateness[-1]:.2f}")
+
+
+class TextStandIn:
+    # Headless stand-in for a tk.Text widget, holding its contents as a list of lines so that inserting and
+    # deleting cost time in proportion to the text handled, as they do in Tk
+    def __init__(self):
+        self.lines = [""]
+
+    def insert(self, index, text: str):
+        parts = text.split("\n")
+        if index == END:
+            self.lines[-1] += parts[0]
+            self.lines += parts[1:]
+        else:
+            parts[-1] += self.lines[0]
+            self.lines[0:1] = parts
+
+    def delete(self, start, end):
+        if end == END:
+            self.lines = [""]
+        else:
+            del self.lines[:int(str(end).split(".")[0]) - 1]
+
+    def get(self, *_) -> str:
+        return "\n".join(self.lines)
+
+    def see(self, _):
+        pass
+
+    def config(self, **_):
+        pass
+
+
+def text_widget():
+    # A real Text widget when there is a display to create one on, the stand-in otherwise
+    import tkinter
+    try:
+        root = tkinter.Tk()
+        root.withdraw()
+        return tkinter.Text(root), root
+    except tkinter.TclError:
+        return TextStandIn(), None
+
+
+def activity_lines(checkpoint: int, rng: random.Random):
+    # The lines one checkpoint adds to the activity log
+    playtime = f"[{checkpoint // 720}:{checkpoint // 12 % 60:02}:{checkpoint * 5 % 60:02}.{rng.randrange(10 ** 6):06}]"
+    return [f"{playtime} triggersSet: +Trigger{rng.randrange(10 ** 6)}" for _ in range(rng.randint(1, 4))]
+
+
+def bench_activity_log(events: int = 5000, max_lines: int = 500):
+    from TeslaTwoolsUI import ActivityLogView
+    rng = random.Random(10)
+    batches = [activity_lines(event, rng) for event in range(events)]
+    log = [line for batch in batches for line in batch]
+
+    for name in ("rewrite", "incremental"):
+        textbox, root = text_widget()
+        view = ActivityLogView(textbox, max_lines)
+        lines = list() if name == "rewrite" else ActivityLog()
+        timings = list()
+        for batch in batches:
+            for line in batch:
+                lines.append(line)
+            start = time.perf_counter()
+            if name == "rewrite":
+                # What the File Watcher tab did before: replace the whole log on every update
+                textbox.delete(1.0, END)
+                textbox.insert(1.0, "\n".join(lines))
+                textbox.see(END)
+            else:
+                view.render(1, lines, len(lines))
+            timings.append(time.perf_counter() - start)
+        if name == "incremental":
+            # The widget must hold exactly the newest lines, and paging must bring back the ones before them,
+            # all the way back to those spilled to disk
+            assert textbox.get(1.0, END).rstrip("\n") == "\n".join(log[-max_lines:])
+            page_start = time.perf_counter()
+            pages = 0
+            while view.first_shown > 0:
+                view.page_earlier()
+                pages += 1
+            page_ms = 1000 * (time.perf_counter() - page_start) / pages
+            assert textbox.get(1.0, END).rstrip("\n") == "\n".join(log)
+            lines.close()
+        if root is not None:
+            root.destroy()
+        late = sorted(timings[-events // 10:])
+        results = dict(page_ms=f"{page_ms:.2f}") if name == "incremental" else dict()
+        report(f"activity_log[{name}]", widget=type(textbox).__name__, events=events, lines=len(log),
+               total_ms=f"{1000 * sum(timings):.1f}", late_median_us=f"{1e6 * statistics.median(late):.1f}",
+               late_p99_us=f"{1e6 * percentile(late, 0.99):.1f}", **results)
+
+
+def bench_soak(hours: int = 8, checkpoint_secs: int = 5):
+    # Replay the activity of a long session, a checkpoint every few seconds, and sample memory every hour
+    rng = random.Random(13)
+    checkpoints_per_hour = 3600 // checkpoint_secs
+    for name in ("list", "ring"):
+        log = list() if name == "list" else ActivityLog()
+        tracemalloc.start()
+        samples = list()
+        for checkpoint in range(hours * checkpoints_per_hour):
+            for line in activity_lines(checkpoint, rng):
+                log.append(line)
+            if (checkpoint + 1) % checkpoints_per_hour == 0:
+                samples.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+        if name == "ring":
+            # Check a range that spilled to disk long ago reads back intact
+            assert len(log[100:200]) == 100 and all(line.startswith("[0:") for line in log[100:200])
+            log.close()
+        report(f"soak[{name}]", hours=hours, lines=len(log),
+               memory_kib_by_hour=",".join(f"{sample // 1024}" for sample in samples))
+
+
+class LabelStandIn:
+    # Headless stand-in for ttk.Label that counts the widget operations a redraw performs
+    operations = {"created": 0, "configured": 0, "packed": 0, "forgotten": 0, "destroyed": 0}
+
+    def __init__(self, master, **kw):
+        self.master = master
+        self.operations["created"] += 1
+        master.children.append(self)
+
+    def configure(self, **kw):
+        self.operations["configured"] += 1
+
+    def pack(self, **kw):
+        self.operations["packed"] += 1
+
+    def pack_forget(self):
+        self.operations["forgotten"] += 1
+
+    def destroy(self):
+        self.operations["destroyed"] += 1
+        self.master.children.remove(self)
+
+
+class FrameStandIn:
+    def __init__(self):
+        self.children = list()
+
+    def winfo_children(self):
+        return list(self.children)
+
+
+def bench_labels(additions: int = 50, updates: int = 100):
+    import tkinter
+    import tkinter.ttk
+    from TeslaTwoolsUI import LabelPool, game_state_rows
+    font = "Arial 12"
+    rng = random.Random(11)
+    # Alternate checkpoints that add a burst of triggers with ordinary ones that change a few keys
+    events = list()
+    for update in range(updates):
+        burst = additions if update % 2 == 0 else rng.randint(0, 3)
+        events.append([{"respawnScene": f"Scene{update}"}, {"fafnirBossFightBeaten": "True"},
+                       {"triggersSet": [f"Trigger{rng.randrange(10 ** 6)}" for _ in range(burst)]},
+                       {"scrollsPickedUp": [f"Scroll{rng.randrange(81)}"] if update % 5 == 0 else []}])
+
+    try:
+        root = tkinter.Tk()
+        root.withdraw()
+    except tkinter.TclError:
+        root = None
+    for name in ("recreate", "pooled"):
+        master = tkinter.ttk.Frame(root) if root is not None else FrameStandIn()
+        label_type = tkinter.ttk.Label if root is not None else LabelStandIn
+        LabelStandIn.operations.update(dict.fromkeys(LabelStandIn.operations, 0))
+        pool = LabelPool(master, label_type)
+        timings = list()
+        for new_events in events:
+            start = time.perf_counter()
+            if name == "recreate":
+                # What the File Watcher tab did before: destroy every label, then create one per row
+                for widget in master.winfo_children():
+                    widget.destroy()
+                non_list_rows, list_rows = game_state_rows(new_events, font, max_items=additions)
+                for text, row_font in list_rows:
+                    label_type(master, font=row_font, anchor=tkinter.W, text=text).pack(anchor=tkinter.W, padx=5)
+            else:
+                non_list_rows, list_rows = game_state_rows(new_events, font, max_items=8)
+                pool.show(list_rows)
+            if root is not None:
+                root.update_idletasks()
+            timings.append(time.perf_counter() - start)
+        bursts = sorted(timings[::2])
+        operations = {} if root is not None else {f"{key}_per_update": f"{count / updates:.1f}"
+                                                   for key, count in LabelStandIn.operations.items()}
+        report(f"labels[{name}]", widget=label_type.__name__, additions=additions,
+               burst_median_us=f"{1e6 * statistics.median(bursts):.1f}", **operations)
+        if root is not None:
+            master.destroy()
+    if root is not None:
+        root.destroy()
+
+
+def bench_log_sink(checkpoints: int = 1000):
+    rng = random.Random(12)
+    batches = [[f"[0:{checkpoint // 60:02}:{checkpoint % 60:02}] triggersSet: +Trigger{rng.randrange(10 ** 6)}"
+                for _ in range(rng.randint(1, 4))] for checkpoint in range(checkpoints)]
+    log = [line for batch in batches for line in batch]
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("rewrite", "sink"):
+            path = Path(directory) / f"File_Watcher_{name}.log"
+            sink = LogSink() if name == "sink" else None
+            activity_log = list()
+            written = 0
+            timings = list()
+            for batch in batches:
+                activity_log += batch
+                # Time spent on the File Watcher thread for one checkpoint
+                start = time.perf_counter()
+                if name == "rewrite":
+                    with path.open('w') as file_watcher_log:
+                        file_watcher_log.writelines('\n'.join(activity_log))
+                    written += path.stat().st_size
+                else:
+                    sink.append(path, batch)
+                timings.append(time.perf_counter() - start)
+            results = dict()
+            if sink is not None:
+                close_start = time.perf_counter()
+                sink.close()
+                results = dict(close_ms=f"{1000 * (time.perf_counter() - close_start):.1f}",
+                               flushes=sink.flushes, fsyncs=sink.fsyncs)
+                written = path.stat().st_size
+            assert path.read_text().rstrip("\n") == "\n".join(log)
+            timings.sort()
+            report(f"log_sink[{name}]", checkpoints=checkpoints, watcher_total_ms=f"{1000 * sum(timings):.1f}",
+                   watcher_p99_us=f"{1e6 * percentile(timings, 0.99):.1f}", bytes_written=written, **results)
+
+
+def scan_split_matches(splits, pending, new_events):
+    # Matching by scanning: compare every pending split with every new item
+    matched = set()
+    for position in pending:
+        event, value = splits[position].event, splits[position].value
+        split_dict = split_value_dict(value)
+        for event_dict in new_events:
+            for key, event_value in event_dict.items():
+                if key.lower() != event.lower():
+                    continue
+                for item in event_value if type(event_value) is list else (event_value,):
+                    if dict_items_match(split_dict, item) if isinstance(item, dict) and split_dict is not None \
+                            else value.lower() == str(item).lower():
+                        matched.add(position)
+    return matched
+
+
+def bench_splits(split_count: int = 300, checkpoints: int = 300):
+    # A 100% route: one group holding every trigger and scroll split, which may complete in any order
+    rng = random.Random(15)
+    triggers = rng.sample(sorted(Teslagrad2Data.triggers), min(split_count, len(Teslagrad2Data.triggers)))
+    splits = [Split("triggersSet", trigger, "All") for trigger in triggers]
+    splits += [Split("scrollsPickedUp", str(scroll), "All") for scroll in range(split_count - len(splits))]
+    items = [(split.event, split.value) for split in splits] + [("triggersSet", f"Other{n}") for n in range(200)]
+    rng.shuffle(items)
+    batches = [items[start::checkpoints] for start in range(checkpoints)]
+    events = [[{"triggersSet": [value for event, value in batch if event == "triggersSet"]},
+               {"scrollsPickedUp": [value for event, value in batch if event == "scrollsPickedUp"]}]
+              for batch in batches]
+
+    start = time.perf_counter()
+    tracker = SplitTracker(splits)
+    compile_ms = 1000 * (time.perf_counter() - start)
+    pending = set(range(len(splits)))
+    timings = {"scan": list(), "index": list()}
+    for new_events in events:
+        start = time.perf_counter()
+        scanned = scan_split_matches(splits, pending, new_events)
+        timings["scan"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        completed = tracker.advance(new_events)
+        timings["index"].append(time.perf_counter() - start)
+        assert set(completed) == scanned
+        pending -= scanned
+    assert tracker.completed()
+    for name, samples in timings.items():
+        report(f"splits[{name}]", splits=len(splits), checkpoints=checkpoints,
+               checkpoint_median_us=f"{1e6 * statistics.median(samples):.1f}",
+               **(dict(compile_ms=f"{compile_ms:.2f}") if name == "index" else dict()))
+
+
+class TreeviewStandIn:
+    # Headless stand-in for ttk.Treeview that keeps its rows in order and counts the calls made to it
+    def __init__(self):
+        self.order = list()
+        self.rows = dict()
+        self.calls = 0
+        self.next_iid = 0
+
+    def insert(self, parent, index, iid=None, values=()):
+        self.calls += 1
+        if iid is None:
+            iid = f"I{self.next_iid}"
+            self.next_iid += 1
+        self.order.insert(len(self.order) if index == END else index, iid)
+        self.rows[iid] = list(values)
+        return iid
+
+    def delete(self, *iids):
+        self.calls += 1
+        for iid in iids:
+            self.order.remove(iid)
+            del self.rows[iid]
+
+    def move(self, iid, parent, index):
+        self.calls += 1
+        self.order.remove(iid)
+        self.order.insert(index, iid)
+
+    def item(self, iid, values=None):
+        self.calls += 1
+        if values is None:
+            return {"values": list(self.rows[iid])}
+        self.rows[iid] = list(values)
+
+    def set(self, iid, column, value):
+        self.calls += 1
+        self.rows[iid][column] = value
+
+    def get_children(self):
+        self.calls += 1
+        return tuple(self.order)
+
+    def index(self, iid):
+        self.calls += 1
+        return self.order.index(iid)
+
+    def selection_set(self, items):
+        self.calls += 1
+
+    def see(self, iid):
+        self.calls += 1
+
+    def values(self):
+        return [self.rows[iid] for iid in self.order]
+
+
+def rebuild_split_trees(tv_editor, tv_tracker):
+    # What every split edit did before: renumber the editor, then rebuild the tracker from the editor's rows
+    for iid in tv_editor.get_children():
+        tv_editor.set(iid, 0, tv_editor.index(iid) + 1)
+    for row in tv_tracker.get_children():
+        tv_tracker.delete(row)
+    for iid in tv_editor.get_children():
+        values = tv_editor.item(iid).get('values')
+        tv_tracker.insert('', END, values=(values[0], f"{values[1]}: {values[2]}" +
+                                                   (f" [{values[3]}]" if values[3] else ""), ""))
+    tv_tracker.selection_set(tv_tracker.get_children()[:1])
+
+
+def bench_split_edits(split_count: int = 400, edits: int = 200):
+    from TeslaTwoolsUI import SplitsView
+    rng = random.Random(16)
+    triggers = sorted(Teslagrad2Data.triggers)
+    splits = [Split("triggersSet", rng.choice(triggers), "All" if position % 3 else "") for position in
+              range(split_count)]
+    operations = [(rng.choice(("up", "down", "edit", "delete", "add")), rng.randrange(1, split_count - edits))
+                  for _ in range(edits)]
+
+    trees = dict()
+    for name in ("rebuild", "patch"):
+        tv_editor, tv_tracker = TreeviewStandIn(), TreeviewStandIn()
+        view = SplitsView(tv_editor, tv_tracker, SplitSet())
+        if name == "rebuild":
+            for split in splits:
+                tv_editor.insert('', END, values=("x", split.event, split.value, split.group))
+            rebuild_split_trees(tv_editor, tv_tracker)
+        else:
+            view.load(splits)
+        tv_editor.calls = tv_tracker.calls = 0
+        timings = list()
+        for operation, position in operations:
+            split = Split("scrollsPickedUp", str(position), "")
+            # Either way, the File Watcher recompiles the splits after every change
+            start = time.perf_counter()
+            if name == "rebuild":
+                iid = tv_editor.get_children()[position]
+                if operation in ("up", "down"):
+                    tv_editor.move(iid, '', position + (-1 if operation == "up" else 1))
+                elif operation == "edit":
+                    tv_editor.item(iid, values=("x", split.event, split.value, split.group))
+                elif operation == "delete":
+                    tv_editor.delete(iid)
+                else:
+                    tv_editor.insert('', END, values=("x", split.event, split.value, split.group))
+                rebuild_split_trees(tv_editor, tv_tracker)
+                SplitTracker(SplitSet.from_rows(tv_editor.item(iid).get('values')
+                                                for iid in tv_editor.get_children()))
+            else:
+                if operation in ("up", "down"):
+                    view.move(position, position + (-1 if operation == "up" else 1))
+                elif operation == "edit":
+                    view.replace(position, split)
+                elif operation == "delete":
+                    view.delete(position)
+                else:
+                    view.add(split)
+                view.clear_times()
+                view.select([0])
+                SplitTracker(view.split_set)
+            timings.append(time.perf_counter() - start)
+        trees[name] = (tv_editor.values(), [row[:2] for row in tv_tracker.values()])
+        report(f"split_edits[{name}]", splits=split_count, edits=edits,
+               edit_median_us=f"{1e6 * statistics.median(timings):.1f}",
+               treeview_calls_per_edit=f"{(tv_editor.calls + tv_tracker.calls) / edits:.1f}")
+    # Both ways must leave the Treeviews showing the same splits
+    assert trees["rebuild"] == trees["patch"]
+
+
+class LiveSplitStub(threading.Thread):
+    def __init__(self, port: int = 0):
+        """
+        Local stand-in for LiveSplit Server, recording every command line it receives with its arrival time.
+        :param port: Port to listen on, or 0 for any free port.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.listener = socket.socket()
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(("127.0.0.1", port))
+        self.listener.listen()
+        self.port = self.listener.getsockname()[1]
+        self.received = list()
+        self.connections = list()
+        self.accepted = 0
+        self.start()
+
+    def run(self):
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            self.connections.append(connection)
+            threading.Thread(target=self.receive, args=(connection,), daemon=True).start()
+
+    def receive(self, connection):
+        buffer = b""
+        while True:
+            try:
+                data = connection.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            arrived = time.perf_counter()
+            buffer += data
+            *lines, buffer = buffer.split(b"\r\n")
+            self.received += [(line.decode('utf-8'), arrived) for line in lines]
+
+    def stop(self):
+        # Shutting the sockets down wakes the threads blocked on them, which closing alone does not
+        for sock in [self.listener] + self.connections:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        self.join()
+
+
+def socket_per_command(port: int, command: str):
+    # The livesplit package's way: a new connection for every command, never closed
+    connection = socket.socket()
+    connection.connect(("127.0.0.1", port))
+    connection.send(f"{command}\r\n".encode('utf-8'))
+    return connection
+
+
+def wait_received(stub: LiveSplitStub, count: int, timeout_secs: float = 10.0):
+    deadline = time.perf_counter() + timeout_secs
+    while len(stub.received) < count and time.perf_counter() < deadline:
+        time.sleep(0.001)
+
+
+def bench_livesplit(commands: int = 500):
+    rng = random.Random(17)
+    sequence = [rng.choice(("split", "split", "split", "unpausegametime", "starttimer")) for _ in range(commands)]
+    for name in ("socket_per_command", "client"):
+        stub = LiveSplitStub()
+        client = LiveSplitClient(port=stub.port) if name == "client" else None
+        sockets = list()
+        sent_at = list()
+        timings = list()
+        for command in sequence:
+            # Time spent on the File Watcher thread for one command
+            start = time.perf_counter()
+            if client is not None:
+                client.send(command)
+            else:
+                sockets.append(socket_per_command(stub.port, command))
+            timings.append(time.perf_counter() - start)
+            sent_at.append(start)
+            # Checkpoints are far apart compared to a command, so give each one time to arrive
+            wait_received(stub, len(sent_at))
+        latencies = sorted(arrived - start for (_, arrived), start in zip(stub.received, sent_at))
+        timings.sort()
+        results = dict(connections=stub.accepted)
+        if client is not None:
+            client.close()
+        for connection in sockets:
+            connection.close()
+        stub.stop()
+        assert [line for line, _ in stub.received] == sequence
+        report(f"livesplit[{name}]", commands=commands, **results,
+               watcher_median_us=f"{1e6 * statistics.median(timings):.1f}",
+               delivered_median_us=f"{1e6 * statistics.median(latencies):.1f}",
+               delivered_p99_us=f"{1e6 * percentile(latencies, 0.99):.1f}")
+
+    # LiveSplit going away mid-run: commands sent while it is down are delivered in order once it is back
+    stub = LiveSplitStub()
+    port = stub.port
+    client = LiveSplitClient(port=port)
+    client.split()
+    wait_received(stub, 1)
+    stub.stop()
+    time.sleep(0.1)
+    outage_start = time.perf_counter()
+    for _ in range(5):
+        client.split()
+    time.sleep(1.0)
+    stub = LiveSplitStub(port)
+    wait_received(stub, 5)
+    recovered_ms = 1000 * (stub.received[-1][1] - outage_start) if stub.received else None
+    client.close()
+    stub.stop()
+    assert [line for line, _ in stub.received] == ["split"] * 5
+    report("livesplit[reconnect]", outage_ms=1000, recovered_ms=f"{recovered_ms:.0f}",
+           connects=client.connects, failed_connects=client.failed_connects, dropped=client.dropped)
+
+
+# The game time each split was recorded with by the stub LiveSplit: the game time set last before the split
+def stub_split_game_times(received):
+    game_times = list()
+    game_time = None
+    for line, _ in received:
+        if line.startswith("setgametime "):
+            hours, minutes, seconds = line.split(" ", 1)[1].split(":")
+            game_time = timedelta(hours=int(hours), minutes=int(minutes), seconds=float(seconds))
+        elif line == "split":
+            game_times.append(game_time)
+    return game_times
+
+
+def drain_rendered(channel: UpdateChannel, running: threading.Event, frame_secs: float = 1 / 60):
+    # Stand-in for the Tk main loop, marking every watch rendered at the frame after it was published
+    while running.is_set():
+        time.sleep(frame_secs)
+        for update in channel.drain():
+            if update.timing is not None:
+                update.timing.mark("rendered")
+
+
+def watch_split_run(backend: str, timing: str, checkpoints: int, rng: random.Random, diagnostics: bool = False):
+    """
+    Play a run against a File Watcher sending its splits to a stub LiveSplit: a new game, then one split per
+    checkpoint, each saved at a random moment like the game would.
+    :return: The stopped watcher, the stopped stub, and the true time of each split.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        save_file = Teslagrad2Data.SaveFile([generate_slot(0.2, rng)])
+        save_file.save_file_path = Path(directory) / 'Saves.yaml'
+        save_file.checksum = lambda: None
+        save_file.write()
+
+        stub = LiveSplitStub()
+        channel = UpdateChannel()
+        try:
+            watcher = FileWatcher(channel, notifier_backend=backend, save_directory=Path(directory))
+        except OSError:
+            stub.stop()
+            raise
+        watcher.timings.enabled = diagnostics
+        running = threading.Event()
+        running.set()
+        renderer = threading.Thread(target=drain_rendered, args=(channel, running))
+        renderer.start()
+        watcher.livesplit_address = ("127.0.0.1", stub.port)
+        watcher.livesplit_timing = timing
+        watcher.measure_split_timing = True
+        watcher.livesplit_connect()
+        split_triggers = [trigger for trigger in Teslagrad2Data.triggers
+                          if trigger not in save_file.saveDataSlots[0].triggersSet][:checkpoints]
+        watcher.load_splits([Split("triggersSet", trigger) for trigger in split_triggers])
+        time.sleep(0.3)
+
+        slot = Teslagrad2Data.SaveSlot()
+        slot.triggersSet = list()
+        save_file.saveDataSlots.append(slot)
+        save_file.write()
+        started = slot.dateModified
+        true_times = list()
+        for trigger in split_triggers:
+            time.sleep(rng.uniform(0.2, 0.6))
+            slot.dateModified = datetime.now(started.tzinfo)
+            slot.triggersSet = slot.triggersSet + [trigger]
+            save_file.write()
+            true_times.append(slot.dateModified - started)
+        time.sleep(0.5)
+        watcher.stop()
+        running.clear()
+        renderer.join()
+        stub.stop()
+    return watcher, stub, true_times
+
+
+def bench_split_timing(checkpoints: int = 10):
+    rng = random.Random(18)
+    for backend, timing in itertools.product(("inotify", "polling"), ("detected", "compensated")):
+        try:
+            watcher, stub, true_times = watch_split_run(backend, timing, checkpoints, rng)
+        except OSError as e:
+            report(f"split_timing[{backend}, {timing}]", skipped=e)
+            continue
+        if timing == "detected":
+            # LiveSplit times the splits itself, from the moment it was told to start
+            start_arrival = next(arrived for line, arrived in stub.received if line == "starttimer")
+            split_times = [timedelta(seconds=arrived - start_arrival)
+                           for line, arrived in stub.received if line == "split"]
+        else:
+            split_times = stub_split_game_times(stub.received)
+        assert len(split_times) == checkpoints
+        errors = sorted(abs((split_time - true_time).total_seconds()) for split_time, true_time
+                        in zip(split_times, true_times))
+        latencies = sorted(latency.total_seconds() for _, latency, _ in watcher.split_timings)
+        corrections = sorted(abs(correction.total_seconds()) for _, _, correction in watcher.split_timings)
+        report(f"split_timing[{backend}, {timing}]", splits=checkpoints,
+               error_median_ms=f"{1000 * statistics.median(errors):.1f}", error_max_ms=f"{1000 * errors[-1]:.1f}",
+               latency_median_ms=f"{1000 * statistics.median(latencies):.1f}",
+               correction_median_ms=f"{1000 * statistics.median(corrections):.1f}")
+
+
+def bench_timings(watches: int = 100000, checkpoints: int = 10):
+    # Cost of timing on the File Watcher thread per watch, as watch() calls it
+    mtime_ns = time.time_ns()
+    for enabled in (False, True):
+        timings = PipelineTimings(enabled)
+        start = time.perf_counter_ns()
+        for _ in range(watches):
+            timing = timings.begin(mtime_ns)
+            if timing is not None:
+                timing.mark("read")
+            if timing is not None:
+                timing.mark_analysis(1000, 1000)
+            if timing is not None:
+                timing.mark("matched")
+        report(f"timings[{'enabled' if enabled else 'disabled'}]", watches=watches,
+               per_watch_ns=f"{(time.perf_counter_ns() - start) / watches:.0f}")
+
+    # The histogram's percentiles against the exact ones
+    rng = random.Random(19)
+    samples = sorted(int(rng.lognormvariate(14, 1.5)) for _ in range(watches))
+    histogram = StageHistogram()
+    for sample in samples:
+        histogram.add(sample)
+    worst = max(abs(histogram.percentile_ns(fraction) - percentile(samples, fraction)) / percentile(samples, fraction)
+                for fraction in (0.5, 0.9, 0.99, 0.999))
+    report("timings[histogram]", samples=watches, buckets=len(histogram.buckets),
+           worst_percentile_error_pct=f"{100 * worst:.1f}")
+
+    # The stages of a real run, from the game writing the save to the split being sent and drawn
+    try:
+        watcher, _, _ = watch_split_run("polling", "compensated", checkpoints, rng, diagnostics=True)
+    except OSError as e:
+        report("timings[stages]", skipped=e)
+        return
+    for stage, count, mean, p50, p90, p99, maximum in watcher.timings.rows():
+        report(f"timings[{stage}]", count=count, mean_ms=f"{mean:.2f}", p50_ms=f"{p50:.2f}",
+               p99_ms=f"{p99:.2f}", max_ms=f"{maximum:.2f}")
+
+
+# Median time and peak memory of a benchmarked call. Memory is traced on a separate run, as tracing slows it down.
+def timed_call(function, repeat: int):
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def bench_save_io(slot_counts=(1, 10, 30), progress_levels=(0.1, 0.5, 1.0), repeat: int = 3):
+    rng = random.Random(20)
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'Saves.yaml'
+        for slot_count, progress in itertools.product(slot_counts, progress_levels):
+            save_file = generate_save_file(slot_count, progress, rng)
+            data = save_file_text(save_file.saveDataSlots, Path(directory)).encode('utf-8')
+            following = [next_checkpoint(slot, rng) for slot in save_file.saveDataSlots]
+            following_data = save_file_text(following, Path(directory)).encode('utf-8')
+            name = f"{slot_count} slots, {progress:.0%}"
+
+            def read():
+                Teslagrad2Data.SaveFile().read(data)
+
+            def write():
+                written = Teslagrad2Data.SaveFile(save_file.saveDataSlots)
+                written.save_file_path = path
+                written.write()
+
+            def checksum():
+                Teslagrad2Data.SaveFile(save_file.saveDataSlots).checksum()
+
+            def diff():
+                for prev_slot, slot in zip(save_file.saveDataSlots, following):
+                    Teslagrad2Diff.diff_slots(prev_slot, slot)
+
+            # The watch loop's parse and diff of each version against the one before, alternating between the two
+            analyzer = SaveAnalyzer()
+            versions = itertools.cycle((following_data, data))
+            analyzer.analyze(data)
+
+            def watch():
+                analyzer.analyze(next(versions))
+
+            for stage, function in (("read", read), ("write", write), ("checksum", checksum), ("diff", diff),
+                                    ("watch", watch)):
+                median, peak = timed_call(function, repeat)
+                throughput = dict(mib_per_sec=f"{len(data) / median / 2 ** 20:.2f}") \
+                    if stage in ("read", "write", "watch") else dict(slots_per_sec=f"{slot_count / median:.0f}")
+                report(f"save_io[{stage}, {name}]", kib=len(data) // 1024, median_ms=f"{1000 * median:.2f}",
+                       **throughput, peak_kib=peak // 1024)
+
+
+def bench_cli_startup(runs: int = 5):
+    # Time from launching the headless watcher to its first event, and whether it imported Tk on the way
+    rng = random.Random(21)
+    with tempfile.TemporaryDirectory() as directory:
+        save_file_text([generate_slot(0.3, rng)], Path(directory))
+        timings = list()
+        for _ in range(runs):
+            start = time.perf_counter()
+            command = [sys.executable, "-X", "importtime", str(Path(__file__).parent / "TeslaTwoolsCLI.py"),
+                       "--save-directory", directory]
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            first_event = process.stdout.readline()
+            timings.append(time.perf_counter() - start)
+            process.terminate()
+            _, imports = process.communicate()
+            assert '"state": "save_file_found"' in first_event
+        report("cli_startup", runs=runs, first_event_median_ms=f"{1000 * statistics.median(timings):.0f}",
+               imports_tkinter=any(line.rstrip().endswith(" tkinter") for line in imports.splitlines()))
+
+
+def full_run_history(rng: random.Random, other_slots: int = 2):
+    """
+    The versions of the save file written during a full run, from a new game to every piece of equipment and boss,
+    next to other slots that stay as they are.
+    :return: The (modified time in nanoseconds, contents) of each version, and the run's slot at the end.
+    """
+    slots = [generate_slot(rng.random(), rng) for _ in range(other_slots)]
+    slot = generate_slot(0, rng)
+    versions = list()
+    with tempfile.TemporaryDirectory() as directory:
+        versions.append((time.time_ns(), save_file_text(slots, Path(directory)).encode('utf-8')))
+        while True:
+            versions.append((round(slot.dateModified.timestamp() * 1e9),
+                             save_file_text(slots + [slot], Path(directory)).encode('utf-8')))
+            if all(getattr(slot, flag) for _, flag, _ in progression):
+                break
+            slot = next_checkpoint(slot, rng)
+    # The file existed before the run started
+    versions[0] = (versions[1][0] - 10 ** 10, versions[0][1])
+    return versions, slot
+
+
+def bench_replay(speed: float = 500.0, paced_versions: int = 20):
+    # Record a full run to a save history, read it back, and replay it through a File Watcher tracking a split per
+    # piece of equipment and boss, as fast as possible and then paced
+    rng = random.Random(22)
+    versions, _ = full_run_history(rng)
+    splits = [Split(flag, "True") for _, flag, _ in progression]
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "Save_History.history"
+        start = time.perf_counter()
+        recorder = SaveHistoryRecorder(path)
+        for mtime_ns, data in versions:
+            recorder.record(data, mtime_ns)
+        recorder.close()
+        record_secs = time.perf_counter() - start
+        start = time.perf_counter()
+        replayed = list(read_save_history(path))
+        read_secs = time.perf_counter() - start
+        assert replayed == versions
+        raw_bytes = sum(len(data) for _, data in versions)
+        report("replay[record]", versions=len(versions), raw_kib=raw_bytes // 1024,
+               history_kib=path.stat().st_size // 1024, ratio=f"{raw_bytes / path.stat().st_size:.0f}x",
+               record_ms_per_version=f"{1000 * record_secs / len(versions):.2f}",
+               read_ms_per_version=f"{1000 * read_secs / len(versions):.2f}")
+
+        for label, replay_speed, replay_versions in (("max", None, replayed),
+                                                     (f"{speed:g}x", speed, replayed[1:paced_versions + 1])):
+            channel = UpdateChannel()
+            watcher = FileWatcher(channel, save_directory=Path(directory), watch_save_file=False)
+            watcher.load_splits(splits)
+            start = time.perf_counter()
+            replay = SaveHistoryReplay(watcher, replay_versions, replay_speed)
+            replay.join()
+            replay_secs = time.perf_counter() - start
+            watcher.stop()
+            updates = channel.drain()
+            completed = sum(len(update.completed_splits) for update in updates)
+            recorded_secs = (replay_versions[-1][0] - replay_versions[0][0]) / 1e9
+            results = dict(versions=replay.versions_replayed, replay_secs=f"{replay_secs:.2f}",
+                           recorded_secs=f"{recorded_secs:.0f}", splits_completed=f"{completed}/{len(splits)}")
+            if replay_speed is not None:
+                results["expected_secs"] = f"{recorded_secs / replay_speed:.2f}"
+            else:
+                results["ms_per_version"] = f"{1000 * replay_secs / len(replay_versions):.2f}"
+            report(f"replay[{label}]", **results)
+
+
+def bench_snapshots(checkpoints: int = 1000, keyframe_intervals=(8, 32, 128), lookups: int = 1000):
+    # Store a long run as keyframes and field deltas, against a full copy of every checkpoint, and time
+    # reconstructing checkpoints at random and in order
+    rng = random.Random(23)
+    slots = [generate_slot(0, rng)]
+    for _ in range(checkpoints - 1):
+        slots.append(next_checkpoint(slots[-1], rng))
+    exported = [slot.export() for slot in slots]
+    full_copies = [json.dumps(fields, separators=(',', ':')).encode('utf-8') for fields in exported]
+    full_bytes = sum(len(copy) for copy in full_copies)
+    report("snapshots[full]", checkpoints=checkpoints, json_kib=full_bytes // 1024,
+           zlib_each_kib=sum(len(zlib.compress(copy, 9)) for copy in full_copies) // 1024)
+    indices = [rng.randrange(checkpoints) for _ in range(lookups)]
+    for codec in ("zlib", "lzma"):
+        for interval in keyframe_intervals:
+            store = SlotSnapshotStore(interval, codec)
+            start = time.perf_counter()
+            for slot in slots:
+                store.append(slot)
+            append_secs = time.perf_counter() - start
+            store.seal_block()
+            stored = store.storage_bytes()
+            random_ns = list()
+            for index in indices:
+                store.cached_block_number = None
+                start = time.perf_counter_ns()
+                fields = store.fields(index)
+                random_ns.append(time.perf_counter_ns() - start)
+                assert fields == exported[index]
+            random_ns.sort()
+            start = time.perf_counter()
+            for index in range(checkpoints):
+                store.fields(index)
+            sequential_secs = time.perf_counter() - start
+            report(f"snapshots[{codec},{interval}]", blocks=len(store.blocks), stored_kib=f"{stored / 1024:.1f}",
+                   ratio=f"{full_bytes / stored:.0f}x", append_us=f"{1e6 * append_secs / checkpoints:.0f}",
+                   random_p50_us=f"{percentile(random_ns, 0.5) / 1000:.0f}",
+                   random_p99_us=f"{percentile(random_ns, 0.99) / 1000:.0f}",
+                   sequential_us=f"{1e6 * sequential_secs / checkpoints:.0f}")
+
+
+def synthetic_run_events(rng: random.Random, checkpoints: int):
+    """
+    The new events of each checkpoint of a run, a few triggers and a scene each time, with the next piece of
+    equipment or boss every so often, and the splits on them.
+    :return: The (playtime, new events) of each checkpoint and the (position, event, value, time) of each split.
+    """
+    playtime = timedelta()
+    checkpoint_events = list()
+    splits = list()
+    for checkpoint in range(checkpoints):
+        playtime += timedelta(seconds=rng.uniform(5, 90))
+        new_events = [{"respawnScene": rng.choice(list(Teslagrad2Data.scenes.keys()))},
+                      {"triggersSet": rng.sample(Teslagrad2Data.triggers, 3)}]
+        if checkpoint % (checkpoints // len(progression)) == 0 and len(splits) < len(progression):
+            flag = progression[len(splits)][1]
+            new_events.append({flag: "True"})
+            splits.append((len(splits), flag, "True", playtime))
+        checkpoint_events.append((playtime, new_events))
+    return checkpoint_events, splits
+
+
+def bench_archive(runs: int = 2000, checkpoints: int = 100, log_runs: int = 200, repeat: int = 20):
+    # Archive thousands of runs through the archive's thread, time the queries the archive is for, and compare
+    # importing and scanning log files
+    rng = random.Random(24)
+    with tempfile.TemporaryDirectory() as directory:
+        archive = RunArchive(Path(directory) / "Runs.sqlite3")
+        start = time.perf_counter()
+        for _ in range(runs):
+            checkpoint_events, splits = synthetic_run_events(rng, checkpoints)
+            archive.start_run(datetime.now(), 1)
+            for (playtime, new_events), split in itertools.zip_longest(checkpoint_events, splits):
+                archive.add_events(playtime, [(key, item) for event in new_events for key, value in event.items()
+                                              for item in (value if isinstance(value, list) else [value])])
+                if split is not None:
+                    archive.add_splits([split])
+            archive.complete_run(datetime.now())
+        queued_secs = time.perf_counter() - start
+        archive.close()
+        write_secs = time.perf_counter() - start
+        transactions = archive.transactions
+        archive = RunArchive(Path(directory) / "Runs.sqlite3")
+        events, = archive.query("SELECT COUNT(*) FROM events")[0]
+        report("archive[write]", runs=runs, events=events, transactions=transactions,
+               queued_us_per_checkpoint=f"{1e6 * queued_secs / (runs * checkpoints):.1f}",
+               rows_per_sec=f"{events / write_secs:.0f}",
+               db_mib=f"{sum(path.stat().st_size for path in Path(directory).glob('Runs.sqlite3*')) / 2 ** 20:.1f}")
+        queries = (("hits[boss]", lambda: archive.event_hits("hulderBossfightBeaten", "True")),
+                   ("hits[trigger]", lambda: archive.event_hits("triggersSet", Teslagrad2Data.triggers[0])),
+                   ("best_segments", archive.best_segments))
+        for label, query in queries:
+            timings = list()
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows = query()
+                timings.append(time.perf_counter() - start)
+            report(f"archive[{label}]", rows=len(rows), median_ms=f"{1000 * statistics.median(timings):.2f}")
+        archive.close()
+
+        # The same run as activity and completed run logs, many times over
+        logs = Path(directory) / "logs"
+        logs.mkdir()
+        checkpoint_events, splits = synthetic_run_events(rng, checkpoints)
+        activity = ["New Game started at 2023-05-20 19:47:21.000000"]
+        activity += [f"[{playtime}] {key}: {'+' if isinstance(value, list) else ''}{item}"
+                     for playtime, new_events in checkpoint_events for event in new_events
+                     for key, value in event.items() for item in (value if isinstance(value, list) else [value])]
+        completed = [f"{position + 1}|{event}: {value}|{timespan}" for position, event, value, timespan in splits]
+        for run in range(log_runs):
+            name = (datetime(2023, 5, 20) + timedelta(hours=run)).strftime('%Y%m%d_%H%M%S')
+            (logs / f"File_Watcher_{name}.log").write_text("\n".join(activity) + "\n")
+            (logs / f"Completed_Run_{name}.log").write_text("\n".join(completed) + "\n")
+        archive = RunArchive(Path(directory) / "Imported.sqlite3")
+        start = time.perf_counter()
+        imported, _ = archive.import_logs(logs)
+        import_secs = time.perf_counter() - start
+        start = time.perf_counter()
+        scanned = [line for path in logs.glob("File_Watcher_*.log") for line in path.open('r')
+                   if "hulderBossfightBeaten: True" in line]
+        scan_secs = time.perf_counter() - start
+        start = time.perf_counter()
+        rows = archive.event_hits("hulderBossfightBeaten", "True")
+        query_secs = time.perf_counter() - start
+        assert len(rows) == len(scanned) == log_runs
+        report("archive[import]", files=imported, import_ms_per_file=f"{1000 * import_secs / imported:.2f}",
+               scan_logs_ms=f"{1000 * scan_secs:.1f}", query_ms=f"{1000 * query_secs:.2f}")
+        archive.close()
+
+
+def bench_statistics(runs: int = 10000, repeat: int = 5):
+    # Load the split times of thousands of archived runs and compute their segment statistics at once, then count
+    # one more run incrementally, against the same statistics in plain Python
+    rng = random.Random(25)
+    splits = [Split(flag, "True") for _, flag, _ in progression]
+    with tempfile.TemporaryDirectory() as directory:
+        archive = RunArchive(Path(directory) / "Runs.sqlite3")
+        for _ in range(runs):
+            archive.start_run(datetime.now(), 1)
+            _, run_splits = synthetic_run_events(rng, 100)
+            archive.add_splits(run_splits)
+            archive.complete_run(datetime.now())
+        archive.close()
+        archive = RunArchive(Path(directory) / "Runs.sqlite3")
+        load_secs, recompute_secs = list(), list()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run_times = archive.split_times([(split.event, split.value) for split in splits])
+            loaded = time.perf_counter()
+            split_statistics = SplitStatistics.from_times(run_times)
+            split_statistics.rows()
+            load_secs.append(loaded - start)
+            recompute_secs.append(time.perf_counter() - loaded)
+        archive.close()
+        start = time.perf_counter()
+        segments = [[run[0]] + [later - earlier for earlier, later in zip(run, run[1:])]
+                    for run in run_times.tolist()]
+        for column in zip(*segments):
+            min(column), statistics.median(column), statistics.quantiles(column, n=10), statistics.pstdev(column)
+        python_secs = time.perf_counter() - start
+        new_run = run_times[0].tolist()
+        start = time.perf_counter()
+        for _ in range(100):
+            split_statistics.add_run(new_run)
+            split_statistics.sum_of_best()
+        add_secs = (time.perf_counter() - start) / 100
+        start = time.perf_counter()
+        split_statistics.rows()
+        rows_secs = time.perf_counter() - start
+        report("statistics", runs=len(run_times), splits=len(splits),
+               load_ms=f"{1000 * statistics.median(load_secs):.1f}",
+               recompute_ms=f"{1000 * statistics.median(recompute_secs):.1f}", python_ms=f"{1000 * python_secs:.1f}",
+               add_run_us=f"{1e6 * add_secs:.0f}", rows_after_add_ms=f"{1000 * rows_secs:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TeslaTwools benchmarks")
+    benchmarks = ["notify", "parse", "diff", "jitter", "activity_log", "labels", "log_sink", "soak", "splits",
+                  "split_edits", "livesplit", "split_timing", "timings", "save_io",
+                  "cli_startup", "replay", "snapshots", "archive", "statistics"]
+    parser.add_argument("benchmarks", nargs="*", default=benchmarks,
+                        help=f"Benchmarks to run: {', '.join(benchmarks)}")
+    parser.add_argument("--slots", type=int, nargs="+", default=[1, 10, 30],
+                        help="Save slot counts of the files generated for save_io")
+    parser.add_argument("--progress", type=float, nargs="+", default=[0.1, 0.5, 1.0],
+                        help="Shares of the game played in the slots generated for save_io, from 0 to 1")
+    args = parser.parse_args()
+    if "notify" in args.benchmarks:
+        for backend in ("inotify", "polling"):
+            try:
+                bench_notify(backend)
+            except OSError as e:
+                report(f"notify[{backend}]", skipped=e)
+    if "parse" in args.benchmarks:
+        bench_parse()
+    if "diff" in args.benchmarks:
+        bench_diff()
+    if "jitter" in args.benchmarks:
+        bench_jitter()
+    if "activity_log" in args.benchmarks:
+        bench_activity_log()
+    if "labels" in args.benchmarks:
+        bench_labels()
+    if "log_sink" in args.benchmarks:
+        bench_log_sink()
+    if "soak" in args.benchmarks:
+        bench_soak()
+    if "splits" in args.benchmarks:
+        bench_splits()
+    if "split_edits" in args.benchmarks:
+        bench_split_edits()
+    if "livesplit" in args.benchmarks:
+        bench_livesplit()
+    if "split_timing" in args.benchmarks:
+        bench_split_timing()
+    if "timings" in args.benchmarks:
+        bench_timings()
+    if "save_io" in args.benchmarks:
+        bench_save_io(args.slots, args.progress)
+    if "cli_startup" in args.benchmarks:
+        bench_cli_startup()
+    if "replay" in args.benchmarks:
+        bench_replay()
+    if "snapshots" in args.benchmarks:
+        bench_snapshots()
+    if "archive" in args.benchmarks:
+        bench_archive()
+    if "statistics" in args.benchmarks:
+        bench_statistics()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+import csv
+import sys
+import json
+import argparse
+import multiprocessing
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, TextIO
+
+from TeslaTwoolsStatus import States, VERSION
+from TeslaTwoolsChannel import UpdateChannel, WatcherUpdate
+from TeslaTwoolsSplits import Split, SplitSet
+from TeslaTwoolsWatcher import FileWatcher
+from TeslaTwoolsHistory import SaveHistoryReplay, read_save_history
+
+
+# JSON has no durations or dates: durations are written as seconds and dates in ISO format
+def json_value(value):
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def read_splits(paths: List[Path]) -> List[Split]:
+    # Splits files as saved from the Splits tab, one after the other
+    splits = list()
+    for path in paths:
+        with path.open('r') as splits_file:
+            splits += SplitSet.from_rows(csv.reader(splits_file, delimiter='|'))
+    return splits
+
+
+# How fast to replay a save history: a multiple of real time, or "max" for as fast as possible
+def replay_speed(text: str) -> float:
+    if text == "max":
+        return None
+    speed = float(text)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("the replay speed must be positive, or max")
+    return speed
+
+
+class EventWriter:
+    def __init__(self, stream: TextIO, splits: List[Split], include_log: bool = True):
+        """
+        Writes the File Watcher's updates as newline-delimited JSON, one object per update.
+        Updates that change nothing are left out, as is a missing save file that is still missing.
+        :param stream: Where to write the events, usually standard output.
+        :param splits: The splits the watcher is tracking, to describe the completed ones.
+        :param include_log: Whether each event carries the activity log lines added since the previous one.
+        """
+        self.stream = stream
+        self.splits = splits
+        self.include_log = include_log
+        self.prev_state: States = None
+        # The activity log written so far, up to log_written lines of the log with the given id
+        self.log_id: int = None
+        self.log_written = 0
+        self.events_written = 0
+
+    def record(self, update: WatcherUpdate) -> Dict[str, Any]:
+        record = {"time": datetime.now().astimezone().isoformat(), "state": update.state.name.lower()}
+        if update.state in (States.NO_SAVE_FILE, States.SAVE_FILE_FOUND, States.SAVE_FILE_EDITED):
+            record["save_path"] = str(update.save_path)
+        if update.state in (States.SAVE_SLOT_ADDED, States.SAVE_SLOT_DELETED, States.SAVE_SLOT_UPDATED):
+            record["slot"] = update.active_slot_number
+        if update.state == States.SAVE_SLOT_ADDED:
+            record["started"] = update.start_datetime
+        if update.state == States.SAVE_SLOT_UPDATED:
+            record.update(name=update.slot_name, scene=update.respawn_scene, respawn_point=update.respawn_point,
+                          time_spent=update.time_spent, real_playtime=update.real_playtime)
+            # Lists that gained nothing are left out
+            record["new_events"] = [{key: value} for event in update.new_events for key, value in event.items()
+                                    if value != list()]
+        if update.completed_splits:
+            record["completed_splits"] = [{"number": position + 1, "event": self.splits[position].event,
+                                           "value": self.splits[position].value, "time": timespan}
+                                          for position, timespan in update.completed_splits]
+            record["pending_splits"] = [position + 1 for position in update.pending_splits]
+        if self.include_log and update.activity_log is not None:
+            if update.activity_log_id != self.log_id:
+                self.log_id = update.activity_log_id
+                self.log_written = 0
+            lines = update.activity_log[self.log_written:update.activity_log_count]
+            self.log_written = update.activity_log_count
+            if lines:
+                record["log"] = lines
+        return record
+
+    def write(self, update: WatcherUpdate):
+        if update.state in (States.INITIALIZED, States.UNCHANGED) or \
+                (update.state == States.NO_SAVE_FILE and self.prev_state == States.NO_SAVE_FILE):
+            return
+        self.prev_state = update.state
+        self.stream.write(json.dumps(self.record(update), default=json_value) + "\n")
+        self.stream.flush()
+        self.events_written += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless File Watcher for Teslagrad 2, writing one JSON event "
+                                                 "per line to standard output")
+    parser.add_argument("splits", nargs="*", type=Path,
+                        help="Splits files saved from the Splits tab, tracked in order")
+    parser.add_argument("--save-directory", type=Path,
+                        help="Directory holding Saves.yaml, if not the game's own")
+    parser.add_argument("--worker-process", action="store_true",
+                        help="Parse and diff the save file in a separate process")
+    parser.add_argument("--livesplit", action="store_true",
+                        help="Interface with LiveSplit Server")
+    parser.add_argument("--livesplit-timing", choices=("compensated", "ingame", "detected"), default="compensated",
+                        help="Set LiveSplit's game time to the split time read from the save (compensated), to the "
+                             "in-game timer (ingame), or only send splits as they are detected (detected)")
+    parser.add_argument("--save-log", action="store_true",
+                        help="Save File Watcher events to a log file")
+    parser.add_argument("--save-run", action="store_true",
+                        help="Save logs of completed splits")
+    parser.add_argument("--no-activity-log", action="store_true",
+                        help="Leave the activity log lines out of the events")
+    parser.add_argument("--record-history", action="store_true",
+                        help="Record every version of the save file to a save history in the save directory")
+    parser.add_argument("--archive", action="store_true",
+                        help="Record runs, splits and events to the run archive in the save directory")
+    parser.add_argument("--replay", type=Path, metavar="HISTORY",
+                        help="Replay a recorded save history instead of watching the save file")
+    parser.add_argument("--speed", type=replay_speed, default=None, metavar="N|max",
+                        help="Replay N times as fast as it was recorded, or as fast as possible (max, the default)")
+    args = parser.parse_args()
+    splits = read_splits(args.splits)
+
+    channel = UpdateChannel()
+    watcher = FileWatcher(channel, use_worker_process=args.worker_process, save_directory=args.save_directory,
+                          watch_save_file=args.replay is None)
+    watcher.livesplit_timing = args.livesplit_timing
+    watcher.save_log_enabled = args.save_log
+    watcher.save_run_enabled = args.save_run
+    watcher.load_splits(splits)
+    if args.livesplit:
+        watcher.livesplit_connect()
+    if args.record_history:
+        watcher.history_start()
+    if args.archive:
+        watcher.archive_open()
+    writer = EventWriter(sys.stdout, splits, include_log=not args.no_activity_log)
+    replay = None
+    # While replaying, check often for the replay being over
+    timeout_secs = watcher.wakeup_timeout_secs if args.replay is None else 0.05
+    if args.replay is not None:
+        print(f"TeslaTwools version {VERSION}, replaying {args.replay}", file=sys.stderr)
+        replay = SaveHistoryReplay(watcher, read_save_history(args.replay), args.speed)
+    else:
+        print(f"TeslaTwools version {VERSION}, watching {watcher.save_path}", file=sys.stderr)
+    try:
+        while replay is None or replay.is_alive():
+            for update in channel.wait(timeout_secs):
+                writer.write(update)
+            # Keep looking for a missing save file, as the Retry button does in the window
+            if watcher.state == States.NO_SAVE_FILE:
+                watcher.filewatcher_active = True
+        # The replay is over, so whatever it published is all there is
+        for update in channel.drain():
+            writer.write(update)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if replay is not None:
+            replay.stop()
+        watcher.stop()
+        print(", ".join(f"{count} {name}" for name, count in watcher.counters().items()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    # Needed for the worker process when running as a frozen executable
+    multiprocessing.freeze_support()
+    main()
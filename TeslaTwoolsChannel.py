@@ -0,0 +1,102 @@
+import queue
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from TeslaTwoolsStatus import States
+from TeslaTwoolsActivityLog import ActivityLog
+from TeslaTwoolsTimings import WatchTiming
+
+
+class WatcherUpdate:
+    def __init__(self, state: States, save_path: Path):
+        """
+        A snapshot of the File Watcher taken at the end of one watch, holding everything the UI draws.
+        The watcher never changes a snapshot once it has been published, so the UI can read it from the Tk thread.
+        :param state: The state of the File Watcher after the watch.
+        :param save_path: Path of the Teslagrad 2 save file.
+        """
+        self.state: States = state
+        self.save_path: Path = save_path
+        self.active_slot_number: int = None
+        # Name, scene and coordinates of the updated save slot
+        self.slot_name: str = None
+        self.respawn_scene: str = None
+        self.respawn_point: Dict[str, Any] = dict()
+        self.time_spent: timedelta = None
+        self.real_playtime: timedelta = None
+        self.start_datetime: datetime = None
+        self.new_events: List[Dict[str, Any]] = list()
+        # The activity log as of this watch: its first activity_log_count lines. The id changes whenever the
+        # watcher clears the log.
+        self.activity_log: ActivityLog = None
+        self.activity_log_count: int = 0
+        self.activity_log_id: int = 0
+        # Splits completed by this watch as (position in the split list, timespan), for the split list with the
+        # given generation
+        self.splits_generation: int = 0
+        self.completed_splits: List[Tuple[int, timedelta]] = list()
+        # Positions of the splits that may complete next, several when the current stage is a group
+        self.pending_splits: List[int] = list()
+        # Stage timings of the watch, which the UI marks rendered once it has drawn it. None while not timing.
+        self.timing: WatchTiming = None
+
+
+def coalesce(updates: List[WatcherUpdate]) -> WatcherUpdate:
+    """
+    Fold the updates published since the last frame into the single update that gets drawn.
+    The latest update wins, but the new events of consecutive slot updates are kept together,
+    and every completed split is kept so the tracker does not miss one.
+    :param updates: The pending updates, oldest first.
+    :return: The update to draw, or None if none of them changes what is on screen.
+    """
+    updates = [update for update in updates if update.state not in (States.INITIALIZED, States.UNCHANGED)]
+    if not updates:
+        return None
+    latest = updates[-1]
+    drawn = WatcherUpdate(latest.state, latest.save_path)
+    drawn.__dict__.update(vars(latest))
+    drawn.completed_splits = [completed for update in updates
+                              if update.splits_generation == latest.splits_generation
+                              for completed in update.completed_splits]
+    if latest.state == States.SAVE_SLOT_UPDATED:
+        drawn.new_events = list()
+        for update in reversed(updates):
+            if update.state != States.SAVE_SLOT_UPDATED:
+                break
+            drawn.new_events[:0] = update.new_events
+    return drawn
+
+
+class UpdateChannel:
+    def __init__(self):
+        """
+        Hands WatcherUpdate snapshots from the File Watcher thread to its consumer: the Tk main loop, which drains
+        the channel on a timer, or the headless watcher. The watcher only ever puts snapshots in the channel and
+        never calls into its consumer itself.
+        """
+        self.updates: queue.SimpleQueue = queue.SimpleQueue()
+        self.published: int = 0
+        self.drawn: int = 0
+
+    def publish(self, update: WatcherUpdate):
+        self.published += 1
+        self.updates.put(update)
+
+    def drain(self) -> List[WatcherUpdate]:
+        # Take every pending update without blocking the Tk main loop
+        updates = list()
+        while True:
+            try:
+                updates.append(self.updates.get_nowait())
+            except queue.Empty:
+                return updates
+
+    def wait(self, timeout_secs: float) -> List[WatcherUpdate]:
+        # Block until an update is published or the timeout passes, then take every pending update.
+        # For consumers without a main loop of their own, such as the headless watcher.
+        try:
+            first = self.updates.get(timeout=timeout_secs)
+        except queue.Empty:
+            return list()
+        return [first] + self.drain()
@@ -0,0 +1,186 @@
+import time
+import zlib
+import queue
+import struct
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple
+
+# A save history file starts with this line, then holds one record per version of the save file
+MAGIC = b"TeslaTwools save history 1\n"
+# Modified time of the version, and the length of the bytes it shares with the previous version at its start and at
+# its end, and of the compressed bytes in between that follow the header
+RECORD_HEADER = struct.Struct("<qIII")
+# zlib only looks this far back, in the data and in its preset dictionary
+ZLIB_WINDOW = 32768
+
+
+def common_prefix_length(first: bytes, second: bytes) -> int:
+    # Binary search on slice comparisons, which run in C
+    low, high = 0, min(len(first), len(second))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[:middle] == second[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def common_suffix_length(first: bytes, second: bytes, limit: int) -> int:
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[len(first) - middle:] == second[len(second) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def encode_version(previous: bytes, data: bytes, mtime_ns: int) -> bytes:
+    """
+    Encode a version of the save file against the version before it. The game only rewrites the slot being played,
+    so everything before and after the changed region is stored as a length, and the changed region is compressed
+    with the same region of the previous version as zlib's preset dictionary.
+    :param previous: The previous version, or empty bytes for the first one.
+    :param data: The version to encode.
+    :param mtime_ns: Modified time of the version.
+    :return: The record, header included.
+    """
+    prefix = common_prefix_length(previous, data)
+    suffix = common_suffix_length(previous, data, min(len(previous), len(data)) - prefix)
+    dictionary = previous[prefix:len(previous) - suffix][-ZLIB_WINDOW:]
+    compressor = zlib.compressobj(9, zdict=dictionary) if dictionary else zlib.compressobj(9)
+    payload = compressor.compress(data[prefix:len(data) - suffix]) + compressor.flush()
+    return RECORD_HEADER.pack(mtime_ns, prefix, suffix, len(payload)) + payload
+
+
+def read_save_history(path: Path) -> Iterator[Tuple[int, bytes]]:
+    """
+    Read the versions of the save file recorded in a save history, in order. A record cut short, as when the
+    recorder did not get to finish writing it, ends the history.
+    :param path: The save history file.
+    :return: An iterator of (modified time in nanoseconds, contents of the save file).
+    """
+    with Path(path).open('rb') as history_file:
+        if history_file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a save history")
+        previous = b""
+        while True:
+            header = history_file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            mtime_ns, prefix, suffix, length = RECORD_HEADER.unpack(header)
+            payload = history_file.read(length)
+            if len(payload) < length:
+                return
+            dictionary = previous[prefix:len(previous) - suffix][-ZLIB_WINDOW:]
+            decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+            data = previous[:prefix] + decompressor.decompress(payload) + previous[len(previous) - suffix:]
+            yield mtime_ns, data
+            previous = data
+
+
+class SaveHistoryRecorder(threading.Thread):
+    def __init__(self, path: Path):
+        """
+        Records every version of the save file handed to it into a single save history file, from its own thread,
+        so the File Watcher never waits on compression or the disk. Each version is stored as the region that
+        changed since the version before it, compressed, and flushed to disk as soon as it is written.
+        :param path: The save history file to create.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.path = Path(path)
+        self.pending = queue.SimpleQueue()
+        self.versions_recorded = 0
+        self.bytes_recorded = 0
+        self.bytes_written = 0
+        # The error that stopped the recording, if any. Versions are dropped after it.
+        self.error: OSError = None
+        self.start()
+
+    def record(self, data: bytes, mtime_ns: int):
+        """
+        Queue a version of the save file to be recorded.
+        :param data: The contents of the save file.
+        :param mtime_ns: Modified time of the save file.
+        """
+        self.pending.put((data, mtime_ns))
+
+    def close(self):
+        # Write out every version still queued and stop the thread
+        self.pending.put(None)
+        self.join()
+
+    def run(self):
+        history_file = None
+        previous = b""
+        try:
+            history_file = self.path.open('wb')
+            history_file.write(MAGIC)
+            self.bytes_written = len(MAGIC)
+        except OSError as error:
+            self.error = error
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue
+            data, mtime_ns = item
+            record = encode_version(previous, data, mtime_ns)
+            try:
+                history_file.write(record)
+                history_file.flush()
+            except OSError as error:
+                self.error = error
+                continue
+            previous = data
+            self.versions_recorded += 1
+            self.bytes_recorded += len(data)
+            self.bytes_written += len(record)
+        if history_file is not None:
+            try:
+                history_file.close()
+            except OSError as error:
+                self.error = error
+
+
+class SaveHistoryReplay(threading.Thread):
+    def __init__(self, file_watcher, versions: Iterable[Tuple[int, bytes]], speed: float = 1.0):
+        """
+        Feeds recorded versions of the save file through a File Watcher from its own thread, as if the game had
+        written them, spaced out by the time between their modified times. The watcher parses, diffs and tracks
+        splits as it would live, and publishes its snapshots to its update channel.
+        :param file_watcher: A FileWatcher created with watch_save_file=False, so it reads nothing itself.
+        :param versions: The versions to replay, as read by read_save_history.
+        :param speed: 1 to replay in real time, N for N times as fast, or None for as fast as the watcher goes.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.file_watcher = file_watcher
+        self.versions = versions
+        self.speed = speed
+        self.stopping = threading.Event()
+        self.versions_replayed = 0
+        self.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.join()
+
+    def run(self):
+        first_mtime_ns = None
+        started = time.perf_counter()
+        for mtime_ns, data in self.versions:
+            if first_mtime_ns is None:
+                first_mtime_ns = mtime_ns
+            if self.speed is not None:
+                due = started + (mtime_ns - first_mtime_ns) / 1e9 / self.speed
+                if self.stopping.wait(max(0.0, due - time.perf_counter())):
+                    break
+            elif self.stopping.is_set():
+                break
+            # The version is written now as far as the watcher is concerned, so split latencies stay realistic
+            self.file_watcher.feed(data, time.time_ns())
+            self.versions_replayed += 1
@@ -0,0 +1,181 @@
+import time
+import queue
+import select
+import socket
+import threading
+from collections import deque
+from datetime import timedelta
+from typing import Deque, Tuple
+
+
+# A time as LiveSplit Server reads it, e.g. 1:02:03.456
+def livesplit_timespan(timespan: timedelta) -> str:
+    milliseconds = max(0, round(timespan.total_seconds() * 1000))
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{milliseconds // 1000:02}.{milliseconds % 1000:03}"
+
+
+class LiveSplitClient(threading.Thread):
+    def __init__(self, host: str = "127.0.0.1", port: int = 16834, connect_timeout_secs: float = 1.0,
+                 backoff_initial_secs: float = 0.25, backoff_max_secs: float = 8.0, stale_secs: float = 10.0):
+        """
+        Sends commands to LiveSplit Server over one persistent TCP connection, from its own thread. Commands are
+        queued and sent in order, so the File Watcher never waits on the network. If LiveSplit is not reachable,
+        the client reconnects with exponential backoff, and commands queued for longer than stale_secs are dropped
+        rather than sent late.
+        :param host: Address of LiveSplit Server.
+        :param port: Port of LiveSplit Server.
+        :param connect_timeout_secs: Timeout of a single connection attempt.
+        :param backoff_initial_secs: Wait after the first failed connection attempt, doubled after each failure.
+        :param backoff_max_secs: Longest wait between two connection attempts.
+        :param stale_secs: Age after which a command that could not be sent is dropped.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.host = host
+        self.port = port
+        self.connect_timeout_secs = connect_timeout_secs
+        self.backoff_initial_secs = backoff_initial_secs
+        self.backoff_max_secs = backoff_max_secs
+        self.stale_secs = stale_secs
+        self.commands = queue.SimpleQueue()
+        self.connection: socket.socket = None
+        self.closing = threading.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.connects = 0
+        self.failed_connects = 0
+        # Time from queueing to being written to the socket, for the most recent commands
+        self.latencies: Deque[Tuple[str, float]] = deque(maxlen=1000)
+        self.start()
+
+    def send(self, command: str):
+        self.commands.put((command, time.perf_counter()))
+
+    def when_sent(self, callback):
+        """
+        Call back from the client's thread once the commands queued so far have been sent, or not at all if the
+        last of them was dropped.
+        :param callback: Function taking no arguments.
+        """
+        self.commands.put((callback, time.perf_counter()))
+
+    def start_timer(self):
+        self.send("starttimer")
+
+    def unpause_game_time(self):
+        self.send("unpausegametime")
+
+    def split(self):
+        self.send("split")
+
+    def reset(self):
+        self.send("reset")
+
+    def init_game_time(self):
+        self.send("initgametime")
+
+    def pause_game_time(self):
+        self.send("pausegametime")
+
+    def set_game_time(self, timespan: timedelta):
+        self.send(f"setgametime {livesplit_timespan(timespan)}")
+
+    def start_at(self, since: timedelta):
+        """
+        Start the timer, with its game time set to how long ago the run really started rather than zero.
+        :param since: Time between the run starting and this command being queued.
+        """
+        self.start_timer()
+        self.init_game_time()
+        self.set_game_time(since)
+        self.unpause_game_time()
+
+    def split_at(self, game_time: timedelta, since: timedelta, splits: int = 1):
+        """
+        Split with the game time set to when the splits happened rather than when they were detected. The game time
+        is paused while it is set, so the splits record it exactly, then carries on from the present.
+        :param game_time: Game time of the splits.
+        :param since: Time between the splits happening and this command being queued.
+        :param splits: Number of splits completed at that time.
+        """
+        self.pause_game_time()
+        self.set_game_time(game_time)
+        for _ in range(splits):
+            self.split()
+        self.set_game_time(game_time + since)
+        self.unpause_game_time()
+
+    def close(self):
+        # Send what is already queued if LiveSplit is connected, then close the connection and stop the thread
+        self.closing.set()
+        self.commands.put(None)
+        self.join()
+
+    def connect(self) -> bool:
+        try:
+            self.connection = socket.create_connection((self.host, self.port), self.connect_timeout_secs)
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connects += 1
+            return True
+        except OSError:
+            self.connection = None
+            self.failed_connects += 1
+            return False
+
+    def disconnect(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except OSError:
+                pass
+            self.connection = None
+
+    def peer_closed(self) -> bool:
+        # LiveSplit only answers get* commands, which this client does not send. A readable socket therefore means
+        # the server closed the connection, or sent something that can be discarded.
+        try:
+            while select.select([self.connection], [], [], 0)[0]:
+                if not self.connection.recv(4096):
+                    return True
+        except OSError:
+            return True
+        return False
+
+    def run(self):
+        backoff = self.backoff_initial_secs
+        last_sent = False
+        while True:
+            item = self.commands.get()
+            if item is None:
+                break
+            command, queued_at = item
+            if callable(command):
+                if last_sent:
+                    command()
+                continue
+            last_sent = False
+            while True:
+                if time.perf_counter() - queued_at > self.stale_secs:
+                    self.dropped += 1
+                    break
+                if self.connection is None or self.peer_closed():
+                    self.disconnect()
+                    if not self.connect():
+                        # Wait before trying again, unless the client is closing, in which case give up on the rest
+                        if self.closing.wait(backoff):
+                            self.dropped += 1
+                            break
+                        backoff = min(backoff * 2, self.backoff_max_secs)
+                        continue
+                    backoff = self.backoff_initial_secs
+                try:
+                    self.connection.sendall(f"{command}\r\n".encode('utf-8'))
+                except OSError:
+                    self.disconnect()
+                    continue
+                self.sent += 1
+                self.latencies.append((command, time.perf_counter() - queued_at))
+                last_sent = True
+                break
+        self.disconnect()
@@ -0,0 +1,109 @@
+import os
+import queue
+import time
+import threading
+from pathlib import Path
+from typing import List
+
+
+class LogSink(threading.Thread):
+    def __init__(self, flush_interval_secs: float = 0.5, flush_lines: int = 64, fsync_interval_secs: float = 5.0):
+        """
+        Appends activity log lines to File_Watcher_*.log files from its own thread, so the File Watcher never waits
+        on the disk. Lines are written to a buffered file that is flushed once enough lines are pending or the flush
+        interval has passed, and synced to disk at most once per fsync interval so a crash loses little.
+        :param flush_interval_secs: Longest time a line waits in the buffer before being flushed.
+        :param flush_lines: Number of pending lines that triggers a flush before the interval is up.
+        :param fsync_interval_secs: Shortest time between two fsyncs of the log file.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.flush_interval_secs = flush_interval_secs
+        self.flush_lines = flush_lines
+        self.fsync_interval_secs = fsync_interval_secs
+        self.pending = queue.SimpleQueue()
+        self.lines_written = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        # The last error writing a log file. The lines for that file are dropped until the file changes.
+        self.error: OSError = None
+        self.start()
+
+    def append(self, path: Path, lines: List[str]):
+        """
+        Queue lines to be appended to a log file. A new path closes the previous file, which is how the log rotates.
+        :param path: The log file to append to.
+        :param lines: The lines to append, without line endings.
+        """
+        if lines:
+            self.pending.put((path, lines))
+
+    def close(self):
+        # Write out everything still queued, sync it and stop the thread
+        self.pending.put(None)
+        self.join()
+
+    def run(self):
+        log_file = None
+        path = None
+        unflushed = 0
+        unsynced = False
+        last_flush = last_fsync = time.monotonic()
+        while True:
+            # Sleep until more lines arrive, or until the pending lines are due to be flushed or synced
+            deadlines = list()
+            if unflushed:
+                deadlines.append(last_flush + self.flush_interval_secs)
+            if unsynced:
+                deadlines.append(last_fsync + self.fsync_interval_secs)
+            try:
+                item = self.pending.get(timeout=max(0.0, min(deadlines) - time.monotonic()) if deadlines else None)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+
+            try:
+                if item:
+                    item_path, lines = item
+                    if item_path != path:
+                        self.close_file(log_file)
+                        log_file = None
+                        path = item_path
+                        log_file = open(path, 'a')
+                        unflushed = 0
+                        unsynced = False
+                    if log_file is not None:
+                        log_file.write("".join(f"{line}\n" for line in lines))
+                        self.lines_written += len(lines)
+                        unflushed += len(lines)
+
+                now = time.monotonic()
+                if log_file is not None and unflushed and \
+                        (unflushed >= self.flush_lines or now - last_flush >= self.flush_interval_secs):
+                    log_file.flush()
+                    self.flushes += 1
+                    unflushed = 0
+                    unsynced = True
+                    last_flush = now
+                if log_file is not None and unsynced and now - last_fsync >= self.fsync_interval_secs:
+                    os.fsync(log_file.fileno())
+                    self.fsyncs += 1
+                    unsynced = False
+                    last_fsync = now
+            except OSError as e:
+                self.error = e
+                log_file = None
+                unflushed = 0
+                unsynced = False
+        self.close_file(log_file)
+
+    def close_file(self, log_file):
+        if log_file is None:
+            return
+        try:
+            log_file.flush()
+            os.fsync(log_file.fileno())
+            self.fsyncs += 1
+            log_file.close()
+        except OSError as e:
+            self.error = e
@@ -0,0 +1,232 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from pathlib import Path
+
+
+class PollingNotifier:
+    name = "polling"
+    event_driven = False
+
+    def __init__(self, path: Path, poll_interval_secs: float = 0.1):
+        """
+        Change notifier that sleeps for a fixed interval and always reports a possible change.
+        The caller is responsible for checking the save file's modified time, exactly as the watch loop always has.
+        :param path: Path of the watched file.
+        :param poll_interval_secs: Seconds to sleep between polls.
+        """
+        self.path: Path = path
+        self.poll_interval_secs: float = poll_interval_secs
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Block until the watched file may have changed.
+        :param timeout: Maximum number of seconds to block.
+        :return: True if the caller should check the file, False if the timeout expired first.
+        """
+        time.sleep(min(self.poll_interval_secs, timeout))
+        return True
+
+    def close(self):
+        pass
+
+
+class InotifyNotifier:
+    name = "inotify"
+    event_driven = True
+
+    # Flags from <sys/inotify.h>
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_Q_OVERFLOW = 0x00004000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, path: Path):
+        """
+        Change notifier backed by Linux inotify, loaded through ctypes so no third-party package is needed.
+        The parent directory is watched rather than the file itself, so the watch survives the file being deleted
+        and recreated or atomically replaced. Only writes that were closed, or files moved into place, wake the caller.
+        :param path: Path of the watched file.
+        :raises OSError: When inotify is unavailable or the directory cannot be watched.
+        """
+        self.path: Path = path
+        self.file_name: bytes = os.fsencode(path.name)
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(str(path.parent)),
+                                         self.IN_CLOSE_WRITE | self.IN_MOVED_TO)
+        if wd < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            self.fd = -1
+            raise OSError(error, os.strerror(error), str(path.parent))
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Block until the watched file is closed after a write or moved into place.
+        :param timeout: Maximum number of seconds to block.
+        :return: True if the watched file changed, False if the timeout expired first.
+        """
+        deadline = time.monotonic() + timeout
+        while self.fd >= 0:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                readable, _, _ = select.select([self.fd], [], [], remaining)
+            except InterruptedError:
+                continue
+            if not readable:
+                return False
+            if self.read_events():
+                return True
+        return False
+
+    def read_events(self) -> bool:
+        # Drain every pending event, reporting whether any of them concerned the watched file
+        changed = False
+        while True:
+            try:
+                buffer = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return changed
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset < len(buffer):
+                _, mask, _, name_length = self.EVENT_HEADER.unpack_from(buffer, offset)
+                offset += self.EVENT_HEADER.size
+                name = buffer[offset:offset + name_length].rstrip(b"\0")
+                offset += name_length
+                # An overflowed queue may have dropped our event, so treat it as a change
+                if mask & self.IN_Q_OVERFLOW or name == self.file_name:
+                    changed = True
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class WriteSettler:
+    # Final lines that mark the end of a save file written by Teslagrad 2 or the Save Editor, handed over at once
+    document_endings = (b"gameWasCompletedOnce:", b"saveDataSlots: []", b"...")
+
+    def __init__(self, path: Path, settle_interval_secs: float = 0.025, settle_budget_secs: float = 0.5):
+        """
+        Wait out a save file rewrite before it is parsed, so a half-written file is never read and a burst of
+        writes costs a single parse.
+        :param path: Path of the watched file.
+        :param settle_interval_secs: Seconds the file size and mtime_ns must stay unchanged to be considered settled.
+        :param settle_budget_secs: Maximum seconds to wait for the file to settle before reading it anyway.
+        """
+        self.path: Path = path
+        self.settle_interval_secs: float = settle_interval_secs
+        self.settle_budget_secs: float = settle_budget_secs
+        self.reads_coalesced: int = 0
+        self.budget_exceeded: int = 0
+        # Modified time of the contents most recently returned by settle()
+        self.mtime_ns: int = 0
+
+    def signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def read(self):
+        try:
+            return self.path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def document_complete(self, data: bytes) -> bool:
+        # The final line of the file must be the last line the game writes
+        if not data.endswith(b"\n"):
+            return False
+        last_line = data[-256:].rstrip().rsplit(b"\n", 1)[-1].strip(b" -")
+        return last_line.startswith(self.document_endings)
+
+    def settle(self, notifier):
+        """
+        Block until the file has stopped changing, or the time budget runs out. A read whose YAML document ends
+        the way the game ends it is handed over at once. Any other read, such as one ending in a field this
+        version does not know of, is handed over once its size and mtime_ns stay unchanged for another interval.
+        Every further write seen while waiting is a read saved, and is counted in reads_coalesced.
+        :param notifier: The change notifier used by the watch loop, so pending write events are consumed here.
+        :return: The contents of the settled file, or None if the file no longer exists. Each version of the file
+        is read once at most.
+        """
+        deadline = time.monotonic() + self.settle_budget_secs
+        previous = self.signature()
+        if previous is None:
+            return None
+        # The game has usually finished writing by the time the watcher wakes up, so read at once
+        data = self.read()
+        current = self.signature()
+        if data is not None and current == previous and self.document_complete(data):
+            self.mtime_ns = current[1]
+            return data
+        # Signature and contents of the last read that did not end like a complete document, handed over if the
+        # file has not changed for a whole interval since
+        unfinished, unfinished_data = (current, data) if data is not None and current == previous else (None, None)
+        previous = current
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.budget_exceeded += 1
+                current = self.signature()
+                self.mtime_ns = current[1] if current else 0
+                return unfinished_data if current == unfinished else self.read()
+            changed = notifier.wait(min(self.settle_interval_secs, remaining))
+            current = self.signature()
+            if current != previous or (changed and notifier.event_driven):
+                # Another write landed while we were waiting, fold it into the same read
+                self.reads_coalesced += 1
+                previous = current
+            elif current is None:
+                return None
+            elif current == unfinished:
+                self.mtime_ns = current[1]
+                return unfinished_data
+            else:
+                data = self.read()
+                # Only hand the contents over if the file did not change while it was being read
+                if data is None or self.signature() != current:
+                    continue
+                if self.document_complete(data):
+                    self.mtime_ns = current[1]
+                    return data
+                unfinished, unfinished_data = current, data
+
+
+def create_change_notifier(path: Path, poll_interval_secs: float = 0.1, backend: str = None):
+    """
+    Create the best available change notifier for the save file.
+    :param path: Path of the watched file.
+    :param poll_interval_secs: Seconds between polls when falling back to the polling notifier.
+    :param backend: Force a backend by name ("inotify" or "polling"), or None to choose automatically.
+    :return: An InotifyNotifier on Linux when possible, otherwise a PollingNotifier.
+    """
+    if backend in (None, InotifyNotifier.name) and sys.platform.startswith("linux"):
+        try:
+            return InotifyNotifier(path)
+        except (OSError, AttributeError):
+            # The save directory may not exist yet, or libc has no inotify symbols. Fall back to polling.
+            if backend == InotifyNotifier.name:
+                raise
+    return PollingNotifier(path, poll_interval_secs)
@@ -0,0 +1,181 @@
+import ast
+from typing import Any, Dict, List, Set, Tuple
+
+
+# The dictionary a split value is written as, or None if it is not a dictionary.
+# savedCharges splits are written as a Python dictionary and match a charge that holds every one of its items.
+def split_value_dict(split_value: str) -> Dict[str, Any]:
+    if not split_value.lstrip().startswith("{"):
+        return None
+    try:
+        split_dict = ast.literal_eval(split_value)
+    except (ValueError, SyntaxError):
+        return None
+    return split_dict if isinstance(split_dict, dict) else None
+
+
+def dict_items_match(split_dict: Dict[str, Any], event_value: Dict[str, Any]) -> bool:
+    return all(str(event_value.get(key)).lower() == str(value).lower() for key, value in split_dict.items())
+
+
+class Split:
+    def __init__(self, event: str, value: str, group: str = ""):
+        """
+        One split of a split set. Splits are never changed once created; editing a split replaces it.
+        :param event: The save slot attribute the split waits on, e.g. "triggersSet".
+        :param value: The value or added item that completes the split. A Python dictionary for savedCharges.
+        :param group: Consecutive splits with the same group name may complete in any order. Empty for none.
+        """
+        self.event: str = event
+        self.value: str = value
+        self.group: str = group
+
+    def __repr__(self):
+        return f"Split({self.event!r}, {self.value!r}, {self.group!r})"
+
+
+class SplitSet:
+    def __init__(self, splits: List[Split] = None):
+        """
+        The splits being tracked, in order. The split editor and tracker Treeviews are views of this model,
+        and the File Watcher is handed a copy of its splits whenever it changes.
+        :param splits: The initial splits.
+        """
+        self.splits: List[Split] = list(splits or list())
+
+    def __len__(self) -> int:
+        return len(self.splits)
+
+    def __iter__(self):
+        return iter(self.splits)
+
+    def __getitem__(self, position: int) -> Split:
+        return self.splits[position]
+
+    def add(self, split: Split) -> int:
+        self.splits.append(split)
+        return len(self.splits) - 1
+
+    def replace(self, position: int, split: Split):
+        self.splits[position] = split
+
+    def delete(self, position: int):
+        del self.splits[position]
+
+    def move(self, position: int, new_position: int):
+        self.splits.insert(new_position, self.splits.pop(position))
+
+    def rows(self) -> List[Tuple[int, str, str, str]]:
+        # The splits as rows of the splits CSV file: number, event, value and group
+        return [(position + 1, split.event, split.value, split.group) for position, split in enumerate(self.splits)]
+
+    @staticmethod
+    def from_rows(rows) -> "SplitSet":
+        """
+        Read splits from the rows of a splits CSV file, whose group column is optional.
+        :param rows: Rows of number, event, value and group. The number is ignored, as it is the row's position.
+        :return: A new SplitSet.
+        """
+        return SplitSet([Split(str(row[1]), str(row[2]), str(row[3]) if len(row) > 3 else "")
+                         for row in rows if len(row) >= 3])
+
+
+class SplitIndex:
+    def __init__(self, splits):
+        """
+        Splits compiled for matching against the File Watcher's new events with dictionary lookups, so matching a
+        checkpoint costs one lookup per new item however many splits there are.
+        Built once whenever the splits are loaded or changed.
+        :param splits: The Split records, in order.
+        """
+        # Normalized (event, value) to the positions of the splits waiting for it
+        self.positions: Dict[Tuple[str, str], List[int]] = dict()
+        # Dictionary splits such as savedCharges, by normalized event and saveID. Dictionaries without a saveID
+        # are filed under None and checked against every dictionary item of their event.
+        self.dict_splits: Dict[Tuple[str, str], List[Tuple[Dict[str, Any], int]]] = dict()
+        for position, split in enumerate(splits):
+            event, value = split.event.lower(), split.value
+            split_dict = split_value_dict(value)
+            if split_dict is not None:
+                save_id = split_dict.get("saveID")
+                key = (event, None if save_id is None else str(save_id).lower())
+                self.dict_splits.setdefault(key, list()).append((split_dict, position))
+            else:
+                self.positions.setdefault((event, value.lower()), list()).append(position)
+
+    def match(self, new_events: List[Dict[str, Any]]) -> Set[int]:
+        """
+        Find the splits satisfied by a checkpoint.
+        :param new_events: The File Watcher's new events, each a dictionary from a key to its new value, or to the
+                           list of items added to it.
+        :return: The positions of every split that one of the events satisfies.
+        """
+        matched = set()
+        for event_dict in new_events:
+            for key, event_value in event_dict.items():
+                event = key.lower()
+                for item in event_value if type(event_value) is list else (event_value,):
+                    if isinstance(item, dict):
+                        if not self.dict_splits:
+                            continue
+                        save_id = item.get("saveID")
+                        candidates = self.dict_splits.get((event, None), list())
+                        if save_id is not None:
+                            candidates = candidates + self.dict_splits.get((event, str(save_id).lower()), list())
+                        matched.update(position for split_dict, position in candidates
+                                       if dict_items_match(split_dict, item))
+                    else:
+                        matched.update(self.positions.get((event, str(item).lower()), ()))
+        return matched
+
+
+# Group consecutive splits that share a group name into one stage, whose splits may complete in any order.
+# Splits without a group are a stage of their own.
+def split_stages(splits: List[Split]) -> List[List[int]]:
+    stages = list()
+    prev_group = None
+    for position, split in enumerate(splits):
+        if split.group and split.group == prev_group:
+            stages[-1].append(position)
+        else:
+            stages.append([position])
+        prev_group = split.group
+    return stages
+
+
+class SplitTracker:
+    def __init__(self, splits):
+        """
+        Progress through a list of splits, stage by stage. Every split of the current stage is pending and may
+        complete in any order, and the next stage starts once they all have.
+        :param splits: The Split records, in order.
+        """
+        self.splits: Tuple[Split, ...] = tuple(splits)
+        self.index: SplitIndex = SplitIndex(self.splits)
+        self.stages: List[List[int]] = split_stages(self.splits)
+        self.stage = 0
+        self.pending: Set[int] = set(self.stages[0]) if self.stages else set()
+
+    def completed(self) -> bool:
+        return self.stage >= len(self.stages)
+
+    def advance(self, new_events: List[Dict[str, Any]]) -> List[int]:
+        """
+        Complete every split a checkpoint satisfies, moving through as many stages as it satisfies in full.
+        :param new_events: The File Watcher's new events.
+        :return: The positions of the completed splits, in split order.
+        """
+        if self.completed():
+            return list()
+        matched = self.index.match(new_events)
+        completed = list()
+        while not self.completed():
+            done = sorted(self.pending & matched)
+            completed += done
+            self.pending.difference_update(done)
+            if self.pending:
+                break
+            self.stage += 1
+            if not self.completed():
+                self.pending = set(self.stages[self.stage])
+        return completed
@@ -0,0 +1,116 @@
+import csv
+from typing import List, Sequence, Tuple
+
+import numpy
+
+# Percentiles of each segment reported besides the median
+PERCENTILES = (10, 90)
+
+
+def segment_times(times: numpy.ndarray) -> numpy.ndarray:
+    # The time of each segment, from the split completed before it or from the start of the run for the first one.
+    # Splits of a group complete in any order, so each run's splits are taken in the order they were completed,
+    # as the run archive does.
+    order = numpy.argsort(times, axis=1, kind='stable')
+    completed = numpy.take_along_axis(times, order, axis=1)
+    previous = numpy.zeros_like(completed)
+    previous[:, 1:] = completed[:, :-1]
+    segments = numpy.empty_like(times)
+    numpy.put_along_axis(segments, order, completed - previous, axis=1)
+    return segments
+
+
+class SplitStatistics:
+    def __init__(self, split_count: int, capacity: int = 64):
+        """
+        Statistics of the segments of every completed run of one split set, held as an array of runs by splits.
+        Best segments, means and standard deviations are updated in place as each run is added, while medians and
+        percentiles are recomputed over the whole array the next time they are asked for.
+        :param split_count: Number of splits in the split set.
+        :param capacity: Runs the array holds before it grows.
+        """
+        self.split_count = split_count
+        # Segment times in seconds, one row per run, of which the first run_count are filled
+        self.segments = numpy.empty((capacity, split_count))
+        self.run_count = 0
+        self.best_segments = numpy.full(split_count, numpy.inf)
+        self.segment_sums = numpy.zeros(split_count)
+        self.segment_squares = numpy.zeros(split_count)
+        self.best_run_secs = numpy.inf
+        # Median and PERCENTILES of each segment, as of percentiles_run_count runs
+        self.percentiles: numpy.ndarray = None
+        self.percentiles_run_count = 0
+
+    @classmethod
+    def from_times(cls, times: numpy.ndarray) -> "SplitStatistics":
+        """
+        :param times: Split times in seconds, of shape runs by splits.
+        :return: The statistics of the runs, computed over the whole array at once.
+        """
+        statistics = cls(times.shape[1], max(64, 2 * times.shape[0]))
+        segments = segment_times(times)
+        statistics.segments[:len(segments)] = segments
+        statistics.run_count = len(segments)
+        if len(segments):
+            statistics.best_segments = segments.min(axis=0)
+            statistics.segment_sums = segments.sum(axis=0)
+            statistics.segment_squares = numpy.square(segments).sum(axis=0)
+            statistics.best_run_secs = times.max(axis=1).min() if times.shape[1] else numpy.inf
+        return statistics
+
+    def add_run(self, times: Sequence[float]) -> List[int]:
+        """
+        Count one more completed run.
+        :param times: The run's split times in seconds, one per split.
+        :return: Positions of the splits whose segment was the best yet.
+        """
+        times = numpy.asarray(times, dtype=float).reshape(1, self.split_count)
+        segments = segment_times(times)[0]
+        if self.run_count == len(self.segments):
+            self.segments = numpy.concatenate((self.segments, numpy.empty_like(self.segments)))
+        self.segments[self.run_count] = segments
+        self.run_count += 1
+        best = segments < self.best_segments
+        self.best_segments = numpy.minimum(self.best_segments, segments)
+        self.segment_sums += segments
+        self.segment_squares += numpy.square(segments)
+        if self.split_count:
+            self.best_run_secs = min(self.best_run_secs, times[0].max())
+        return numpy.flatnonzero(best).tolist()
+
+    def sum_of_best(self) -> float:
+        # The best possible time with every segment at its best, in seconds
+        return float(self.best_segments.sum()) if self.run_count else None
+
+    def segment_percentiles(self) -> numpy.ndarray:
+        # The median and PERCENTILES of each segment, of shape 1 + len(PERCENTILES) by splits
+        if self.percentiles is None or self.percentiles_run_count != self.run_count:
+            self.percentiles = numpy.percentile(self.segments[:self.run_count], (50,) + PERCENTILES, axis=0)
+            self.percentiles_run_count = self.run_count
+        return self.percentiles
+
+    def rows(self) -> List[Tuple[int, float, float, float, float, float, float, float]]:
+        """
+        One row per split: the number of runs, then the best, median, PERCENTILES, mean and standard deviation of
+        its segment in seconds, then its consistency, the standard deviation relative to the mean. The lower the
+        consistency, the more alike the segment is from run to run.
+        """
+        if not self.run_count:
+            return list()
+        means = self.segment_sums / self.run_count
+        deviations = numpy.sqrt(numpy.maximum(self.segment_squares / self.run_count - numpy.square(means), 0))
+        consistency = numpy.divide(deviations, means, out=numpy.zeros_like(means), where=means > 0)
+        columns = numpy.vstack((self.best_segments, self.segment_percentiles(), means, deviations, consistency))
+        return [(self.run_count, *column) for column in columns.T.tolist()]
+
+    def write_csv(self, file, splits):
+        # One line per split, with its number and name, followed by the sum of best
+        csv_writer = csv.writer(file, lineterminator='\n')
+        csv_writer.writerow(("split", "event", "runs", "best", "median", *(f"p{value}" for value in PERCENTILES),
+                             "mean", "stdev", "consistency"))
+        for position, (split, (runs, *values)) in enumerate(zip(splits, self.rows())):
+            csv_writer.writerow((position + 1, f"{split.event}: {split.value}", runs,
+                                 *(f"{value:.3f}" for value in values)))
+        if self.run_count:
+            csv_writer.writerow(("", "Sum of Best", self.run_count, f"{self.sum_of_best():.3f}"))
+            csv_writer.writerow(("", "Personal Best", self.run_count, f"{self.best_run_secs:.3f}"))
@@ -0,0 +1,151 @@
+import csv
+import time
+import threading
+from array import array
+from typing import Dict, List, Tuple
+
+# The stages a save goes through, from the game writing it to the split being sent to LiveSplit and drawn.
+# Each stage is timed from the end of the stage before it. send latency and rendered both follow matched, as the
+# LiveSplit client and the Tk main loop take the watch's results at the same time. send latency ends when the client
+# writes the split to its socket, so it does not include LiveSplit receiving and handling it.
+STAGES = ("detected", "read", "parsed", "diffed", "matched", "send latency", "rendered")
+WATCHER_STAGES = ("mtime",) + STAGES[:5]
+# The stages each stage may be timed from, latest first, for when a watch skips a stage
+EARLIER_STAGES = {stage: tuple(reversed(WATCHER_STAGES[:WATCHER_STAGES.index(stage)]
+                                        if stage in WATCHER_STAGES else WATCHER_STAGES)) for stage in STAGES}
+# Time from the game writing the save to the window showing it
+TOTAL = "total"
+
+# Each power of two is split into 8 buckets, so a bucket is at most 12.5% wider than its lower bound
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+
+def bucket_index(value_ns: int) -> int:
+    if value_ns < SUB_BUCKETS:
+        return value_ns
+    shift = value_ns.bit_length() - SUB_BUCKET_BITS - 1
+    return SUB_BUCKETS * (shift + 1) + (value_ns >> shift) - SUB_BUCKETS
+
+
+def bucket_upper_bound(index: int) -> int:
+    # The smallest value of the next bucket
+    if index < SUB_BUCKETS:
+        return index + 1
+    shift, sub_bucket = divmod(index - SUB_BUCKETS, SUB_BUCKETS)
+    return (SUB_BUCKETS + sub_bucket + 1) << shift
+
+
+class StageHistogram:
+    def __init__(self):
+        """
+        Durations of one stage of the pipeline, counted in logarithmic buckets so that a long session costs a
+        fixed amount of memory. Count, mean and maximum are exact, percentiles are accurate to one bucket.
+        """
+        self.buckets = array('Q')
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, duration_ns: int):
+        if duration_ns < 0:
+            duration_ns = 0
+        index = bucket_index(duration_ns)
+        if index >= len(self.buckets):
+            self.buckets.extend([0] * (index + 1 - len(self.buckets)))
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def mean_ns(self) -> float:
+        return self.total_ns / self.count if self.count else 0.0
+
+    def percentile_ns(self, fraction: float) -> int:
+        """
+        :param fraction: The percentile as a fraction, e.g. 0.99.
+        :return: The upper bound of the bucket holding that share of the durations, or 0 if there are none.
+        """
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(bucket_upper_bound(index), self.max_ns)
+        return self.max_ns
+
+
+class WatchTiming:
+    def __init__(self, timings: "PipelineTimings", mtime_ns: int):
+        """
+        The stage timestamps of one watch, from time.perf_counter_ns. Each stage is added to the pipeline's
+        histograms as it is marked, from whichever thread reaches it.
+        :param timings: The pipeline timings the stages are recorded in.
+        :param mtime_ns: Modified time of the save file, from the wall clock, which sets the mtime stage.
+        """
+        self.timings = timings
+        detected = time.perf_counter_ns()
+        self.marks: Dict[str, int] = {"mtime": detected - max(0, time.time_ns() - mtime_ns)}
+        self.mark("detected", detected)
+
+    def mark(self, stage: str, now_ns: int = None):
+        now_ns = time.perf_counter_ns() if now_ns is None else now_ns
+        for earlier in EARLIER_STAGES[stage]:
+            if earlier in self.marks:
+                start_ns = self.marks[earlier]
+                break
+        self.marks[stage] = now_ns
+        self.timings.add(stage, now_ns - start_ns)
+        if stage == "rendered":
+            self.timings.add(TOTAL, now_ns - self.marks["mtime"])
+
+    def mark_analysis(self, parse_ns: int, diff_ns: int):
+        # The analyzer measures parsing and diffing itself, as they may run in a worker process. Time spent
+        # handing the file to the worker and back counts towards parsing.
+        now_ns = time.perf_counter_ns()
+        self.mark("parsed", now_ns - diff_ns)
+        self.mark("diffed", now_ns)
+
+
+class PipelineTimings:
+    def __init__(self, enabled: bool = False):
+        """
+        Histograms of how long each stage of the File Watcher's pipeline takes, from the game writing the save file
+        to the split being sent to LiveSplit and drawn. While disabled, the watcher skips timing altogether.
+        :param enabled: Whether watches are timed.
+        """
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.histograms: Dict[str, StageHistogram] = dict()
+        self.reset()
+
+    def begin(self, mtime_ns: int) -> WatchTiming:
+        """
+        Start timing a watch, or don't.
+        :param mtime_ns: Modified time of the save file the watch detected.
+        :return: The watch's timing, or None while disabled.
+        """
+        return WatchTiming(self, mtime_ns) if self.enabled else None
+
+    def add(self, stage: str, duration_ns: int):
+        with self.lock:
+            self.histograms[stage].add(duration_ns)
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {stage: StageHistogram() for stage in STAGES + (TOTAL,)}
+
+    def rows(self) -> List[Tuple[str, int, float, float, float, float, float]]:
+        # One row per stage: count, then mean, 50th, 90th and 99th percentile and maximum in milliseconds
+        with self.lock:
+            return [(stage, histogram.count, histogram.mean_ns() / 1e6,
+                     histogram.percentile_ns(0.5) / 1e6, histogram.percentile_ns(0.9) / 1e6,
+                     histogram.percentile_ns(0.99) / 1e6, histogram.max_ns / 1e6)
+                    for stage, histogram in self.histograms.items()]
+
+    def write_csv(self, file):
+        csv_writer = csv.writer(file, lineterminator='\n')
+        csv_writer.writerow(("stage", "count", "mean_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms"))
+        csv_writer.writerows((stage, count, *(f"{value:.3f}" for value in values))
+                             for stage, count, *values in self.rows())
@@ -9,6 +9,9 @@ from tkinter.messagebox import showwarning, askyesnocancel
 from tkinter.filedialog import asksaveasfile, askopenfile
 import Teslagrad2Data
 from TeslaTwoolsStatus import States, SplitEdit, VERSION
+from TeslaTwoolsChannel import UpdateChannel, WatcherUpdate, coalesce
+from TeslaTwoolsSplits import Split, SplitSet, split_stages
+from TeslaTwoolsTimings import STAGES, TOTAL
 
 
 class TeslaTwoolsUI:
@@ -16,6 +19,13 @@ class TeslaTwoolsUI:
         # Save file metadata
         self.save_directory = None
         self.file_watcher = None
+        # File Watcher updates are queued here and drawn by the Tk main loop, at most once per frame
+        self.update_channel = UpdateChannel()
+        self.frame_interval_ms = 16
+        # Lines of the activity log kept in its textbox, and how many earlier lines each page brings back
+        self.activity_log_max_lines = 500
+        self.activity_log_page_lines = 200
+        self.activity_log_view = None
         self.save_file = None
         self.save_editor_map = None
         self.save_editor_scrolls = None
@@ -42,6 +52,10 @@ class TeslaTwoolsUI:
         self.label_next_split = None
         self.frame_non_list_keys = None
         self.frame_list_keys = None
+        self.labels_non_list_keys = None
+        self.labels_list_keys = None
+        # Items shown for each list key before the rest are summarized in a single line
+        self.max_added_items = 8
         self.frame_activity_log = None
         self.activity_textbox = None
         self.activity_scroll = None
@@ -53,15 +67,17 @@ class TeslaTwoolsUI:
         self.labelframe_editor.configure(height=200, text='Splits Editor', width=320)
         self.tv_editor = ttk.Treeview(self.labelframe_editor)
         self.tv_editor.configure(height=16, selectmode="extended", show="headings")
-        self.tv_editor_cols = ['editor_id', 'editor_event', 'editor_value']
-        self.tv_editor_dcols = ['editor_id', 'editor_event', 'editor_value']
+        self.tv_editor_cols = ['editor_id', 'editor_event', 'editor_value', 'editor_group']
+        self.tv_editor_dcols = ['editor_id', 'editor_event', 'editor_value', 'editor_group']
         self.tv_editor.configure(columns=self.tv_editor_cols, displaycolumns=self.tv_editor_dcols)
         self.tv_editor.column("editor_id", anchor=tk.W, stretch=True, width=25, minwidth=20)
-        self.tv_editor.column("editor_event", anchor=tk.W, stretch=True, width=140, minwidth=20)
-        self.tv_editor.column("editor_value", anchor=tk.W, stretch=True, width=140, minwidth=20)
+        self.tv_editor.column("editor_event", anchor=tk.W, stretch=True, width=120, minwidth=20)
+        self.tv_editor.column("editor_value", anchor=tk.W, stretch=True, width=110, minwidth=20)
+        self.tv_editor.column("editor_group", anchor=tk.W, stretch=True, width=50, minwidth=20)
         self.tv_editor.heading("editor_id", anchor=tk.W, text='#')
         self.tv_editor.heading("editor_event", anchor=tk.W, text='Event')
         self.tv_editor.heading("editor_value", anchor=tk.W, text='Value')
+        self.tv_editor.heading("editor_group", anchor=tk.W, text='Group')
         self.tv_editor.grid(column=0, columnspan=5, padx=5, pady=10, row=0)
         self.tv_editor.bind('<ButtonRelease-1>', self.tv_editor_select)
         self.button_splits_add = ttk.Button(self.labelframe_editor)
@@ -102,7 +118,11 @@ class TeslaTwoolsUI:
         self.labelframe_tracker.configure(height=200, text='Splits Tracker', width=300)
         self.tracker_active = False
         self.tracker_completed = False
-        self.tracker_next_split = {"tracker": "", "editor": "", "event": "", "value": ""}
+        # The splits model, and the view keeping the editor and tracker Treeviews in step with it
+        self.split_set = SplitSet()
+        self.splits_view = None
+        self.tracker_next_split = {"event": "", "value": "", "pending": 0}
+        self.splits_generation = 0
         self.tv_tracker = ttk.Treeview(self.labelframe_tracker)
         self.tv_tracker.configure(height=16, selectmode="extended", show="headings")
         self.tv_tracker_cols = ['tracker_id', 'tracker_event', 'tracker_time']
@@ -115,19 +135,32 @@ class TeslaTwoolsUI:
         self.tv_tracker.heading("tracker_event", anchor=tk.W, text='Event')
         self.tv_tracker.heading("tracker_time", anchor=tk.W, text='Time')
         self.tv_tracker.grid(column=0, row=0, padx=5, pady=10)
+        self.splits_view = SplitsView(self.tv_editor, self.tv_tracker, self.split_set)
         self.save_log = tk.IntVar()
         self.checkbutton_save_log = ttk.Checkbutton(self.labelframe_tracker)
-        self.checkbutton_save_log.configure(text='Save File Watcher events to a log file', variable=self.save_log)
+        self.checkbutton_save_log.configure(text='Save File Watcher events to a log file', variable=self.save_log,
+                                            command=self.save_options_toggle)
         self.checkbutton_save_log.grid(column=0, row=1, padx=10, sticky=tk.W)
         self.save_run = tk.IntVar()
         self.checkbutton_save_run = ttk.Checkbutton(self.labelframe_tracker)
-        self.checkbutton_save_run.configure(text='Save logs of completed splits', variable=self.save_run)
+        self.checkbutton_save_run.configure(text='Save logs of completed splits', variable=self.save_run,
+                                            command=self.save_options_toggle)
         self.checkbutton_save_run.grid(column=0, row=2, padx=10, pady=5, sticky=tk.W)
         self.livesplit_enabled = tk.IntVar()
         self.checkbutton_livesplit = ttk.Checkbutton(self.labelframe_tracker)
         self.checkbutton_livesplit.configure(text='Interface with LiveSplit Server', variable=self.livesplit_enabled,
                                              command=self.livesplit_toggle)
         self.checkbutton_livesplit.grid(column=0, row=3, padx=10, sticky=tk.W)
+        self.record_history = tk.IntVar()
+        self.checkbutton_record_history = ttk.Checkbutton(self.labelframe_tracker)
+        self.checkbutton_record_history.configure(text='Record every version of the save file',
+                                                  variable=self.record_history, command=self.history_toggle)
+        self.checkbutton_record_history.grid(column=0, row=4, padx=10, pady=5, sticky=tk.W)
+        self.archive_runs = tk.IntVar()
+        self.checkbutton_archive_runs = ttk.Checkbutton(self.labelframe_tracker)
+        self.checkbutton_archive_runs.configure(text='Archive runs to a database', variable=self.archive_runs,
+                                                command=self.archive_toggle)
+        self.checkbutton_archive_runs.grid(column=0, row=5, padx=10, sticky=tk.W)
         self.labelframe_tracker.pack(expand=False, fill=tk.Y, padx=5, pady=5, side=tk.RIGHT)
         self.labelframe_tracker.grid_propagate(False)
 
@@ -139,6 +172,9 @@ class TeslaTwoolsUI:
         self.label_split_value = None
         self.stringvar_split_value = None
         self.accb_split_value = None
+        self.label_split_group = None
+        self.stringvar_split_group = None
+        self.entry_split_group = None
         self.button_split_ok = None
         self.button_split_cancel = None
         self.button_retry_filewatcher = None
@@ -387,23 +423,121 @@ class TeslaTwoolsUI:
 
         self.frame_editor.pack(side=tk.TOP)
         self.notebook.add(self.frame_editor, text='Save Editor')
+        # UI Elements - Diagnostics
+        self.frame_diagnostics = ttk.Frame(self.notebook)
+        self.diagnostics_interval_ms = 1000
+        self.diagnostics_enabled = tk.IntVar()
+        self.checkbutton_diagnostics = ttk.Checkbutton(self.frame_diagnostics)
+        self.checkbutton_diagnostics.configure(text='Time each stage of the File Watcher',
+                                               variable=self.diagnostics_enabled, command=self.diagnostics_toggle)
+        self.checkbutton_diagnostics.grid(column=0, row=0, padx=10, pady=10, sticky=tk.W)
+        self.button_diagnostics_reset = ttk.Button(self.frame_diagnostics)
+        self.button_diagnostics_reset.configure(text='Reset', command=self.diagnostics_reset)
+        self.button_diagnostics_reset.grid(column=1, row=0, padx=5, pady=10)
+        self.button_diagnostics_export = ttk.Button(self.frame_diagnostics)
+        self.button_diagnostics_export.configure(text='Export CSV...', command=self.diagnostics_export)
+        self.button_diagnostics_export.grid(column=2, row=0, padx=5, pady=10)
+        self.tv_diagnostics = ttk.Treeview(self.frame_diagnostics)
+        self.tv_diagnostics.configure(height=len(STAGES) + 1, selectmode="none", show="headings")
+        self.tv_diagnostics_cols = ['stage', 'count', 'mean', 'p50', 'p90', 'p99', 'max']
+        self.tv_diagnostics.configure(columns=self.tv_diagnostics_cols, displaycolumns=self.tv_diagnostics_cols)
+        for column, heading in zip(self.tv_diagnostics_cols,
+                                   ('Stage', 'Count', 'Mean ms', 'p50 ms', 'p90 ms', 'p99 ms', 'Max ms')):
+            self.tv_diagnostics.column(column, anchor=tk.W if column == 'stage' else tk.E, width=80, minwidth=20)
+            self.tv_diagnostics.heading(column, anchor=tk.W if column == 'stage' else tk.E, text=heading)
+        for stage in STAGES + (TOTAL,):
+            self.tv_diagnostics.insert('', tk.END, iid=stage, values=(stage,))
+        self.tv_diagnostics.grid(column=0, columnspan=3, row=1, padx=10, sticky=tk.W)
+        self.label_diagnostics = ttk.Label(self.frame_diagnostics, wraplength=600, justify=tk.LEFT)
+        self.label_diagnostics.configure(text="Each stage is timed from the end of the one before it: the game writing "
+                                              "the save, the File Watcher detecting and reading it, parsing, diffing "
+                                              "and matching splits. Send latency and rendered are both timed from "
+                                              "matching. Send latency ends once the split is written to LiveSplit "
+                                              "Server's socket, so it does not include LiveSplit handling it. Total "
+                                              "runs from the game writing the save to the window showing it. "
+                                              "Percentiles are accurate to 12.5%.")
+        self.label_diagnostics.grid(column=0, columnspan=3, row=3, padx=10, pady=10, sticky=tk.W)
+        self.label_diagnostics_counters = ttk.Label(self.frame_diagnostics, justify=tk.LEFT)
+        self.label_diagnostics_counters.grid(column=0, columnspan=3, row=2, padx=10, pady=(10, 0), sticky=tk.W)
+        self.frame_diagnostics.pack(side=tk.TOP)
+        self.notebook.add(self.frame_diagnostics, text='Diagnostics')
         self.notebook.pack(side=tk.TOP)
 
         # Main widget
         self.mainwindow = self.main_window
 
     def run(self):
+        self.mainwindow.after(self.frame_interval_ms, self.drain_updates)
+        self.mainwindow.after(self.diagnostics_interval_ms, self.refresh_diagnostics)
         self.mainwindow.mainloop()
 
+    def attach_file_watcher(self, file_watcher):
+        self.file_watcher = file_watcher
+        self.diagnostics_enabled.set(1 if file_watcher.timings.enabled else 0)
+        self.save_options_toggle()
+        self.reset_splits_tracker()
+
+    def drain_updates(self):
+        # Draw whatever the File Watcher published since the last frame as a single update, then check again
+        updates = self.update_channel.drain()
+        update = coalesce(updates)
+        if update is not None:
+            self.update(update)
+            self.update_channel.drawn += 1
+            # Every watch folded into this frame has now been rendered
+            for drawn in updates:
+                if drawn.timing is not None:
+                    drawn.timing.mark("rendered")
+        self.mainwindow.after(self.frame_interval_ms, self.drain_updates)
+
+    # UI Functions for Diagnostics
+    def refresh_diagnostics(self):
+        if self.file_watcher is not None and self.file_watcher.timings.enabled:
+            for stage, count, *values in self.file_watcher.timings.rows():
+                self.tv_diagnostics.item(stage, values=(stage, count, *(f"{value:.2f}" for value in values)))
+        if self.file_watcher is not None:
+            # Counted whether or not the stages are timed
+            self.label_diagnostics_counters.configure(
+                text=", ".join(f"{name.capitalize()}: {count}" for name, count in self.file_watcher.counters().items()))
+        self.mainwindow.after(self.diagnostics_interval_ms, self.refresh_diagnostics)
+
+    def diagnostics_toggle(self):
+        if self.file_watcher is not None:
+            self.file_watcher.timings.enabled = self.diagnostics_enabled.get() == 1
+
+    def diagnostics_reset(self):
+        if self.file_watcher is not None:
+            self.file_watcher.timings.reset()
+        for stage in STAGES + (TOTAL,):
+            self.tv_diagnostics.item(stage, values=(stage,))
+
+    def diagnostics_export(self):
+        if self.file_watcher is None:
+            return
+        file = asksaveasfile(mode='w',
+                             confirmoverwrite=True,
+                             title="Export Stage Timings As...",
+                             defaultextension=".csv",
+                             initialdir=self.save_directory,
+                             filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")])
+        if file is None:
+            return
+        self.file_watcher.timings.write_csv(file)
+        file.close()
+
     # UI Functions for File Watcher
     def clear_filewatcher_frame(self):
         for widgets in self.frame_filewatcher.winfo_children():
             widgets.destroy()
         self.filewatcher_elements_drawn = False
 
-    def update(self, file_watcher):
-        self.file_watcher = file_watcher
-        match file_watcher.state:
+    def update(self, update: WatcherUpdate):
+        # Move the tracker past the splits completed since the last update, unless the splits changed since
+        if update.splits_generation == self.splits_generation and update.completed_splits:
+            for position, timespan in update.completed_splits:
+                self.splits_view.set_time(position, timespan)
+            self.show_pending_splits(update.pending_splits)
+        match update.state:
             case States.INITIALIZED:
                 return
             case States.UNCHANGED:
@@ -411,7 +545,7 @@ class TeslaTwoolsUI:
             case States.NO_SAVE_FILE:
                 self.clear_filewatcher_frame()
                 label_msg = ttk.Label(self.frame_filewatcher, font=self.font,
-                                      text=f"Error: Teslagrad 2 save file not found at\n{str(file_watcher.save_path)}")
+                                      text=f"Error: Teslagrad 2 save file not found at\n{str(update.save_path)}")
                 label_msg.pack(side=tk.TOP, expand=tk.YES)
                 self.button_retry_filewatcher = ttk.Button(self.frame_filewatcher)
                 self.button_retry_filewatcher.configure(text='Retry')
@@ -425,12 +559,12 @@ class TeslaTwoolsUI:
             case States.SAVE_SLOT_ADDED:
                 self.clear_filewatcher_frame()
                 label_msg = ttk.Label(self.frame_filewatcher, font=self.font,
-                                      text=f"Save Slot #{file_watcher.active_slot_number} has been added!")
+                                      text=f"Save Slot #{update.active_slot_number} has been added!")
                 label_msg.pack(side=tk.TOP, expand=tk.YES)
             case States.SAVE_SLOT_DELETED:
                 self.clear_filewatcher_frame()
                 label_msg = ttk.Label(self.frame_filewatcher, font=self.font,
-                                      text=f"Save Slot #{file_watcher.active_slot_number} was deleted!")
+                                      text=f"Save Slot #{update.active_slot_number} was deleted!")
                 label_msg.pack(side=tk.TOP, expand=tk.YES)
             case States.SAVE_FILE_EDITED:
                 self.clear_filewatcher_frame()
@@ -451,6 +585,8 @@ class TeslaTwoolsUI:
                     self.label_next_split = ttk.Label(self.frame_game_state, font=self.font, anchor=tk.SE)
                     self.frame_non_list_keys = ttk.Frame(self.frame_game_state)
                     self.frame_list_keys = ttk.Frame(self.frame_game_state)
+                    self.labels_non_list_keys = LabelPool(self.frame_non_list_keys)
+                    self.labels_list_keys = LabelPool(self.frame_list_keys)
                     self.frame_activity_log = ttk.Frame(self.frame_filewatcher, height=200)
 
                     self.activity_textbox = tk.Text(self.frame_activity_log, height=9)
@@ -458,6 +594,11 @@ class TeslaTwoolsUI:
                     self.activity_scroll = ttk.Scrollbar(self.frame_activity_log, orient=tk.VERTICAL,
                                                          command=self.activity_textbox.yview)
                     self.activity_textbox['yscrollcommand'] = self.activity_scroll.set
+                    self.activity_log_view = ActivityLogView(self.activity_textbox, self.activity_log_max_lines,
+                                                             self.activity_log_page_lines)
+                    self.button_activity_log_earlier = ttk.Button(self.frame_activity_log)
+                    self.button_activity_log_earlier.configure(text='Show Earlier Activity', state=tk.DISABLED,
+                                                               command=self.activity_log_earlier)
                     self.label_name.pack(anchor=tk.W, padx=5)
                     self.label_scene.pack(anchor=tk.W, padx=5)
                     self.label_coords.pack(anchor=tk.W, padx=5)
@@ -467,81 +608,58 @@ class TeslaTwoolsUI:
                     self.frame_list_keys.pack(anchor=tk.W)
                     self.label_next_split.pack(side=tk.BOTTOM, fill=tk.X, padx=5)
                     self.frame_game_state.pack(fill=tk.BOTH, anchor=tk.N, expand=True, side=tk.TOP)
+                    self.button_activity_log_earlier.pack(side=tk.TOP, anchor=tk.W)
                     self.activity_scroll.pack(side=tk.RIGHT, fill=tk.Y)
                     self.activity_textbox.pack(fill=tk.BOTH, expand=True, side=tk.LEFT)
                     self.frame_activity_log.pack(fill=tk.X, anchor=tk.S, expand=True, side=tk.BOTTOM)
 
                 # Set the text of the static game state labels
-                self.label_name.config(text=f"Name: {file_watcher.active_slot_data.name}")
-                self.label_scene.config(text=f"Scene: {file_watcher.active_slot_data.respawnScene}")
-                self.label_coords.config(text=f"Coords: ({file_watcher.active_slot_data.respawnPoint.get('x')}, "
-                                              f"{file_watcher.active_slot_data.respawnPoint.get('y')})")
-                self.label_playtime.config(text=f"In-Game Playtime: {file_watcher.time_spent}")
-                if file_watcher.start_datetime is not None:
-                    self.label_realtime.config(text=f"Realtime Playtime: {file_watcher.real_playtime}")
+                self.label_name.config(text=f"Name: {update.slot_name}")
+                self.label_scene.config(text=f"Scene: {update.respawn_scene}")
+                self.label_coords.config(text=f"Coords: ({update.respawn_point.get('x')}, "
+                                              f"{update.respawn_point.get('y')})")
+                self.label_playtime.config(text=f"In-Game Playtime: {update.time_spent}")
+                if update.start_datetime is not None:
+                    self.label_realtime.config(text=f"Realtime Playtime: {update.real_playtime}")
                 if self.tracker_active:
                     self.label_next_split.config(
                         text=f"Next Split: '{self.tracker_next_split.get('event')}: "
-                             f"{self.tracker_next_split.get('value')}'",
+                             f"{self.tracker_next_split.get('value')}'" +
+                             (f" (+{self.tracker_next_split.get('pending') - 1} in group)"
+                              if self.tracker_next_split.get('pending') > 1 else ""),
                         justify="right")
                 else:
                     self.label_next_split.config(text="")
 
-                ignored_keys = {"name", "respawnScene", "respawnPoint['x']", "respawnPoint['y']"}
-                # Reset Non-List and List frames
-                for widgets in self.frame_non_list_keys.winfo_children():
-                    widgets.destroy()
-                for widgets in self.frame_list_keys.winfo_children():
-                    widgets.destroy()
-
-                for event_dict in self.file_watcher.new_events:
-                    for key, new_value in event_dict.items():
-
-                        # Skip empty values
-                        if len(new_value) == 0:
-                            continue
-
-                        # Skip ignored keys
-                        if key in ignored_keys:
-                            continue
-
-                        # Set non-list keys into frame_non_list_keys
-                        if type(new_value) is str:
-                            label_non_list = ttk.Label(self.frame_non_list_keys, font=self.font, anchor=tk.W,
-                                                       text=f"{key}: {new_value}")
-                            label_non_list.pack(anchor=tk.W, padx=5)
-
-                        # Set list keys into frame_list_keys
-                        if type(new_value) is list:
-                            # Display the list name underlined, then display the series of values
-                            label_list = ttk.Label(self.frame_list_keys, font=f"{self.font} underline", anchor=tk.W,
-                                                   text=f"{key}")
-                            label_list.pack(anchor=tk.W, padx=5)
-                            for item in new_value:
-                                label_list_add = ttk.Label(self.frame_list_keys, font=self.font, anchor=tk.W,
-                                                           text=f"    Added: {str(item)}")
-                                label_list_add.pack(anchor=tk.W, padx=5)
-
-                # Update the activity textbox
-                self.activity_textbox.config(state=tk.NORMAL)
-                self.activity_textbox.delete(1.0, tk.END)
-                self.activity_textbox.insert(1.0, "\n".join(file_watcher.activity_log))
-                self.activity_textbox.see(tk.END)
-                self.activity_textbox.config(state=tk.DISABLED)
+                # Show the new events, reusing the labels of the previous update
+                non_list_rows, list_rows = game_state_rows(update.new_events, self.font, self.max_added_items)
+                self.labels_non_list_keys.show(non_list_rows)
+                self.labels_list_keys.show(list_rows)
+
+                # Append the new lines of the activity log to its textbox
+                self.activity_log_view.render(update.activity_log_id, update.activity_log,
+                                              update.activity_log_count)
+                self.button_activity_log_earlier.configure(
+                    state=tk.NORMAL if self.activity_log_view.first_shown > 0 else tk.DISABLED)
 
                 # Done with updates
                 self.filewatcher_elements_drawn = True
 
+    def activity_log_earlier(self):
+        self.activity_log_view.page_earlier()
+        if self.activity_log_view.first_shown == 0:
+            self.button_activity_log_earlier.configure(state=tk.DISABLED)
+
     def retry_filewatcher(self):
         self.file_watcher.filewatcher_active = True
 
     # UI Functions for Splits
-    def create_split_edit_dialog(self, split_event="", split_value=""):
+    def create_split_edit_dialog(self, split_event="", split_value="", split_group=""):
         # Dialog Window
         self.split_editor_window = tk.Toplevel(self.main_window)
         x = self.main_window.winfo_x()
         y = self.main_window.winfo_y()
-        self.split_editor_window.geometry(f"320x175+{x + 320:d}+{y + 175:d}")
+        self.split_editor_window.geometry(f"320x235+{x + 320:d}+{y + 175:d}")
         self.split_editor_window.title("Configure Split Event")
 
         # Event Label
@@ -579,6 +697,14 @@ class TeslaTwoolsUI:
         self.accb_split_value.configure(textvariable=self.stringvar_split_value)
         self.accb_split_value.pack(anchor=tk.W, side=tk.TOP, padx=10, pady=5)
 
+        # Group Label and Entry. Consecutive splits in the same group may complete in any order.
+        self.label_split_group = ttk.Label(self.split_editor_window, width=50,
+                                           text="Group (optional, splits in a group complete in any order)")
+        self.label_split_group.pack(side=tk.TOP, pady=5)
+        self.stringvar_split_group = tk.StringVar(value=split_group)
+        self.entry_split_group = ttk.Entry(self.split_editor_window, width=53, textvariable=self.stringvar_split_group)
+        self.entry_split_group.pack(anchor=tk.W, side=tk.TOP, padx=10, pady=5)
+
         # OK and Cancel Buttons
         self.button_split_ok = ttk.Button(self.split_editor_window, width=20,
                                           text="OK", command=self.split_edit_ok)
@@ -600,9 +726,8 @@ class TeslaTwoolsUI:
 
     def splits_edit(self):
         self.split_edit_type = SplitEdit.EDIT
-        iid = self.tv_editor.focus()
-        row_dict = self.tv_editor.item(iid)
-        self.create_split_edit_dialog(row_dict.get('values')[1], row_dict.get('values')[2])
+        split = self.split_set[self.tv_editor.index(self.tv_editor.focus())]
+        self.create_split_edit_dialog(split.event, split.value, split.group)
 
     def splits_delete(self):
         iid = self.tv_editor.focus()
@@ -612,9 +737,8 @@ class TeslaTwoolsUI:
         # If no next item exists, try the previous item
         if not next_iid:
             next_iid = self.tv_editor.prev(iid)
-        # Delete the original iid and rebuild the treeview indices
-        self.tv_editor.delete(iid)
-        self.reset_treeview_indices()
+        # Delete the split, which renumbers the splits after it
+        self.splits_view.delete(self.tv_editor.index(iid))
         # If either a next or previous item exists, select it and put it into focus
         if next_iid:
             self.tv_editor.selection_set(next_iid)
@@ -623,14 +747,14 @@ class TeslaTwoolsUI:
         self.reset_splits_tracker()
 
     def splits_moveup(self):
-        iid = self.tv_editor.focus()
-        self.tv_editor.move(iid, self.tv_editor.parent(iid), self.tv_editor.index(iid) - 1)
+        position = self.tv_editor.index(self.tv_editor.focus())
+        self.splits_view.move(position, position - 1)
         self.tv_editor_select(None)
         self.reset_splits_tracker()
 
     def splits_movedown(self):
-        iid = self.tv_editor.focus()
-        self.tv_editor.move(iid, self.tv_editor.parent(iid), self.tv_editor.index(iid) + 1)
+        position = self.tv_editor.index(self.tv_editor.focus())
+        self.splits_view.move(position, position + 1)
         self.tv_editor_select(None)
         self.reset_splits_tracker()
 
@@ -644,22 +768,17 @@ class TeslaTwoolsUI:
                              filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")])
         # Export splits as CSV to the file
         csv_writer = csv.writer(file, delimiter='|', lineterminator='\n')
-        for iid in self.tv_editor.get_children():
-            row = self.tv_editor.item(iid).get('values')
-            csv_writer.writerow(row)
+        csv_writer.writerows(self.split_set.rows())
         file.close()
 
     def splits_default(self):
-        for row in self.tv_editor.get_children():
-            self.tv_editor.delete(row)
-        self.tv_editor.insert('', tk.END, values=("x", "blinkUnlocked", "true"))
-        self.tv_editor.insert('', tk.END, values=("x", "cloakUnlocked", "true"))
-        self.tv_editor.insert('', tk.END, values=("x", "hulderBossfightBeaten", "true"))
-        self.tv_editor.insert('', tk.END, values=("x", "mooseBossFightBeaten", "true"))
-        self.tv_editor.insert('', tk.END, values=("x", "fafnirBossFightBeaten", "true"))
-        self.tv_editor.insert('', tk.END, values=("x", "axeUnlocked", "true"))
-        self.tv_editor.insert('', tk.END, values=("x", "galvanBossFightBeaten", "true"))
-        self.reset_treeview_indices()
+        self.splits_view.load([Split("blinkUnlocked", "true"),
+                               Split("cloakUnlocked", "true"),
+                               Split("hulderBossfightBeaten", "true"),
+                               Split("mooseBossFightBeaten", "true"),
+                               Split("fafnirBossFightBeaten", "true"),
+                               Split("axeUnlocked", "true"),
+                               Split("galvanBossFightBeaten", "true")])
         self.reset_splits_tracker()
 
     def splits_load(self):
@@ -669,18 +788,15 @@ class TeslaTwoolsUI:
                            defaultextension=".csv",
                            initialdir=self.save_directory,
                            filetypes=[("CSV Files", "*.csv"), ("All Files", "*.*")])
-        # Overwrite Treeview with CSV data
-        for row in self.tv_editor.get_children():
-            self.tv_editor.delete(row)
-        csv_reader = csv.reader(file, delimiter='|')
-        for row in csv_reader:
-            self.tv_editor.insert('', tk.END, values=row)
+        # Overwrite the splits with CSV data
+        self.splits_view.load(SplitSet.from_rows(csv.reader(file, delimiter='|')))
         self.reset_splits_tracker()
 
     def split_edit_ok(self, _=None):
         # Read the entry attributes
         split_event = self.stringvar_split_event.get()
         split_value = self.stringvar_split_value.get()
+        split_group = self.stringvar_split_group.get().strip()
 
         # If either split entry was blank, complain about it
         if not split_event or not split_value:
@@ -689,14 +805,13 @@ class TeslaTwoolsUI:
 
         # Check if an ADD or an EDIT
         if self.split_edit_type == SplitEdit.ADD:
-            # Add the entry to the Treeview
-            self.tv_editor.insert('', tk.END, values=("x", split_event, split_value))
+            # Add the split to the end of the splits
+            self.splits_view.add(Split(split_event, split_value, split_group))
         else:
-            # Replace the entry in the Treeview
-            iid = self.tv_editor.focus()
-            self.tv_editor.item(iid, values=("x", split_event, split_value))
+            # Replace the selected split
+            self.splits_view.replace(self.tv_editor.index(self.tv_editor.focus()),
+                                     Split(split_event, split_value, split_group))
 
-        self.reset_treeview_indices()
         self.reset_splits_tracker()
         self.split_editor_window.destroy()
 
@@ -716,7 +831,7 @@ class TeslaTwoolsUI:
             else:
                 self.button_splits_moveup.state(["disabled"])
             # Enable Move Down when a row other than the last one is selected
-            if index + 1 < len(self.tv_editor.get_children()):
+            if index + 1 < len(self.split_set):
                 self.button_splits_movedown.state(["!disabled"])
             else:
                 self.button_splits_movedown.state(["disabled"])
@@ -724,62 +839,33 @@ class TeslaTwoolsUI:
             self.button_splits_edit.state(["disabled"])
             self.button_splits_delete.state(["disabled"])
 
-    def reset_treeview_indices(self):
-        # Renumber the treeview indices
-        for iid in self.tv_editor.get_children():
-            index = self.tv_editor.index(iid)
-            self.tv_editor.set(iid, 0, index + 1)
-
     def reset_splits_tracker(self):
-        # Clear tracker treeview
-        for row in self.tv_tracker.get_children():
-            self.tv_tracker.delete(row)
-        # Get splits from the editor
-        splits = self.tv_editor.get_children()
-        if len(splits) > 0:
-            # Write splits in tracker
-            for split in splits:
-                split_values = self.tv_editor.item(split).get('values')
-                self.tv_tracker.insert('', tk.END,
-                                       values=(split_values[0], f"{split_values[1]}: {split_values[2]}", ""))
-            # Highlight first split in tracker
-            first_tracker_split = self.tv_tracker.get_children()[0]
-            if first_tracker_split:
-                self.tv_tracker.selection_set(first_tracker_split)
-                # Read metadata from first split in editor
-                first_editor_split = self.tv_editor.get_children()[0]
-                values = self.tv_editor.item(first_editor_split).get('values')
-                self.tracker_active = True
-                self.tracker_completed = False
-                self.tracker_next_split = {"tracker": first_tracker_split, "editor": first_editor_split,
-                                           "event": values[1], "value": values[2]}
-
-        else:
-            self.tracker_active = False
+        # Clear the tracker's times and start tracking from the first split, or every split of the first group
+        self.splits_view.clear_times()
+        self.show_pending_splits(split_stages(self.split_set.splits)[0] if len(self.split_set) > 0 else list())
+        # Hand the splits to the File Watcher, which matches them against new events in its own thread
+        if self.file_watcher is not None:
+            self.splits_generation = self.file_watcher.load_splits(tuple(self.split_set))
+
+    def show_pending_splits(self, positions):
+        # Highlight the splits that may complete next
+        self.splits_view.select(positions)
+        if positions:
+            split = self.split_set[positions[0]]
+            self.tracker_active = True
             self.tracker_completed = False
-            self.tracker_next_split = {"tracker": "", "editor": "", "event": "", "value": ""}
-
-    def advance_splits_tracker(self, file_watcher):
-        # Get timespan of the current event, prioritizing real playtime over in-game playtime
-        timespan = file_watcher.real_playtime if file_watcher.start_datetime is not None else file_watcher.time_spent
-        # Update the tracker with the timespan
-        tracker_iid = self.tracker_next_split.get('tracker')
-        editor_iid = self.tracker_next_split.get('editor')
-        self.tv_tracker.set(tracker_iid, 2, timespan)
-        # Select the next item in the tracker
-        next_tracker_iid = self.tv_tracker.next(tracker_iid)
-        next_editor_iid = self.tv_editor.next(editor_iid)
-        if not next_tracker_iid:
-            # Tracker is complete
-            self.tv_tracker.selection_remove(tracker_iid)
-            self.tracker_completed = True
-            self.tracker_active = False
-            self.tracker_next_split = {"tracker": "", "editor": "", "event": "", "value": ""}
+            self.tracker_next_split = {"event": split.event, "value": split.value, "pending": len(positions)}
         else:
-            self.tv_tracker.selection_set(next_tracker_iid)
-            values = self.tv_editor.item(next_editor_iid).get('values')
-            self.tracker_next_split = {"tracker": next_tracker_iid, "editor": next_editor_iid,
-                                       "event": values[1], "value": values[2]}
+            # Either there are no splits, or the tracker is complete
+            self.tracker_active = False
+            self.tracker_completed = len(self.split_set) > 0
+            self.tracker_next_split = {"event": "", "value": "", "pending": 0}
+
+    def save_options_toggle(self):
+        # The File Watcher reads plain copies of the checkbuttons, as Tk variables belong to the Tk thread
+        if self.file_watcher is not None:
+            self.file_watcher.save_log_enabled = self.save_log.get() == 1
+            self.file_watcher.save_run_enabled = self.save_run.get() == 1
 
     def livesplit_toggle(self):
         if self.livesplit_enabled.get() == 0:
@@ -787,6 +873,18 @@ class TeslaTwoolsUI:
         else:
             self.file_watcher.livesplit_connect()
 
+    def history_toggle(self):
+        if self.record_history.get() == 0:
+            self.file_watcher.history_stop()
+        else:
+            self.file_watcher.history_start()
+
+    def archive_toggle(self):
+        if self.archive_runs.get() == 0:
+            self.file_watcher.archive_close()
+        else:
+            self.file_watcher.archive_open()
+
     # UI Functions for Save Editor
     def toggle_save_editor_elements(self, enabled: bool):
         for element in (self.checkbutton_eq_blink, self.checkbutton_eq_cloak, self.checkbutton_eq_waterblink,
@@ -1039,7 +1137,7 @@ class TeslaTwoolsUI:
         selected_save.triggersSet = self.save_editor_triggers
         selected_save.respawnScene = self.save_editor_scene
         selected_save.respawnPoint = self.save_editor_coords
-        self.file_watcher.state = States.SAVE_FILE_EDITED
+        self.file_watcher.save_file_edited = True
         self.save_file.write()
         # Reload the editor lists due to potential checksum action changing their contents
         self.save_editor_map = selected_save.mapShapesUnlocked
@@ -1281,6 +1379,188 @@ class TeslaTwoolsUI:
         self.scene_select_window.destroy()
 
 
+class SplitsView:
+
+    def __init__(self, tv_editor, tv_tracker, split_set):
+        """
+        Keeps the split editor and tracker Treeviews in step with a SplitSet, patching only the rows a change
+        touches. A split's rows share the same iid in both Treeviews.
+        :param tv_editor: The split editor Treeview, with number, event, value and group columns.
+        :param tv_tracker: The split tracker Treeview, with number, event and time columns.
+        :param split_set: The splits model. Change it through this view so the Treeviews follow.
+        """
+        self.tv_editor = tv_editor
+        self.tv_tracker = tv_tracker
+        self.split_set = split_set
+        # The iid of each split's rows, by position, and the rows whose time is filled in
+        self.iids = list()
+        self.timed = set()
+        self.next_iid = 0
+
+    def editor_values(self, position):
+        split = self.split_set[position]
+        return position + 1, split.event, split.value, split.group
+
+    def tracker_values(self, position):
+        split = self.split_set[position]
+        return position + 1, f"{split.event}: {split.value}" + (f" [{split.group}]" if split.group else ""), ""
+
+    def insert(self, position):
+        iid = f"split{self.next_iid}"
+        self.next_iid += 1
+        self.iids.insert(position, iid)
+        self.tv_editor.insert('', position, iid=iid, values=self.editor_values(position))
+        self.tv_tracker.insert('', position, iid=iid, values=self.tracker_values(position))
+
+    def renumber(self, start, stop):
+        for position in range(start, stop):
+            self.tv_editor.set(self.iids[position], 0, position + 1)
+            self.tv_tracker.set(self.iids[position], 0, position + 1)
+
+    def load(self, splits):
+        self.tv_editor.delete(*self.iids)
+        self.tv_tracker.delete(*self.iids)
+        self.iids = list()
+        self.timed = set()
+        self.split_set.splits = list(splits)
+        for position in range(len(self.split_set)):
+            self.insert(position)
+
+    def add(self, split):
+        self.insert(self.split_set.add(split))
+
+    def replace(self, position, split):
+        self.split_set.replace(position, split)
+        self.tv_editor.item(self.iids[position], values=self.editor_values(position))
+        self.tv_tracker.item(self.iids[position], values=self.tracker_values(position))
+        self.timed.discard(self.iids[position])
+
+    def delete(self, position):
+        self.split_set.delete(position)
+        iid = self.iids.pop(position)
+        self.tv_editor.delete(iid)
+        self.tv_tracker.delete(iid)
+        self.timed.discard(iid)
+        self.renumber(position, len(self.iids))
+
+    def move(self, position, new_position):
+        self.split_set.move(position, new_position)
+        iid = self.iids.pop(position)
+        self.iids.insert(new_position, iid)
+        self.tv_editor.move(iid, '', new_position)
+        self.tv_tracker.move(iid, '', new_position)
+        self.renumber(min(position, new_position), max(position, new_position) + 1)
+
+    def set_time(self, position, timespan):
+        self.tv_tracker.set(self.iids[position], 2, timespan)
+        self.timed.add(self.iids[position])
+
+    def clear_times(self):
+        for iid in self.timed:
+            self.tv_tracker.set(iid, 2, "")
+        self.timed = set()
+
+    def select(self, positions):
+        self.tv_tracker.selection_set([self.iids[position] for position in positions])
+        if positions:
+            self.tv_tracker.see(self.iids[positions[0]])
+
+
+class LabelPool:
+
+    def __init__(self, master, label_type=ttk.Label):
+        """
+        A column of labels that is reused from one update to the next: existing labels only have their text and
+        font changed, new labels are only created when a column grows past its largest size so far, and labels no
+        longer needed are hidden rather than destroyed.
+        :param master: The frame holding the labels.
+        :param label_type: The label widget class.
+        """
+        self.master = master
+        self.label_type = label_type
+        self.labels = list()
+        # The (text, font) each label currently shows, and how many labels are packed
+        self.rows = list()
+        self.shown = 0
+
+    def show(self, rows):
+        for index, row in enumerate(rows):
+            if index == len(self.labels):
+                self.labels.append(self.label_type(self.master, anchor=tk.W))
+                self.rows.append(None)
+            if self.rows[index] != row:
+                text, font = row
+                self.labels[index].configure(text=text, font=font)
+                self.rows[index] = row
+            if index >= self.shown:
+                self.labels[index].pack(anchor=tk.W, padx=5)
+        # Hidden labels are always the last ones, so packing them again later keeps the column in order
+        for label in self.labels[len(rows):self.shown]:
+            label.pack_forget()
+        self.shown = len(rows)
+
+
+class ActivityLogView:
+
+    def __init__(self, textbox, max_lines=500, page_lines=200):
+        """
+        Renders the File Watcher's activity log into a read-only Text widget incrementally: only lines added since
+        the last render are inserted, and only the most recent lines are kept in the widget.
+        :param textbox: The Text widget to render into.
+        :param max_lines: How many of the most recent lines the widget holds.
+        :param page_lines: How many earlier lines page_earlier brings back at a time.
+        """
+        self.textbox = textbox
+        self.max_lines = max_lines
+        self.page_lines = page_lines
+        self.log_id = None
+        self.lines = tuple()
+        # Render cursor: the lines before 'rendered' have been inserted, and those from 'first_shown' are still shown
+        self.rendered = 0
+        self.first_shown = 0
+        # Earlier lines brought back on request, which are kept on top of max_lines until the log is cleared
+        self.paged = 0
+
+    def render(self, log_id, lines, count):
+        """
+        Bring the widget up to date with the log.
+        :param log_id: Identifies the log, changing whenever the log is cleared.
+        :param lines: The log, a sequence of lines that supports slicing, such as an ActivityLog.
+        :param count: Number of lines of the log to render up to.
+        """
+        self.textbox.config(state=tk.NORMAL)
+        if log_id != self.log_id or count < self.rendered:
+            # The log was cleared since the last render, so start over from the tail of the new one
+            self.textbox.delete(1.0, tk.END)
+            self.log_id = log_id
+            self.rendered = self.first_shown = max(0, count - self.max_lines)
+            self.paged = 0
+        self.lines = lines
+        if count > self.rendered:
+            separator = "\n" if self.rendered > self.first_shown else ""
+            self.textbox.insert(tk.END, separator + "\n".join(lines[self.rendered:count]))
+            self.rendered = count
+            # Drop the oldest lines once there are more than the widget should hold
+            excess = self.rendered - self.first_shown - self.max_lines - self.paged
+            if excess > 0:
+                self.textbox.delete(1.0, f"{excess + 1}.0")
+                self.first_shown += excess
+            self.textbox.see(tk.END)
+        self.textbox.config(state=tk.DISABLED)
+
+    def page_earlier(self):
+        count = min(self.page_lines, self.first_shown)
+        if count == 0:
+            return
+        start = self.first_shown - count
+        self.textbox.config(state=tk.NORMAL)
+        self.textbox.insert(1.0, "\n".join(self.lines[start:self.first_shown]) + "\n")
+        self.textbox.config(state=tk.DISABLED)
+        self.textbox.see(1.0)
+        self.first_shown = start
+        self.paged += count
+
+
 class AutocompleteCombobox(ttk.Combobox):
 
     def __init__(self, master=None, **kw):
@@ -1395,6 +1675,29 @@ class ScrollSelector(ttk.Frame):
             self.cnvs.xview_scroll(int(-1 * (evt.delta / 120)), 'units')
 
 
+# Lay out the File Watcher's new events as the (text, font) rows of the non-list and list key columns.
+# Lists longer than max_items show their first items and a count of the rest, which are all in the activity log.
+def game_state_rows(new_events, font, max_items):
+    ignored_keys = {"name", "respawnScene", "respawnPoint['x']", "respawnPoint['y']"}
+    non_list_rows = list()
+    list_rows = list()
+    for event_dict in new_events:
+        for key, new_value in event_dict.items():
+            # Skip empty values and ignored keys
+            if len(new_value) == 0 or key in ignored_keys:
+                continue
+            if type(new_value) is str:
+                non_list_rows.append((f"{key}: {new_value}", font))
+            if type(new_value) is list:
+                # Display the list name underlined, then display the series of values
+                list_rows.append((f"{key}", f"{font} underline"))
+                for item in new_value[:max_items]:
+                    list_rows.append((f"    Added: {str(item)}", font))
+                if len(new_value) > max_items:
+                    list_rows.append((f"    ...and {len(new_value) - max_items} more", font))
+    return non_list_rows, list_rows
+
+
 # Helper function to fetch the map image when the program is packaged as an EXE
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -0,0 +1,525 @@
+import os
+import time
+import csv
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Tuple, TYPE_CHECKING
+from datetime import datetime, timedelta
+
+import Teslagrad2Data
+import Teslagrad2Diff
+from TeslaTwoolsStatus import States
+from TeslaTwoolsNotify import create_change_notifier, WriteSettler
+from TeslaTwoolsAnalyzer import SaveAnalyzer, WorkerSaveAnalyzer
+from TeslaTwoolsChannel import UpdateChannel, WatcherUpdate
+from TeslaTwoolsLogSink import LogSink
+from TeslaTwoolsActivityLog import ActivityLog
+from TeslaTwoolsSplits import SplitTracker
+from TeslaTwoolsLiveSplit import LiveSplitClient, livesplit_timespan
+from TeslaTwoolsTimings import PipelineTimings
+from TeslaTwoolsHistory import SaveHistoryRecorder
+
+if TYPE_CHECKING:
+    # Imported when the archive is opened, as it loads NumPy
+    from TeslaTwoolsArchive import RunArchive
+    from TeslaTwoolsStatistics import SplitStatistics
+
+
+class FileWatcher(threading.Thread):
+
+    def __init__(self, update_channel: UpdateChannel, use_worker_process: bool = False, notifier_backend: str = None,
+                 save_directory: Path = None, watch_save_file: bool = True):
+        """
+        Watches the Teslagrad 2 save file from its own thread, tracks splits and drives LiveSplit, and publishes a
+        snapshot after every watch. It knows nothing of its consumers, which are the Tk window and the headless
+        command-line watcher.
+        :param update_channel: Channel the snapshots are published to.
+        :param use_worker_process: Parse and diff the save file in a separate process.
+        :param notifier_backend: Force a change notifier backend by name, or None to choose automatically.
+        :param save_directory: Directory holding Saves.yaml, where logs are written too. Defaults to the game's.
+        :param watch_save_file: Start watching the save file. Without it, the watcher only processes the versions
+        handed to feed(), as when replaying a save history.
+        """
+        threading.Thread.__init__(self)
+        # Consumers are only ever told about changes through this channel, never called directly from this thread
+        self.update_channel = update_channel
+        self.tesla_2_path = Path(save_directory).resolve() if save_directory else Teslagrad2Data.save_directory()
+        self.save_path = (self.tesla_2_path / 'Saves.yaml').resolve()
+        self.file_watcher_path = (self.tesla_2_path /
+                                  (datetime.now().strftime('File_Watcher_%Y%m%d_%H%M%S.log')))
+        self.refresh_delay_secs = 0.1
+        self.wakeup_timeout_secs = 1.0
+        self.change_notifier = create_change_notifier(self.save_path, self.refresh_delay_secs, notifier_backend)
+        self.write_settler = WriteSettler(self.save_path)
+        self.filewatcher_active = True
+        self.differences = None
+        self.new_events = None
+        self.application_terminating = False
+        # Set by the Save Editor before it writes the save file, so the next version read is taken as its edit
+        self.save_file_edited = False
+        self.prev_mtime = 0
+        self.prev_digest = None
+        # The contents and modified time of the last version processed, to start a save history from
+        self.prev_version = None
+        self.parses_skipped = 0
+        self.active_save_file = None
+        self.prev_save_file = None
+        self.active_slot_number = None
+        self.active_slot_data = None
+        self.prev_slot_data = None
+        self.start_datetime = None
+        self.real_playtime = None
+        self.time_spent = None
+        # Recent activity is kept in memory and older activity spills to disk
+        self.activity_log_lines = 1000
+        self.activity_log = ActivityLog(self.activity_log_lines)
+        # Changes whenever the activity log is cleared, so the UI knows to start its rendering over
+        self.activity_log_id = 0
+        # The activity log is appended to file_watcher_path by the log sink's thread, up to log_lines_saved
+        self.log_sink = LogSink()
+        self.log_lines_saved = 0
+        self.state = States.INITIALIZED
+        # Sends commands to LiveSplit Server from its own thread while the LiveSplit option is enabled
+        self.livesplit_connection: LiveSplitClient = None
+        self.livesplit_address = ("127.0.0.1", 16834)
+        # How split times reach LiveSplit: "compensated" sets its game time to the split time read from the save,
+        # "ingame" sets it to the in-game timer, and "detected" only splits, timing splits when they are detected
+        self.livesplit_timing = "compensated"
+        # Log the correction made to each split time, compared to timing it when it was detected
+        self.measure_split_timing = False
+        # Wall clock time the run was started in LiveSplit, and the (split time, latency, correction) of each save
+        # that completed splits since
+        self.run_detected_ns: int = None
+        self.split_timings = list()
+        # Splits to track, handed over by the UI, the progress through them and the
+        # time of each completed split by position
+        self.splits_lock = threading.Lock()
+        self.split_tracker = SplitTracker(tuple())
+        self.tracker_times = dict()
+        self.splits_generation = 0
+        self.completed_splits = list()
+        self.save_log_enabled = False
+        self.save_run_enabled = False
+        # Records every version of the save file to a save history while enabled
+        self.save_history: SaveHistoryRecorder = None
+        # Records runs, their splits and their events to the run archive while enabled
+        self.run_archive: "RunArchive" = None
+        self.run_archive_path = self.tesla_2_path / 'TeslaTwools_Runs.sqlite3'
+        # The generation of a split list and the segment statistics of its archived runs, loaded by the archive
+        self.split_statistics: Tuple[int, "SplitStatistics"] = None
+        # Stage timings of the watches, recorded while enabled from the diagnostics panel, and those of this watch
+        self.timings = PipelineTimings()
+        self.watch_timing = None
+        # Parsing and diffing run in a worker process when requested, keeping them off the UI's GIL
+        self.save_analyzer = WorkerSaveAnalyzer() if use_worker_process else SaveAnalyzer()
+        if watch_save_file:
+            self.start()
+
+    def log_activity(self, activity):
+        self.activity_log.append(
+            f"[{self.real_playtime if self.real_playtime is not None else self.time_spent}] {activity}")
+
+    def load_splits(self, splits) -> int:
+        """
+        Replace the splits to track and start again from the first one. Called from the UI thread.
+        :param splits: The Split records, in order. Consecutive splits with the same group complete in any order.
+        :return: The generation of the new split list, which tags the splits completed against it.
+        """
+        with self.splits_lock:
+            self.split_tracker = SplitTracker(splits)
+            self.tracker_times = dict()
+            self.splits_generation += 1
+            run_archive = self.run_archive
+            if run_archive is not None:
+                self.load_split_statistics(run_archive)
+            return self.splits_generation
+
+    def counters(self) -> Dict[str, int]:
+        # Reads and parses the watcher saved, and settles it gave up on, for the diagnostics panel and the CLI
+        return {"reads coalesced": self.write_settler.reads_coalesced,
+                "settle budgets exceeded": self.write_settler.budget_exceeded,
+                "identical rewrites skipped": self.parses_skipped}
+
+    def snapshot(self) -> WatcherUpdate:
+        # Copy what the UI draws, so the next watch can carry on while the UI reads the copy
+        update = WatcherUpdate(self.state, self.save_path)
+        update.active_slot_number = self.active_slot_number
+        if self.active_slot_data is not None:
+            update.slot_name = self.active_slot_data.name
+            update.respawn_scene = self.active_slot_data.respawnScene
+            update.respawn_point = dict(self.active_slot_data.respawnPoint or dict())
+        update.time_spent = self.time_spent
+        update.real_playtime = self.real_playtime
+        update.start_datetime = self.start_datetime
+        update.new_events = list(self.new_events or list())
+        # The log is append-only, so sharing it with the UI along with its current length is as good as a copy
+        update.activity_log = self.activity_log
+        update.activity_log_count = len(self.activity_log)
+        update.activity_log_id = self.activity_log_id
+        update.splits_generation = self.splits_generation
+        update.completed_splits = self.completed_splits
+        update.pending_splits = sorted(self.split_tracker.pending) if not self.split_tracker.completed() else list()
+        update.timing = self.watch_timing
+        return update
+
+    def clear_activity_log(self):
+        # The UI may still be reading the previous log, so start a new one rather than emptying it
+        self.activity_log = ActivityLog(self.activity_log_lines)
+        self.activity_log_id += 1
+        self.log_lines_saved = 0
+
+    def livesplit_connect(self):
+        if self.livesplit_connection is None:
+            host, port = self.livesplit_address
+            self.livesplit_connection = LiveSplitClient(host, port)
+
+    def livesplit_disconnect(self):
+        if self.livesplit_connection is not None:
+            self.livesplit_connection.close()
+            self.livesplit_connection = None
+
+    def livesplit_start(self, game_time: timedelta):
+        if self.livesplit_connection is None:
+            return
+        if self.livesplit_timing == "detected":
+            self.livesplit_connection.start_timer()
+            self.livesplit_connection.unpause_game_time()
+        else:
+            self.livesplit_connection.start_at(game_time)
+
+    def livesplit_split(self, splits: int, game_time: timedelta, latency: timedelta):
+        if self.livesplit_connection is None:
+            return
+        if self.livesplit_timing == "detected":
+            for _ in range(splits):
+                self.livesplit_connection.split()
+        else:
+            self.livesplit_connection.split_at(game_time, latency, splits)
+
+    # Time between the game writing the save file and now, which timing a split when it is detected adds to it
+    @staticmethod
+    def write_latency(mtime_ns: int) -> timedelta:
+        return timedelta(microseconds=max(0, time.time_ns() - mtime_ns) // 1000)
+
+    def split_game_time(self) -> timedelta:
+        # Prioritize real playtime over in-game playtime, unless LiveSplit is timed with the in-game timer
+        if self.livesplit_timing == "ingame" or self.start_datetime is None:
+            return self.time_spent
+        return self.real_playtime
+
+    def log_split_timing(self, game_time: timedelta, latency: timedelta):
+        # Compare the split time with the time LiveSplit's own timer read when the split was detected
+        if self.run_detected_ns is None:
+            self.split_timings.append((game_time, latency, None))
+            self.log_activity(f"Split timing: saved {latency.total_seconds() * 1000:.0f} ms before detection")
+            return
+        detected = timedelta(microseconds=(time.time_ns() - self.run_detected_ns) // 1000)
+        correction = game_time - detected
+        self.split_timings.append((game_time, latency, correction))
+        self.log_activity(f"Split timing: saved {latency.total_seconds() * 1000:.0f} ms before detection, "
+                          f"{livesplit_timespan(game_time)} instead of {livesplit_timespan(detected)}, "
+                          f"corrected by {correction.total_seconds() * 1000:+.0f} ms")
+
+    def history_start(self):
+        # Record to a new save history, starting from the version processed last
+        if self.save_history is None:
+            save_history = SaveHistoryRecorder(self.tesla_2_path /
+                                               (datetime.now().strftime('Save_History_%Y%m%d_%H%M%S.history')))
+            prev_version = self.prev_version
+            if prev_version is not None:
+                save_history.record(*prev_version)
+            self.save_history = save_history
+
+    def history_stop(self):
+        if self.save_history is not None:
+            save_history = self.save_history
+            self.save_history = None
+            save_history.close()
+
+    def archive_open(self):
+        # Record to the run archive, starting with the run in progress, if any
+        if self.run_archive is None:
+            from TeslaTwoolsArchive import RunArchive
+            run_archive = RunArchive(self.run_archive_path)
+            if self.start_datetime is not None:
+                run_archive.start_run(self.start_datetime, self.active_slot_number, self.file_watcher_path.name)
+            with self.splits_lock:
+                self.load_split_statistics(run_archive)
+                self.run_archive = run_archive
+
+    def archive_close(self):
+        if self.run_archive is not None:
+            run_archive = self.run_archive
+            self.run_archive = None
+            run_archive.close()
+
+    def load_split_statistics(self, run_archive: "RunArchive"):
+        # Have the archive's thread read the archived runs of the split list, so completing a run never waits on it
+        generation = self.splits_generation
+
+        def loaded(statistics: "SplitStatistics"):
+            self.split_statistics = (generation, statistics)
+
+        run_archive.load_statistics([(split.event, split.value) for split in self.split_tracker.splits], loaded)
+
+    def log_split_statistics(self):
+        # Compare the run just completed with the archived runs of the same splits, then count it among them
+        loaded = self.split_statistics
+        if loaded is None or loaded[0] != self.splits_generation:
+            self.log_activity("Split statistics are still being read from the run archive")
+            return
+        statistics = loaded[1]
+        splits = self.split_tracker.splits
+        sum_of_best = statistics.sum_of_best()
+        best_segments = statistics.add_run([self.tracker_times[position].total_seconds()
+                                            for position in range(len(splits))])
+        if sum_of_best is None:
+            return
+        for position in best_segments:
+            self.log_activity(f"Best segment: '{splits[position].event}: {splits[position].value}'")
+        self.log_activity(f"Sum of Best: {timedelta(seconds=statistics.sum_of_best())} over "
+                          f"{statistics.run_count} runs, was {timedelta(seconds=sum_of_best)}")
+
+    def livesplit_reset(self):
+        if self.livesplit_connection is not None:
+            self.livesplit_connection.reset()
+
+    def watch(self):
+        self.completed_splits = list()
+        self.watch_timing = None
+        # If the save file does not exist, terminate the watch loop
+        if not self.save_path.exists():
+            self.state = States.NO_SAVE_FILE
+            self.filewatcher_active = False
+            return
+
+        # Check the modified time on the save file. If the save file has not updated, abort this watch loop.
+        mtime = os.stat(self.save_path).st_mtime_ns
+        if mtime == self.prev_mtime:
+            self.state = States.UNCHANGED
+            return
+        timing = self.watch_timing = self.timings.begin(mtime)
+
+        # Wait for the game to finish writing the save file, folding any burst of writes into this one read
+        data = self.write_settler.settle(self.change_notifier)
+        if data is None:
+            # The file went away while it was being written. Nothing was read, so there is nothing new to publish.
+            self.state = States.UNCHANGED
+            self.new_events = None
+            return
+        if timing is not None:
+            timing.mark("read")
+        self.watch_data(data, self.write_settler.mtime_ns)
+
+    def feed(self, data: bytes, mtime: int):
+        """
+        Process a version of the save file handed over rather than read, and publish the snapshot. Only for a
+        watcher created with watch_save_file=False, from the one thread feeding it.
+        :param data: The contents of the save file.
+        :param mtime: Modified time of the save file, in nanoseconds since the epoch.
+        """
+        self.completed_splits = list()
+        timing = self.watch_timing = self.timings.begin(mtime)
+        if timing is not None:
+            timing.mark("read")
+        self.watch_data(data, mtime)
+        self.update_channel.publish(self.snapshot())
+
+    def watch_data(self, data: bytes, mtime: int):
+        # Everything a watch does once it has the contents of the save file, whether read or fed
+        timing = self.watch_timing
+        # If the save file was modified by the save editor, clear the activity log and abort this watch loop.
+        # Only this version is the editor's: the game's next save is analyzed again.
+        if self.save_file_edited:
+            self.save_file_edited = False
+            self.state = States.SAVE_FILE_EDITED
+            self.clear_activity_log()
+            # Update the cached save data and last modified time of the save file
+            self.prev_mtime = mtime
+            self.prev_save_file = self.active_save_file
+            # Reset the livesplit run
+            self.livesplit_reset()
+            return
+
+        # If the game rewrote the save file with identical contents, there is nothing to parse or diff
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if digest == self.prev_digest:
+            self.parses_skipped += 1
+            self.prev_mtime = mtime
+            self.state = States.UNCHANGED
+            return
+
+        # Record the new version to the save history, if one is being recorded
+        save_history = self.save_history
+        if save_history is not None:
+            save_history.record(data, mtime)
+
+        # Parse the save file and find what changed since the previous version, in this thread or a worker process
+        analysis = self.save_analyzer.analyze(data)
+        if timing is not None:
+            timing.mark_analysis(analysis.parse_ns, analysis.diff_ns)
+        self.active_save_file = analysis.save_file
+        self.state = analysis.state
+
+        if analysis.state == States.SAVE_SLOT_ADDED:
+            # A new save slot was added
+            self.start_datetime = analysis.slot.dateModified
+            self.active_slot_number = analysis.slot_number
+            self.clear_activity_log()
+            self.file_watcher_path = (self.tesla_2_path /
+                                      (datetime.now().strftime('File_Watcher_%Y%m%d_%H%M%S.log')))
+            self.activity_log.append(f"New Game started at {self.start_datetime.strftime('%Y-%m-%d %H:%M:%S.%f')}")
+            # Reset and start the livesplit run, from the time that has passed since the game created the slot
+            latency = self.write_latency(mtime)
+            game_time = latency
+            if self.livesplit_timing == "ingame":
+                game_time += analysis.slot.playtime()
+            self.livesplit_reset()
+            self.livesplit_start(game_time)
+            self.run_detected_ns = time.time_ns()
+            self.split_timings = list()
+            run_archive = self.run_archive
+            if run_archive is not None:
+                run_archive.start_run(self.start_datetime, self.active_slot_number, self.file_watcher_path.name)
+
+        elif analysis.state == States.SAVE_SLOT_DELETED:
+            # A save slot was deleted
+            self.active_slot_number = analysis.slot_number
+            self.clear_activity_log()
+            self.file_watcher_path = (self.tesla_2_path /
+                                      (datetime.now().strftime('File_Watcher_%Y%m%d_%H%M%S.log')))
+            # Reset the livesplit run
+            self.livesplit_reset()
+            run_archive = self.run_archive
+            if run_archive is not None:
+                run_archive.end_run()
+
+        elif analysis.state == States.SAVE_SLOT_UPDATED:
+            # A save changed its data
+            save_data = analysis.slot
+            self.active_slot_number = analysis.slot_number
+            self.differences = analysis.differences
+            self.new_events = list()
+            self.active_slot_data = save_data
+            self.prev_slot_data = analysis.prev_slot
+            self.time_spent = save_data.playtime()
+            if self.start_datetime is not None:
+                self.real_playtime = save_data.dateModified - self.start_datetime
+
+            ignored_keys = {"dateModified", "timeSpent", "respawnFacingRight"}
+            # The events as (key, value) in the form the activity log writes them, for the run archive
+            archived_events = list()
+
+            # Non-List key changes - set a new event with the new value for each
+            for change in self.differences:
+                # Skip list keys and ignored keys
+                if change.is_list() or change.field in ignored_keys:
+                    continue
+                # Get the new_value and append the new event, then log the new event
+                new_value = str(change.new)
+                self.new_events.append({change.field: new_value})
+                self.log_activity(f"{change.field}: {new_value}")
+                archived_events.append((change.field, new_value))
+
+            # List key changes - set an event with the items added to each list
+            list_changes = {change.field: change for change in self.differences if change.is_list()}
+            for list_key in Teslagrad2Diff.list_fields:
+                new_values = list()
+                if list_key in list_changes:
+                    for added_value in list_changes[list_key].added:
+                        # Charges stay dictionaries so splits can match their saveID and charge
+                        new_values.append(added_value if list_key == "savedCharges" else str(added_value))
+                        self.log_activity(f"{list_key}: +{str(added_value)}")
+                        archived_events.append((list_key, str(added_value)))
+                    # Charges that changed state are events too, carrying the charge's new state
+                    for old_charge, charge in list_changes[list_key].changed or list():
+                        new_values.append(charge)
+                        state_change = f"{charge.get('saveID')}: {old_charge.get('charge')} -> {charge.get('charge')}"
+                        self.log_activity(f"{list_key}: {state_change}")
+                        archived_events.append((list_key, state_change))
+                self.new_events.append({list_key: new_values})
+            run_archive = self.run_archive
+            if run_archive is not None:
+                run_archive.add_events(self.real_playtime if self.start_datetime is not None else self.time_spent,
+                                       archived_events)
+
+            # Check the splits tracker and complete every split this save satisfies
+            with self.splits_lock:
+                completed_positions = self.split_tracker.advance(self.new_events)
+                for position in completed_positions:
+                    split = self.split_tracker.splits[position]
+                    split_key, split_value = split.event, split.value
+                    # Log the split
+                    self.log_activity(f"Split '{split_key}: {split_value}' Completed")
+                    # Record the split's time, prioritizing real playtime over in-game playtime,
+                    # and let the UI mark it completed
+                    timespan = self.real_playtime if self.start_datetime is not None else self.time_spent
+                    self.tracker_times[position] = timespan
+                    self.completed_splits.append((position, timespan))
+                if timing is not None:
+                    timing.mark("matched")
+                if completed_positions:
+                    # Send the splits to livesplit, timed from the save rather than from their detection
+                    latency = self.write_latency(mtime)
+                    game_time = self.split_game_time()
+                    self.livesplit_split(len(completed_positions), game_time, latency)
+                    if self.measure_split_timing:
+                        self.log_split_timing(game_time, latency)
+                    if timing is not None and self.livesplit_connection is not None:
+                        self.livesplit_connection.when_sent(lambda: timing.mark("send latency"))
+                run_archive = self.run_archive
+                if completed_positions and run_archive is not None:
+                    run_archive.add_splits([(position, self.split_tracker.splits[position].event,
+                                             self.split_tracker.splits[position].value, self.tracker_times[position])
+                                            for position in completed_positions])
+                # Check if we are finished tracking splits
+                if completed_positions and self.split_tracker.completed():
+                    self.log_activity(f"All Splits Completed")
+                    completed_splits_path = (self.tesla_2_path /
+                                             (datetime.now().strftime('Completed_Run_%Y%m%d_%H%M%S.log')))
+                    if run_archive is not None:
+                        self.log_split_statistics()
+                        run_archive.complete_run(datetime.now(), completed_splits_path.name)
+                    if self.save_run_enabled:
+                        with completed_splits_path.open('w') as run_log:
+                            csv_writer = csv.writer(run_log, delimiter='|', lineterminator='\n')
+                            for position, split in enumerate(self.split_tracker.splits):
+                                csv_writer.writerow((position + 1, f"{split.event}: {split.value}",
+                                                     self.tracker_times[position]))
+
+            if self.save_log_enabled:
+                # Append the lines logged since the last save. The log file changes whenever the log is cleared.
+                self.log_sink.append(self.file_watcher_path, self.activity_log[self.log_lines_saved:])
+                self.log_lines_saved = len(self.activity_log)
+
+        # Update the cached save data, its content hash and last modified time of the save file
+        self.prev_mtime = mtime
+        self.prev_digest = digest
+        self.prev_version = (data, mtime)
+        self.prev_save_file = self.active_save_file
+
+    def run(self):
+        # Watch once at startup, then again whenever the change notifier reports the save file was written.
+        # A missing save file is re-checked on every wakeup so the Retry button takes effect.
+        changed = True
+        while not self.application_terminating:
+            try:
+                if self.filewatcher_active and (changed or self.state == States.NO_SAVE_FILE):
+                    self.watch()
+                    self.update_channel.publish(self.snapshot())
+                changed = self.change_notifier.wait(self.wakeup_timeout_secs)
+            except KeyboardInterrupt:
+                break
+
+    def stop(self):
+        self.filewatcher_active = False
+        self.application_terminating = True
+        if self.ident is not None:
+            self.join()
+        self.change_notifier.close()
+        self.save_analyzer.close()
+        self.log_sink.close()
+        self.livesplit_disconnect()
+        self.history_stop()
+        self.archive_close()
@@ -1,8 +1,9 @@
 import os
 import re
 import ruamel.yaml
+import Teslagrad2Parser
 from pathlib import Path
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Union, Any
 
 
@@ -76,6 +77,11 @@ class SaveSlot:
     def boss_count(self):
         return self.bosses().count(True)
 
+    # The in-game timer, written as [[days:]hours:]minutes:seconds
+    def playtime(self) -> timedelta:
+        return timedelta(**{key: float(val) for val, key in zip(self.timeSpent.split(":")[::-1],
+                                                                 ("seconds", "minutes", "hours", "days"))})
+
     # Exports the class object to a dictionary as preparation for serializing the save file to YAML
     def export(self):
         return {
@@ -131,22 +137,51 @@ class SaveSlot:
         }
 
 
+# Teslagrad 2 keeps its saves in LocalLow, next to the Roaming folder that APPDATA points to. Without APPDATA, as on
+# Linux, the same layout is assumed under the home directory, as Wine and Proton prefixes have it.
+def save_directory() -> Path:
+    appdata = os.getenv('APPDATA')
+    roaming = Path(appdata) if appdata else Path.home() / 'AppData' / 'Roaming'
+    return (roaming / '../LocalLow/Rain/Teslagrad 2').resolve()
+
+
 # Class object representing the save file: a list of SaveSlot objects with saveDataSlots as a dictionary header
 class SaveFile:
     saveDataSlots: List[SaveSlot] = list()
-    save_file_path = (Path(os.getenv('APPDATA')) / '../LocalLow/Rain/Teslagrad 2/Saves.yaml').resolve()
+    # Fingerprint of each save slot as read from the file, used to tell which slots changed between reads
+    fingerprints: List[bytes] = list()
+    save_file_path = save_directory() / 'Saves.yaml'
 
     # Initialize the class object with a list of SaveSlot objects, or leave the list of SaveSlots empty
     def __init__(self, save_slot_list: List[SaveSlot] = None):
         if save_slot_list:
             self.saveDataSlots = save_slot_list
 
-    # Read the YAML save file
-    def read(self):
+    # Read the YAML save file, or parse its already-read contents
+    def read(self, data: bytes = None):
+        if data is None:
+            data = self.save_file_path.read_bytes()
+        text = data.decode('utf-8-sig')
+        self.fingerprints = list()
+        try:
+            self.saveDataSlots = Teslagrad2Parser.parse_save_slots(text, SaveSlot, self.fingerprints)
+        except ValueError:
+            # The file uses YAML beyond what the game writes, so let ruamel.yaml have the final say
+            self.read_yaml(text)
+            try:
+                self.fingerprints = Teslagrad2Parser.slot_fingerprints(text)
+            except ValueError:
+                # Without a block sequence to split, fall back on a fingerprint of each slot's values
+                self.fingerprints = [Teslagrad2Parser.fingerprint([(0, repr(vars(slot)))])
+                                     for slot in self.saveDataSlots]
+
+    # Read the YAML save file with ruamel.yaml, the slower reference parser
+    def read_yaml(self, text: str = None):
         yaml = ruamel.yaml.YAML()
-        with self.save_file_path.open('rt', encoding='utf-8') as save:
-            save_file_dict = yaml.load(save)
-        save_list = save_file_dict.get("saveDataSlots")
+        if text is None:
+            text = self.save_file_path.read_text(encoding='utf-8')
+        save_file_dict = yaml.load(text)
+        save_list = save_file_dict.get("saveDataSlots") or list()
         self.saveDataSlots = list()
         for save_dict in save_list:
             self.saveDataSlots.append(SaveSlot(save_dict))
@@ -0,0 +1,151 @@
+import itertools
+from typing import Any, Dict, List, Tuple
+from Teslagrad2Data import SaveSlot
+
+# Save slot attributes that accumulate items as the game progresses
+list_fields = ("triggersSet", "mapShapesUnlocked", "activitiesUnlocked", "scrollsPickedUp",
+               "scrollsSeenInCollection", "savedResetInfos", "savedCharges")
+
+# Every other known save slot attribute, in save file order
+scalar_fields = tuple(field for field in SaveSlot.__annotations__ if field not in list_fields)
+
+
+class SlotChange:
+    def __init__(self, field: str, old: Any, new: Any, added: List[Any] = None, removed: List[Any] = None,
+                 changed: List[Tuple[Any, Any]] = None):
+        """
+        A single difference between two versions of a save slot.
+        :param field: The attribute that changed. Keys of nested dictionaries follow DeepDiff's naming,
+                      e.g. "respawnPoint['x']".
+        :param old: The previous value.
+        :param new: The current value.
+        :param added: For list attributes, the items present now that were not present before. None for scalars.
+        :param removed: For list attributes, the items no longer present. None for scalars.
+        :param changed: For savedCharges, the (old, new) pairs of charges whose saveID is unchanged but whose
+                        state is not. None for everything else.
+        """
+        self.field: str = field
+        self.old: Any = old
+        self.new: Any = new
+        self.added: List[Any] = added
+        self.removed: List[Any] = removed
+        self.changed: List[Tuple[Any, Any]] = changed
+
+    def is_list(self) -> bool:
+        return self.added is not None
+
+    def __repr__(self):
+        if self.is_list():
+            return f"SlotChange({self.field!r}, added={self.added!r}, removed={self.removed!r}, " \
+                   f"changed={self.changed!r})"
+        return f"SlotChange({self.field!r}, {self.old!r} -> {self.new!r})"
+
+
+class SlotIndex:
+    def __init__(self, fingerprints: List[bytes]):
+        """
+        Index from save slot fingerprint to slot position, for telling which slots changed between two reads of the
+        save file without comparing their contents.
+        :param fingerprints: The fingerprint of each save slot, in save file order.
+        """
+        self.fingerprints: List[bytes] = fingerprints
+        self.positions: Dict[bytes, List[int]] = dict()
+        for position, fingerprint in enumerate(fingerprints):
+            self.positions.setdefault(fingerprint, list()).append(position)
+
+    def __contains__(self, fingerprint: bytes) -> bool:
+        return fingerprint in self.positions
+
+    def unmatched(self, other: "SlotIndex") -> List[int]:
+        """
+        Find the slots of another index that have no identical slot in this one. Each slot here matches one slot
+        of the other index at most, so of two identical slots only one may be matched. Ties are broken by position:
+        a slot that has an identical slot at the same position here is always matched, and the others are matched
+        in save file order.
+        :param other: The index to look up, e.g. the current save file when this index is the previous one.
+        :return: Positions within the other index of slots that were added or changed, in save file order.
+        """
+        unmatched = list()
+        for fingerprint, other_positions in other.positions.items():
+            positions = self.positions.get(fingerprint, ())
+            if len(positions) >= len(other_positions):
+                continue
+            # More identical slots than this index has: leave the last of those not at one of our positions unmatched
+            moved = [position for position in other_positions if position not in positions]
+            unmatched += moved[len(moved) - (len(other_positions) - len(positions)):]
+        return sorted(unmatched)
+
+
+def item_key(item: Any) -> Any:
+    # Hashable stand-in for a list item, so dictionaries such as savedCharges entries can be used in sets
+    if isinstance(item, dict):
+        return tuple(sorted((key, item_key(value)) for key, value in item.items()))
+    if isinstance(item, list):
+        return tuple(item_key(value) for value in item)
+    return item
+
+
+def diff_lists(field: str, old: List[Any], new: List[Any]) -> List[SlotChange]:
+    old = old or list()
+    new = new or list()
+    if old == new:
+        return list()
+    old_keys = {item_key(item) for item in old}
+    new_keys = {item_key(item) for item in new}
+    added = [item for item in new if item_key(item) not in old_keys]
+    removed = [item for item in old if item_key(item) not in new_keys]
+    if not added and not removed:
+        # Only the order of the items changed
+        return list()
+    return [SlotChange(field, old, new, added, removed)]
+
+
+def diff_charges(field: str, old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> List[SlotChange]:
+    # Charges are keyed by saveID, so a charge changing state is a change to that charge rather than a new item
+    old = old or list()
+    new = new or list()
+    if old == new:
+        return list()
+    if not all(isinstance(charge, dict) and "saveID" in charge for charge in itertools.chain(old, new)):
+        return diff_lists(field, old, new)
+    old_charges = {charge["saveID"]: charge for charge in old}
+    new_charges = {charge["saveID"]: charge for charge in new}
+    added = [charge for save_id, charge in new_charges.items() if save_id not in old_charges]
+    removed = [charge for save_id, charge in old_charges.items() if save_id not in new_charges]
+    changed = [(old_charges[save_id], charge) for save_id, charge in new_charges.items()
+               if save_id in old_charges and old_charges[save_id] != charge]
+    if not added and not removed and not changed:
+        return list()
+    return [SlotChange(field, old, new, added, removed, changed)]
+
+
+def diff_scalars(field: str, old: Any, new: Any) -> List[SlotChange]:
+    if old == new:
+        return list()
+    if isinstance(old, dict) and isinstance(new, dict):
+        # Report nested dictionaries such as respawnPoint key by key
+        return [SlotChange(f"{field}['{key}']", old.get(key), new.get(key))
+                for key in dict.fromkeys(list(old) + list(new)) if old.get(key) != new.get(key)]
+    return [SlotChange(field, old, new)]
+
+
+def diff_slots(prev_slot: SaveSlot, slot: SaveSlot) -> List[SlotChange]:
+    """
+    Compare two versions of a save slot field by field, using the known save slot schema.
+    :param prev_slot: The save slot as of the previous checkpoint.
+    :param slot: The save slot as of the current checkpoint.
+    :return: A list of SlotChange records, scalar fields first, then list fields. Empty if nothing changed.
+    """
+    prev_fields: Dict[str, Any] = vars(prev_slot)
+    fields: Dict[str, Any] = vars(slot)
+    changes = list()
+    for field in scalar_fields:
+        changes += diff_scalars(field, prev_fields.get(field, getattr(SaveSlot, field)),
+                                fields.get(field, getattr(SaveSlot, field)))
+    # Attributes written by a newer version of the game than this schema knows about
+    for field in sorted((fields.keys() | prev_fields.keys()) - SaveSlot.__annotations__.keys()):
+        changes += diff_scalars(field, prev_fields.get(field), fields.get(field))
+    for field in list_fields:
+        diff = diff_charges if field == "savedCharges" else diff_lists
+        changes += diff(field, prev_fields.get(field), fields.get(field))
+    return changes
@@ -0,0 +1,143 @@
+import random
+from pathlib import Path
+from datetime import datetime, timedelta
+from typing import List, Sequence, Union
+
+import Teslagrad2Data
+
+# Equipment and bosses roughly in the order a playthrough gets them, with the share of the game played by then
+# and the pin trigger the game sets along with them, if any
+progression = (
+    (0.05, "blinkUnlocked", None),
+    (0.10, "cloakUnlocked", None),
+    (0.15, "hulderBossfightBeaten", "pinCollected_HuldrFight"),
+    (0.20, "mapUnlocked", None),
+    (0.25, "waterblinkUnlocked", "pinCollected_WaterBlinkPickup"),
+    (0.30, "mooseBossFightBeaten", "pinCollected_MooseFight"),
+    (0.35, "powerSlideUnlocked", "pinCollected_SlidePickup"),
+    (0.40, "mjolnirUnlocked", "pinCollected_MjolnirPickup"),
+    (0.45, "trollMiniBossFightBeaten", None),
+    (0.50, "fafnirBossFightBeaten", "pinCollected_FafnirFight"),
+    (0.55, "axeUnlocked", None),
+    (0.60, "blinkWireAxeUnlocked", "pinCollected_BlinkAxe"),
+    (0.65, "halvtannBossFightBeaten", "pinCollected_HalvtannFight"),
+    (0.70, "doubleJumpUnlocked", "pinCollected_DoubleJump"),
+    (0.75, "redCloakUnlocked", "pinCollected_RedCloak"),
+    (0.80, "hasMetGalvan", None),
+    (0.85, "galvanBossFightBeaten", "pinCollected_GalvanFight"),
+    (0.90, "omniBlinkUnlocked", "pinCollected_OmniBlink"),
+    (0.95, "secretsMapUnlocked", "pinCollected_MapSecretsPickup"),
+)
+pin_triggers = {trigger for _, _, trigger in progression if trigger is not None}
+# Triggers set by playing rather than by collecting equipment or beating bosses
+play_triggers = tuple(trigger for trigger in Teslagrad2Data.triggers if trigger not in pin_triggers)
+# In-game time of a complete playthrough
+full_playtime = timedelta(hours=3)
+charge_states = ("Neutral", "Positive", "Negative")
+
+
+# The in-game timer as the game writes it, hours:minutes:seconds with hundredths
+def time_spent_text(timespan: timedelta) -> str:
+    hundredths = round(timespan.total_seconds() * 100)
+    minutes, hundredths = divmod(hundredths, 6000)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{hundredths // 100:02d}.{hundredths % 100:02d}"
+
+
+def generate_slot(progress: float, rng: random.Random, started: datetime = None) -> Teslagrad2Data.SaveSlot:
+    """
+    Build a save slot as the game would have written it after playing a share of the game. Equipment, bosses and
+    their pin triggers follow the order of a playthrough, and triggers, scrolls, map shapes and charges are drawn
+    at random in proportion to progress, consistently enough that SaveFile.checksum() has nothing to correct.
+    :param progress: Share of the game played, from 0 for a new game to 1 for a completed one.
+    :param rng: Source of randomness, so the same seed generates the same slot.
+    :param started: When the slot was created. Defaults to a fixed date.
+    :return: A new SaveSlot.
+    """
+    slot = Teslagrad2Data.SaveSlot()
+    time_spent = full_playtime * progress * rng.uniform(0.8, 1.2)
+    started = started or datetime(2023, 5, 20, 19, 47, 21, rng.randrange(1000000))
+    # Real time runs ahead of the in-game timer through menus and loading screens
+    slot.dateModified = started + time_spent * rng.uniform(1.0, 1.1)
+    slot.timeSpent = time_spent_text(time_spent)
+    slot.respawnScene = rng.choice(list(Teslagrad2Data.scenes.keys()))
+    slot.respawnPoint = dict(Teslagrad2Data.scenes[slot.respawnScene])
+    slot.respawnFacingRight = rng.random() < 0.5
+    slot.triggersSet = rng.sample(play_triggers, int(progress * len(play_triggers)))
+    for threshold, flag, trigger in progression:
+        setattr(slot, flag, progress >= threshold)
+        if progress >= threshold and trigger is not None:
+            slot.triggersSet.append(trigger)
+    slot.scrollsPickedUp = rng.sample(Teslagrad2Data.scrolls, int(progress * len(Teslagrad2Data.scrolls)))
+    slot.scrollsSeenInCollection = rng.sample(slot.scrollsPickedUp, len(slot.scrollsPickedUp) // 2)
+    slot.mapShapesUnlocked = rng.sample(Teslagrad2Data.map_shapes, int(progress * len(Teslagrad2Data.map_shapes)))
+    slot.mapShapesUnlocked += slot.scrollsPickedUp
+    slot.activitiesUnlocked = list()
+    slot.savedResetInfos = list()
+    slot.savedCharges = [{"saveID": f"Attractor-Teleporter--{rng.randrange(10 ** 9)}",
+                          "charge": rng.choice(charge_states)}
+                         for _ in range(int(progress * 20))]
+    slot.gameWasCompletedOnce = progress >= 1
+    return slot
+
+
+def next_checkpoint(slot: Teslagrad2Data.SaveSlot, rng: random.Random) -> Teslagrad2Data.SaveSlot:
+    """
+    The same slot at the game's next save: some time later, at a new scene, with a few new triggers, maybe a
+    scroll and its map shape, and now and then the next piece of equipment or boss.
+    :param slot: The slot as of the previous save, which is left unchanged.
+    :param rng: Source of randomness.
+    :return: A new SaveSlot.
+    """
+    following = Teslagrad2Data.SaveSlot(dict(vars(slot)))
+    elapsed = timedelta(seconds=rng.uniform(5, 90))
+    following.dateModified = slot.dateModified + elapsed
+    following.timeSpent = time_spent_text(slot.playtime() + elapsed * rng.uniform(0.9, 1.0))
+    following.respawnScene = rng.choice(list(Teslagrad2Data.scenes.keys()))
+    following.respawnPoint = dict(Teslagrad2Data.scenes[following.respawnScene])
+    following.triggersSet = slot.triggersSet + [trigger for trigger in rng.sample(play_triggers, 3)
+                                                if trigger not in slot.triggersSet]
+    new_scrolls = [scroll for scroll in rng.sample(Teslagrad2Data.scrolls, 1) if scroll not in slot.scrollsPickedUp]
+    following.scrollsPickedUp = slot.scrollsPickedUp + new_scrolls
+    following.mapShapesUnlocked = slot.mapShapesUnlocked + new_scrolls
+    if rng.random() < 0.2:
+        for _, flag, trigger in progression:
+            if not getattr(slot, flag):
+                setattr(following, flag, True)
+                if trigger is not None:
+                    following.triggersSet = following.triggersSet + [trigger]
+                break
+    return following
+
+
+def generate_save_file(slot_count: int, progress: Union[float, Sequence[float]] = None,
+                       rng: random.Random = None) -> Teslagrad2Data.SaveFile:
+    """
+    Build a save file of generated slots.
+    :param slot_count: Number of save slots.
+    :param progress: Share of the game played in every slot, or in each slot in turn. Random if left out.
+    :param rng: Source of randomness. Defaults to a fixed seed, so the same arguments give the same file.
+    :return: A new SaveFile, whose path is left at the game's save file until it is changed.
+    """
+    rng = rng or random.Random(0)
+    if progress is None:
+        levels: List[float] = [rng.random() for _ in range(slot_count)]
+    elif isinstance(progress, (int, float)):
+        levels = [progress] * slot_count
+    else:
+        levels = [progress[index % len(progress)] for index in range(slot_count)]
+    return Teslagrad2Data.SaveFile([generate_slot(level, rng) for level in levels])
+
+
+def save_file_text(slots: List[Teslagrad2Data.SaveSlot], directory: Path) -> str:
+    """
+    Serialize save slots to YAML exactly as the Save Editor writes them, leaving the slots as they are.
+    :param slots: The save slots.
+    :param directory: Directory to write Saves.yaml to.
+    :return: The contents of the written file.
+    """
+    save_file = Teslagrad2Data.SaveFile(slots)
+    save_file.save_file_path = directory / 'Saves.yaml'
+    save_file.checksum = lambda: None
+    save_file.write()
+    return save_file.save_file_path.read_text(encoding='utf-8')
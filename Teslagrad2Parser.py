@@ -0,0 +1,273 @@
+import re
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+# Parser for the subset of YAML that Teslagrad 2 writes to Saves.yaml: a single saveDataSlots sequence of flat
+# mappings, whose values are plain or quoted scalars, flow or block sequences, and small nested mappings
+# (respawnPoint, and the saveID/charge dictionaries in savedCharges). Anything outside that subset raises a
+# ValueError, and SaveFile.read falls back to ruamel.yaml, which remains the reference implementation.
+
+# Scalar resolution rules of the YAML 1.2 core schema, as applied by ruamel.yaml
+NULLS = {"", "~", "null", "Null", "NULL"}
+BOOLS = {"true": True, "True": True, "TRUE": True, "false": False, "False": False, "FALSE": False}
+INT_RE = re.compile(r"[-+]?[0-9]+$")
+FLOAT_RE = re.compile(r"[-+]?(\.[0-9]+|[0-9]+(\.[0-9]*)?([eE][-+]?[0-9]+)?)$")
+# Plain scalars that look like numbers in forms the game never writes, such as 0x1F, 1_000 or -.5e3. ruamel.yaml
+# resolves some of them to numbers and leaves others as strings, so they are all left to it.
+NUMBER_LIKE_RE = re.compile(r"[-+]?\.?[0-9][0-9A-Za-z_.+-]*$")
+TIMESTAMP_RE = re.compile(r"(\d{4})-(\d\d?)-(\d\d?)(?:[Tt]|[ \t]+)(\d\d?):(\d\d):(\d\d)(?:\.(\d*))?"
+                          r"[ \t]*(Z|[-+]\d\d?(?::?\d\d)?)?$")
+# Characters that change the meaning of a plain scalar, which the game never writes unquoted
+PLAIN_INDICATORS = "[]{}&*!|>'\"%@`#,"
+
+
+def resolve_timestamp(match) -> datetime:
+    # ruamel.yaml rounds the game's 7 fractional digits to 6, applies the UTC offset and drops the tzinfo
+    year, month, day, hour, minute, second, fraction, tz = match.groups()
+    fraction = fraction or ""
+    microsecond = int(fraction[:6].ljust(6, "0"))
+    timestamp = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second), microsecond)
+    if len(fraction) > 6 and fraction[6] > "4":
+        timestamp += timedelta(microseconds=1)
+    if tz and tz != "Z":
+        sign = -1 if tz[0] == "-" else 1
+        hours, _, minutes = tz[1:].partition(":")
+        if not minutes and len(hours) > 2:
+            hours, minutes = hours[:-2], hours[-2:]
+        timestamp -= sign * timedelta(hours=int(hours), minutes=int(minutes or 0))
+    return timestamp
+
+
+def resolve_scalar(text: str) -> Any:
+    if text in NULLS:
+        return None
+    if text in BOOLS:
+        return BOOLS[text]
+    if text[0] == "'":
+        if len(text) < 2 or text[-1] != "'":
+            raise ValueError(f"Unterminated quoted scalar: {text}")
+        return text[1:-1].replace("''", "'")
+    if text[0] == '"':
+        if len(text) < 2 or text[-1] != '"' or "\\" in text:
+            raise ValueError(f"Unsupported double quoted scalar: {text}")
+        return text[1:-1]
+    if INT_RE.match(text):
+        return int(text)
+    if FLOAT_RE.match(text):
+        return float(text)
+    if text in (".inf", "+.inf", ".Inf", "+.Inf", ".INF", "+.INF"):
+        return float("inf")
+    if text in ("-.inf", "-.Inf", "-.INF"):
+        return float("-inf")
+    if text in (".nan", ".NaN", ".NAN"):
+        return float("nan")
+    if text[0].isdigit():
+        match = TIMESTAMP_RE.match(text)
+        if match:
+            return resolve_timestamp(match)
+        if text[:4].isdigit() and text[4:5] == "-":
+            raise ValueError(f"Unsupported date scalar: {text}")
+    if NUMBER_LIKE_RE.match(text):
+        raise ValueError(f"Unsupported numeric scalar: {text}")
+    if text[0] in PLAIN_INDICATORS or text[0] in "-?:" and text[1:2] in ("", " ") \
+            or ": " in text or " #" in text or text.endswith(":"):
+        raise ValueError(f"Unsupported plain scalar: {text}")
+    return text
+
+
+def split_flow(text: str) -> List[str]:
+    # Split the inside of a flow collection on its top-level commas, respecting quotes and nesting
+    items = list()
+    depth = 0
+    quote = None
+    start = 0
+    for index, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "[{":
+            depth += 1
+        elif char in "]}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            items.append(text[start:index].strip())
+            start = index + 1
+    if quote or depth:
+        raise ValueError(f"Unbalanced flow collection: {text}")
+    last = text[start:].strip()
+    if last:
+        items.append(last)
+    elif items:
+        raise ValueError(f"Empty flow collection entry: {text}")
+    return items
+
+
+def parse_value(text: str, anchors: Dict[str, Any]) -> Any:
+    # Parse an inline value: a scalar, an alias, an anchored value or a flow collection
+    if text[0] == "&":
+        name, _, rest = text.partition(" ")
+        value = parse_value(rest.strip(), anchors)
+        anchors[name[1:]] = value
+        return value
+    if text[0] == "*":
+        if text[1:] not in anchors:
+            raise ValueError(f"Unknown alias: {text}")
+        return anchors[text[1:]]
+    if text[0] == "[":
+        if text[-1] != "]":
+            raise ValueError(f"Unsupported flow sequence: {text}")
+        return [parse_value(item, anchors) for item in split_flow(text[1:-1])]
+    if text[0] == "{":
+        if text[-1] != "}":
+            raise ValueError(f"Unsupported flow mapping: {text}")
+        mapping = dict()
+        for item in split_flow(text[1:-1]):
+            key, value = split_key(item)
+            mapping[key] = parse_value(value, anchors) if value else None
+        return mapping
+    return resolve_scalar(text)
+
+
+def split_key(text: str) -> Tuple[str, str]:
+    # Split "key: value" into its key and raw value. The game's keys are always plain identifiers.
+    key, separator, value = text.partition(":")
+    if not separator or not key or (value and value[0] != " ") or key[0] in "'\"?&*!":
+        raise ValueError(f"Unsupported mapping entry: {text}")
+    return key.strip(), value.strip()
+
+
+def parse_lines(text: str) -> List[Tuple[int, str]]:
+    # Reduce the document to (indent, content) pairs, dropping blank lines, comments and document markers
+    lines = list()
+    for line in text.splitlines():
+        content = line.strip()
+        if not content or content[0] == "#" or content in ("---", "..."):
+            continue
+        if content[0] == "%" or "\t" in line[:len(line) - len(line.lstrip())]:
+            raise ValueError(f"Unsupported line: {line}")
+        lines.append((len(line) - len(line.lstrip(" ")), content))
+    return lines
+
+
+def parse_block(lines: List[Tuple[int, str]], position: int, indent: int, anchors: Dict[str, Any]):
+    """
+    Parse the block collection starting at lines[position], whose entries sit at the given indent.
+    :return: The parsed list or dictionary, and the position of the first line after the block.
+    """
+    if lines[position][1].startswith("- ") or lines[position][1] == "-":
+        sequence = list()
+        while position < len(lines) and lines[position][0] == indent and \
+                (lines[position][1].startswith("- ") or lines[position][1] == "-"):
+            item = lines[position][1][2:].strip()
+            position += 1
+            if not item:
+                raise ValueError("Unsupported nested block sequence entry")
+            if item[0] not in "'\"[{&*" and ":" in item and (item.endswith(":") or ": " in item):
+                # A mapping inside the sequence, continued on the lines indented past the dash
+                mapping, position = parse_mapping(lines, position, indent + 2, anchors, item)
+                sequence.append(mapping)
+            else:
+                sequence.append(parse_value(item, anchors))
+        return sequence, position
+    return parse_mapping(lines, position, indent, anchors)
+
+
+def parse_mapping(lines: List[Tuple[int, str]], position: int, indent: int, anchors: Dict[str, Any],
+                  first_entry: str = None, mapping: Dict[str, Any] = None):
+    mapping = dict() if mapping is None else mapping
+    entry = first_entry
+    while True:
+        if entry is None:
+            if position >= len(lines) or lines[position][0] != indent or lines[position][1].startswith("- "):
+                if position < len(lines) and lines[position][0] > indent:
+                    raise ValueError(f"Unexpected indentation: {lines[position][1]}")
+                return mapping, position
+            entry = lines[position][1]
+            position += 1
+        key, value = split_key(entry)
+        entry = None
+        anchor = None
+        if value.startswith("&") and " " not in value:
+            anchor, value = value[1:], ""
+        if value:
+            mapping[key] = parse_value(value, anchors)
+        elif position < len(lines) and (lines[position][0] > indent or
+                                        lines[position][0] == indent and lines[position][1].startswith("- ")):
+            # A nested block collection. Sequences may sit at the same indent as their key.
+            mapping[key], position = parse_block(lines, position, lines[position][0], anchors)
+        else:
+            mapping[key] = None
+        if anchor:
+            anchors[anchor] = mapping[key]
+
+
+def fingerprint(lines: List[Tuple[int, str]]) -> bytes:
+    # Cheap structural fingerprint of one save slot: a short hash of its lines, indentation included
+    digest = hashlib.blake2b(digest_size=8)
+    for indent, content in lines:
+        digest.update(f"{indent}{content}\n".encode('utf-8'))
+    return digest.digest()
+
+
+def parse_header(lines: List[Tuple[int, str]]) -> bool:
+    # Check the saveDataSlots header, returning False when the document holds no save slots at all
+    if not lines or lines[0][0] != 0 or not lines[0][1].startswith("saveDataSlots:"):
+        raise ValueError("Save file does not start with saveDataSlots")
+    _, header_value = split_key(lines[0][1])
+    if header_value:
+        if header_value != "[]" or len(lines) > 1:
+            raise ValueError(f"Unsupported saveDataSlots value: {header_value}")
+        return False
+    return len(lines) > 1
+
+
+def parse_save_slots(text: str, slot_type, fingerprints: List[bytes] = None) -> List[Any]:
+    """
+    Parse the contents of Saves.yaml straight into save slot objects.
+    :param text: The decoded contents of the save file.
+    :param slot_type: The class to instantiate for each save slot, i.e. Teslagrad2Data.SaveSlot.
+    :param fingerprints: Optional list to which the fingerprint of each save slot is appended.
+    :return: A list of slot_type objects whose attributes are the keys of each save slot.
+    :raises ValueError: When the document uses YAML outside the subset written by Teslagrad 2.
+    """
+    lines = parse_lines(text)
+    slots = list()
+    if not parse_header(lines):
+        return slots
+
+    anchors = dict()
+    position = 1
+    indent = lines[position][0]
+    while position < len(lines):
+        line_indent, content = lines[position]
+        if line_indent != indent or not content.startswith("- "):
+            raise ValueError(f"Unexpected line in saveDataSlots: {content}")
+        # Skip SaveSlot.__init__ and fill the new object's attributes directly
+        slot = slot_type.__new__(slot_type)
+        start = position
+        _, position = parse_mapping(lines, position + 1, indent + 2, anchors, content[2:].strip(), slot.__dict__)
+        slots.append(slot)
+        if fingerprints is not None:
+            fingerprints.append(fingerprint(lines[start:position]))
+    return slots
+
+
+def slot_fingerprints(text: str) -> List[bytes]:
+    """
+    Fingerprint the save slots of a save file without parsing them, for files the fast parser does not accept.
+    :param text: The decoded contents of the save file.
+    :return: The fingerprint of each save slot, identical to those computed by parse_save_slots.
+    :raises ValueError: When the save slots are not a block sequence.
+    """
+    lines = parse_lines(text)
+    if not parse_header(lines):
+        return list()
+    indent = lines[1][0]
+    starts = [position for position, (line_indent, content) in enumerate(lines)
+              if line_indent == indent and content.startswith("- ")]
+    if not starts or starts[0] != 1 or any(line_indent < indent for line_indent, _ in lines[1:]):
+        raise ValueError("Save slots are not a block sequence")
+    return [fingerprint(lines[start:end]) for start, end in zip(starts, starts[1:] + [len(lines)])]
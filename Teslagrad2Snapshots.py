@@ -0,0 +1,204 @@
+import json
+import lzma
+import zlib
+import struct
+from bisect import bisect_right
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from Teslagrad2Data import SaveSlot
+
+# A snapshot store file starts with this line, then a header giving the codec, the checkpoint each block starts at
+# and the length of each block, then the blocks themselves
+MAGIC = b"TeslaTwools snapshots 1\n"
+HEADER_LENGTH = struct.Struct("<I")
+# Compress and decompress a block of checkpoints
+codecs = {
+    "zlib": (lambda data: zlib.compress(data, 9), zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+def field_delta(previous: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The fields of a slot that changed since the previous checkpoint. Lists the game only added to, which is nearly
+    always the case, hold just the new items under the field's name prefixed with "+".
+    :param previous: The exported fields of the previous checkpoint.
+    :param fields: The exported fields of this checkpoint.
+    :return: The changed fields.
+    """
+    delta = dict()
+    for field, value in fields.items():
+        old = previous.get(field)
+        if value == old:
+            continue
+        if isinstance(value, list) and isinstance(old, list) and len(value) > len(old) and value[:len(old)] == old:
+            delta["+" + field] = value[len(old):]
+        else:
+            delta[field] = value
+    return delta
+
+
+def apply_delta(fields: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    # The fields of the next checkpoint, leaving those of this one as they are
+    following = dict(fields)
+    for field, value in delta.items():
+        if field.startswith("+"):
+            following[field[1:]] = following[field[1:]] + value
+        else:
+            following[field] = value
+    return following
+
+
+def slot_from_fields(fields: Dict[str, Any]) -> SaveSlot:
+    # export() writes dateModified in local time with its offset, while parsed slots hold it in UTC without one
+    slot = SaveSlot(fields)
+    slot.dateModified = datetime.fromisoformat(fields["dateModified"]).astimezone(timezone.utc).replace(tzinfo=None)
+    return slot
+
+
+class SlotSnapshotStore:
+    def __init__(self, keyframe_interval: int = 32, codec: str = "zlib"):
+        """
+        The checkpoints of one save slot, kept as blocks of a full keyframe followed by the fields that changed at
+        each checkpoint after it, in the field model of SaveSlot.export(). A block is compressed once it is full.
+        A new block starts every keyframe_interval checkpoints, or sooner if the changes since the keyframe grow
+        larger than the keyframe, so reconstructing any checkpoint reads one block at most.
+        This is not the save history's format: a replay must hand the File Watcher each version of the whole save
+        file byte for byte, while a store holds one slot's fields, which do not give back the bytes they were read from.
+        :param keyframe_interval: Most checkpoints in a block.
+        :param codec: "zlib" or "lzma".
+        """
+        self.keyframe_interval = keyframe_interval
+        self.codec = codec
+        self.compress, self.decompress = codecs[codec]
+        # The compressed blocks, and the checkpoint each block starts at
+        self.blocks: List[bytes] = list()
+        self.block_starts: List[int] = list()
+        # The block being filled: its keyframe and deltas, their JSON length so far, and the latest fields
+        self.open_block: List[Dict[str, Any]] = list()
+        self.open_block_start = 0
+        self.open_keyframe_length = 0
+        self.open_delta_length = 0
+        self.latest: Dict[str, Any] = None
+        # In-game time of each checkpoint, in seconds, to find checkpoints by time
+        self.playtimes: List[float] = list()
+        # The block decompressed last, as sequential reads go through the same block many times over
+        self.cached_block_number: int = None
+        self.cached_block: List[Dict[str, Any]] = None
+
+    def __len__(self) -> int:
+        return len(self.playtimes)
+
+    def append(self, slot: SaveSlot) -> int:
+        """
+        Add the next checkpoint of the slot.
+        :param slot: The slot as of this checkpoint.
+        :return: The number of the checkpoint, from 0.
+        """
+        fields = slot.export()
+        if self.latest is not None:
+            delta = field_delta(self.latest, fields)
+            delta_length = len(json.dumps(delta, separators=(',', ':')))
+            if len(self.open_block) < self.keyframe_interval and \
+                    self.open_delta_length + delta_length <= self.open_keyframe_length:
+                self.open_block.append(delta)
+                self.open_delta_length += delta_length
+            else:
+                self.seal_block()
+        if not self.open_block:
+            self.open_block = [fields]
+            self.open_block_start = len(self.playtimes)
+            self.open_keyframe_length = len(json.dumps(fields, separators=(',', ':')))
+            self.open_delta_length = 0
+        self.latest = fields
+        self.playtimes.append(slot.playtime().total_seconds())
+        return len(self.playtimes) - 1
+
+    def seal_block(self):
+        # Compress the open block, so the next checkpoint starts a block with a keyframe
+        if self.open_block:
+            self.blocks.append(self.compress(json.dumps(self.open_block, separators=(',', ':')).encode('utf-8')))
+            self.block_starts.append(self.open_block_start)
+            self.open_block = list()
+
+    def block(self, block_number: int) -> List[Dict[str, Any]]:
+        if block_number == len(self.blocks):
+            return self.open_block
+        if block_number != self.cached_block_number:
+            self.cached_block = json.loads(self.decompress(self.blocks[block_number]))
+            self.cached_block_number = block_number
+        return self.cached_block
+
+    def fields(self, index: int) -> Dict[str, Any]:
+        """
+        Reconstruct the exported fields of a checkpoint, from its block's keyframe and the deltas after it.
+        :param index: The number of the checkpoint, from 0. Negative numbers count from the end.
+        :return: The fields as SaveSlot.export() gave them.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"checkpoint {index} out of range")
+        if index >= self.open_block_start and self.open_block:
+            block_number, start = len(self.blocks), self.open_block_start
+        else:
+            block_number = bisect_right(self.block_starts, index) - 1
+            start = self.block_starts[block_number]
+        block = self.block(block_number)
+        fields = block[0]
+        for delta in block[1:index - start + 1]:
+            fields = apply_delta(fields, delta)
+        return fields
+
+    def __getitem__(self, index: int) -> SaveSlot:
+        return slot_from_fields(self.fields(index))
+
+    def index_at(self, playtime: timedelta) -> int:
+        """
+        :param playtime: In-game time.
+        :return: The number of the last checkpoint saved by then, or -1 if there is none.
+        """
+        return bisect_right(self.playtimes, playtime.total_seconds()) - 1
+
+    def storage_bytes(self) -> int:
+        # Compressed blocks, with the open block counted as it would be stored
+        return sum(len(block) for block in self.blocks) + \
+            (len(self.compress(json.dumps(self.open_block, separators=(',', ':')).encode('utf-8')))
+             if self.open_block else 0)
+
+    def write(self, path: Path):
+        self.seal_block()
+        header = json.dumps({"codec": self.codec, "keyframe_interval": self.keyframe_interval,
+                             "block_starts": self.block_starts, "block_lengths": [len(block) for block in self.blocks],
+                             "playtimes": self.playtimes}, separators=(',', ':')).encode('utf-8')
+        with Path(path).open('wb') as store_file:
+            store_file.write(MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+            for block in self.blocks:
+                store_file.write(block)
+
+    @classmethod
+    def read(cls, path: Path) -> "SlotSnapshotStore":
+        """
+        Load a store written by write(). Checkpoints appended to it afterwards start a new block.
+        :param path: The snapshot store file.
+        :return: The store.
+        """
+        data = Path(path).read_bytes()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{path} is not a snapshot store")
+        position = len(MAGIC) + HEADER_LENGTH.size
+        header_length, = HEADER_LENGTH.unpack_from(data, len(MAGIC))
+        header = json.loads(data[position:position + header_length])
+        position += header_length
+        store = cls(header["keyframe_interval"], header["codec"])
+        store.block_starts = header["block_starts"]
+        store.playtimes = header["playtimes"]
+        for length in header["block_lengths"]:
+            store.blocks.append(data[position:position + length])
+            position += length
+        if store.playtimes:
+            store.latest = store.fields(len(store.playtimes) - 1)
+            store.open_block_start = len(store.playtimes)
+        return store
@@ -0,0 +1,22 @@
+import pytest
+
+from Teslagrad2Generator import save_file_text
+from TeslaTwoolsChannel import UpdateChannel
+from TeslaTwoolsWatcher import FileWatcher
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    file_watcher = FileWatcher(UpdateChannel(), notifier_backend="polling", save_directory=tmp_path,
+                               watch_save_file=False)
+    yield file_watcher
+    file_watcher.stop()
+
+
+@pytest.fixture
+def play(watcher):
+    def feed_versions(slots):
+        # Feed each version of the save file through the watcher, as the game would have written them
+        for mtime, slot_list in enumerate(slots, start=1):
+            watcher.feed(save_file_text(slot_list, watcher.tesla_2_path).encode('utf-8'), mtime * 10 ** 9)
+    return feed_versions
@@ -0,0 +1,66 @@
+import copy
+import random
+from datetime import timedelta
+
+import pytest
+
+from Teslagrad2Generator import generate_slot, save_file_text
+from TeslaTwoolsAnalyzer import SaveAnalyzer
+from TeslaTwoolsStatus import States
+
+
+@pytest.fixture
+def slots():
+    rng = random.Random(6)
+    return [generate_slot(progress, rng) for progress in (0.2, 0.4, 0.6)]
+
+
+def analyze(tmp_path, *versions):
+    # Analyze each version of the save file in turn, returning the analysis of the last one
+    analyzer = SaveAnalyzer()
+    for slot_list in versions:
+        analysis = analyzer.analyze(save_file_text(slot_list, tmp_path).encode('utf-8'))
+    return analysis
+
+
+def twin(slot):
+    # A deep copy, as sharing lists would have the twins written with YAML anchors
+    return copy.deepcopy(slot)
+
+
+def test_slot_deleted_from_the_middle(tmp_path, slots):
+    analysis = analyze(tmp_path, slots, [slots[0], slots[2]])
+    assert analysis.state == States.SAVE_SLOT_DELETED
+    assert analysis.slot_number == 2
+
+
+def test_slot_inserted_in_the_middle(tmp_path, slots):
+    analysis = analyze(tmp_path, [slots[0], slots[2]], slots)
+    assert analysis.state == States.SAVE_SLOT_ADDED
+    assert analysis.slot_number == 2
+    assert analysis.slot.dateModified == slots[1].dateModified
+
+
+def test_identical_slot_deleted(tmp_path, slots):
+    # Either twin may have been deleted, but never the slot after them
+    analysis = analyze(tmp_path, [slots[0], twin(slots[0]), slots[1]], [slots[0], slots[1]])
+    assert analysis.state == States.SAVE_SLOT_DELETED
+    assert analysis.slot_number == 2
+
+
+def test_identical_slot_added(tmp_path, slots):
+    analysis = analyze(tmp_path, [slots[0], slots[1]], [slots[0], twin(slots[0]), slots[1]])
+    assert analysis.state == States.SAVE_SLOT_ADDED
+    assert analysis.slot_number == 2
+
+
+@pytest.mark.parametrize("updated", [0, 1])
+def test_one_of_identical_slots_updated(tmp_path, slots, updated):
+    versions = [[twin(slots[0]), twin(slots[0])], [twin(slots[0]), twin(slots[0])]]
+    following = versions[1][updated]
+    following.dateModified += timedelta(seconds=5)
+    following.triggersSet = following.triggersSet + ["AnalyzerTrigger"]
+    analysis = analyze(tmp_path, *versions)
+    assert analysis.state == States.SAVE_SLOT_UPDATED
+    assert analysis.slot_number == updated + 1
+    assert [change.field for change in analysis.differences] == ["dateModified", "triggersSet"]
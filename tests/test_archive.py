@@ -0,0 +1,38 @@
+import random
+
+from Teslagrad2Generator import generate_slot, next_checkpoint
+from TeslaTwoolsArchive import RunArchive
+from TeslaTwoolsStatus import States
+
+
+def archived_events(archive: RunArchive):
+    return archive.query("SELECT key, value FROM events ORDER BY rowid")
+
+
+def test_live_events_match_imported_log(watcher, play, tmp_path):
+    rng = random.Random(24)
+    slot = generate_slot(0.3, rng)
+    flipped = next_checkpoint(slot, rng)
+    flipped.savedCharges = [dict(charge) for charge in slot.savedCharges]
+    flipped.savedCharges[0]["charge"] = "Positive" if slot.savedCharges[0]["charge"] != "Positive" else "Negative"
+    flipped.savedCharges.append({"saveID": "Attractor-Teleporter--24", "charge": "Neutral"})
+    watcher.save_log_enabled = True
+    watcher.archive_open()
+    play([[slot], [flipped], [next_checkpoint(flipped, rng)]])
+    assert watcher.state == States.SAVE_SLOT_UPDATED
+    watcher.stop()
+
+    live = RunArchive(watcher.run_archive_path)
+    imported = RunArchive(tmp_path / 'Imported.sqlite3')
+    try:
+        assert imported.import_logs(tmp_path) == (1, 0)
+        live_events = archived_events(live)
+        assert live_events == archived_events(imported)
+        # A charge that changed state is archived as the activity log writes it, not as a dictionary
+        state_change = (f"{slot.savedCharges[0]['saveID']}: {slot.savedCharges[0]['charge']} -> "
+                        f"{flipped.savedCharges[0]['charge']}")
+        assert ("savedCharges", state_change) in live_events
+        assert live.event_hits("savedCharges", state_change) == imported.event_hits("savedCharges", state_change)
+    finally:
+        live.close()
+        imported.close()
@@ -0,0 +1,106 @@
+import random
+from datetime import timedelta
+
+import Teslagrad2Data
+from Teslagrad2Diff import SlotChange, diff_charges, diff_lists, diff_scalars, diff_slots
+from Teslagrad2Generator import generate_slot, time_spent_text
+from TeslaTwoolsStatus import States
+
+
+def records(changes):
+    return [(change.field, change.old, change.new, change.added, change.removed, change.changed)
+            for change in changes]
+
+
+def copy_slot(slot: Teslagrad2Data.SaveSlot) -> Teslagrad2Data.SaveSlot:
+    following = Teslagrad2Data.SaveSlot(dict(vars(slot)))
+    for field in ("triggersSet", "scrollsPickedUp", "respawnPoint"):
+        setattr(following, field, type(getattr(slot, field))(getattr(slot, field)))
+    following.savedCharges = [dict(charge) for charge in slot.savedCharges]
+    return following
+
+
+def test_lists_are_compared_as_sets():
+    # Reordering is not a change, and a duplicate of an item already present is not an addition
+    assert diff_lists("triggersSet", ["A", "B"], ["B", "A"]) == []
+    assert diff_lists("triggersSet", ["A", "B"], ["A", "B", "A"]) == []
+    assert diff_lists("triggersSet", None, []) == []
+    changes = diff_lists("triggersSet", ["A", "B", "C"], ["D", "C", "A", "E", "D"])
+    assert records(changes) == [("triggersSet", ["A", "B", "C"], ["D", "C", "A", "E", "D"],
+                                 ["D", "E", "D"], ["B"], None)]
+    assert changes[0].is_list()
+
+
+def test_list_items_may_be_dictionaries():
+    old = [{"id": 1, "tags": ["a"]}]
+    assert diff_lists("activitiesUnlocked", old, [{"tags": ["a"], "id": 1}]) == []
+    assert records(diff_lists("activitiesUnlocked", old, old + [{"id": 2, "tags": []}])) == \
+        [("activitiesUnlocked", old, old + [{"id": 2, "tags": []}], [{"id": 2, "tags": []}], [], None)]
+
+
+def test_charges_are_keyed_by_save_id():
+    old = [{"saveID": "A", "charge": "Neutral"}, {"saveID": "B", "charge": "Positive"},
+           {"saveID": "C", "charge": "Negative"}]
+    new = [{"saveID": "C", "charge": "Negative"}, {"saveID": "A", "charge": "Positive"},
+           {"saveID": "D", "charge": "Neutral"}]
+    change, = diff_charges("savedCharges", old, new)
+    assert change.added == [{"saveID": "D", "charge": "Neutral"}]
+    assert change.removed == [{"saveID": "B", "charge": "Positive"}]
+    assert change.changed == [({"saveID": "A", "charge": "Neutral"}, {"saveID": "A", "charge": "Positive"})]
+    # Reordered charges in the same states are no change at all
+    assert diff_charges("savedCharges", old, old[::-1]) == []
+
+
+def test_charges_without_save_id_fall_back_to_lists():
+    old = [{"charge": "Neutral"}]
+    new = [{"charge": "Positive"}]
+    assert records(diff_charges("savedCharges", old, new)) == \
+        [("savedCharges", old, new, [{"charge": "Positive"}], [{"charge": "Neutral"}], None)]
+
+
+def test_scalars_and_nested_dictionaries():
+    assert diff_scalars("blinkUnlocked", False, False) == []
+    change, = diff_scalars("blinkUnlocked", False, True)
+    assert not change.is_list()
+    assert repr(change) == "SlotChange('blinkUnlocked', False -> True)"
+    assert records(diff_scalars("respawnPoint", {"x": 1.0, "y": 2.0}, {"x": 1.0, "y": 3.0, "z": 4.0})) == \
+        [("respawnPoint['y']", 2.0, 3.0, None, None, None), ("respawnPoint['z']", None, 4.0, None, None, None)]
+
+
+def test_slot_changes_are_ordered_scalars_unknown_lists():
+    prev_slot = generate_slot(0.4, random.Random(5))
+    prev_slot.savedCharges = [{"saveID": "A", "charge": "Neutral"}]
+    slot = copy_slot(prev_slot)
+    slot.savedCharges = [{"saveID": "A", "charge": "Negative"}]
+    slot.triggersSet.append("DiffTrigger")
+    slot.zNewerField = 2
+    slot.aNewerField = 1
+    slot.hasMetGalvan = not prev_slot.hasMetGalvan
+    slot.respawnPoint["x"] += 1
+    assert diff_slots(prev_slot, copy_slot(prev_slot)) == []
+    assert [change.field for change in diff_slots(prev_slot, slot)] == \
+        ["respawnPoint['x']", "hasMetGalvan", "aNewerField", "zNewerField", "triggersSet", "savedCharges"]
+
+
+def test_changes_are_rendered_to_the_activity_log(watcher, play):
+    rng = random.Random(7)
+    slot = generate_slot(0.4, rng)
+    slot.savedCharges = [{"saveID": "Magnet-A", "charge": "Neutral"}]
+    following = copy_slot(slot)
+    following.dateModified = slot.dateModified + timedelta(seconds=5)
+    following.timeSpent = time_spent_text(slot.playtime() + timedelta(seconds=5))
+    following.hasMetGalvan = not slot.hasMetGalvan
+    following.triggersSet.append("DiffTrigger")
+    following.savedCharges = [{"saveID": "Magnet-A", "charge": "Positive"}, {"saveID": "Magnet-B", "charge": "Neutral"}]
+    play([[slot], [following]])
+    assert watcher.state == States.SAVE_SLOT_UPDATED
+    assert [line.split("] ", 1)[1] for line in watcher.activity_log[:] if line.startswith("[")] == [
+        f"hasMetGalvan: {following.hasMetGalvan}",
+        "triggersSet: +DiffTrigger",
+        "savedCharges: +{'saveID': 'Magnet-B', 'charge': 'Neutral'}",
+        "savedCharges: Magnet-A: Neutral -> Positive",
+    ]
+    assert isinstance(watcher.differences[0], SlotChange)
+    assert {"triggersSet": ["DiffTrigger"]} in watcher.new_events
+    assert {"savedCharges": [{"saveID": "Magnet-B", "charge": "Neutral"},
+                             {"saveID": "Magnet-A", "charge": "Positive"}]} in watcher.new_events
@@ -0,0 +1,143 @@
+import time
+import socket
+import threading
+from datetime import timedelta
+
+import pytest
+
+from TeslaTwoolsLiveSplit import LiveSplitClient
+
+
+class LiveSplitServerStub(threading.Thread):
+    def __init__(self, port: int = 0):
+        """
+        Local stand-in for LiveSplit Server, recording the command lines received on each connection.
+        :param port: Port to listen on, or 0 for any free port.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.listener = socket.socket()
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(("127.0.0.1", port))
+        self.listener.listen()
+        self.port = self.listener.getsockname()[1]
+        # The commands of each connection, in the order the connections were accepted
+        self.sessions = list()
+        self.connections = list()
+        self.start()
+
+    @property
+    def received(self):
+        return [command for session in self.sessions for command in session]
+
+    def run(self):
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                return
+            session = list()
+            self.sessions.append(session)
+            self.connections.append(connection)
+            threading.Thread(target=self.receive, args=(connection, session), daemon=True).start()
+
+    @staticmethod
+    def receive(connection, session):
+        buffer = b""
+        while True:
+            try:
+                data = connection.recv(4096)
+            except OSError:
+                return
+            if not data:
+                return
+            *lines, buffer = (buffer + data).split(b"\r\n")
+            session.extend(line.decode('utf-8') for line in lines)
+
+    def wait_received(self, count: int, timeout_secs: float = 5.0):
+        deadline = time.monotonic() + timeout_secs
+        while len(self.received) < count and time.monotonic() < deadline:
+            time.sleep(0.001)
+        return self.received
+
+    def stop(self):
+        # Shutting the sockets down wakes the threads blocked on them, which closing alone does not
+        for sock in [self.listener] + self.connections:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        self.join()
+
+
+@pytest.fixture
+def server():
+    stub = LiveSplitServerStub()
+    yield stub
+    stub.stop()
+
+
+def test_commands_sent_in_order(server):
+    client = LiveSplitClient("127.0.0.1", server.port)
+    client.start_at(timedelta(seconds=1.5))
+    client.split_at(timedelta(minutes=1, seconds=2.345), timedelta(milliseconds=100), splits=2)
+    client.split()
+    client.reset()
+    client.close()
+    expected = ["starttimer", "initgametime", "setgametime 0:00:01.500", "unpausegametime",
+                "pausegametime", "setgametime 0:01:02.345", "split", "split", "setgametime 0:01:02.445",
+                "unpausegametime", "split", "reset"]
+    assert server.wait_received(len(expected)) == expected
+    assert client.sent == len(expected)
+    assert client.dropped == 0
+
+
+def test_one_connection_per_session(server):
+    client = LiveSplitClient("127.0.0.1", server.port)
+    for _ in range(200):
+        client.split()
+    client.close()
+    assert server.wait_received(200) == ["split"] * 200
+    assert len(server.sessions) == 1
+    assert client.connects == 1
+
+
+def test_reconnect_after_outage_drops_nothing(server):
+    client = LiveSplitClient("127.0.0.1", server.port, backoff_initial_secs=0.01, backoff_max_secs=0.05)
+    client.start_timer()
+    client.split()
+    assert server.wait_received(2) == ["starttimer", "split"]
+
+    # LiveSplit goes away, and comes back on the same port while commands keep being queued
+    server.stop()
+    # Let the client's end see the connection closed, as it would by the time the next save is detected
+    time.sleep(0.05)
+    client.split()
+    client.split()
+    time.sleep(0.1)
+    assert client.failed_connects > 0
+    restarted = LiveSplitServerStub(server.port)
+    try:
+        client.split()
+        client.reset()
+        assert restarted.wait_received(4) == ["split", "split", "split", "reset"]
+        client.close()
+        assert client.dropped == 0
+        assert client.connects == 2
+        assert len(restarted.sessions) == 1
+    finally:
+        restarted.stop()
+
+
+def test_stale_commands_are_dropped():
+    # Nothing listens on the port, so the commands age past stale_secs and are dropped rather than sent late
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port = unused.getsockname()[1]
+    client = LiveSplitClient("127.0.0.1", port, backoff_initial_secs=0.01, backoff_max_secs=0.02, stale_secs=0.1)
+    client.split()
+    client.split()
+    time.sleep(0.3)
+    client.close()
+    assert client.sent == 0
+    assert client.dropped == 2
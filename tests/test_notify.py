@@ -0,0 +1,93 @@
+import sys
+import time
+import random
+import threading
+
+import pytest
+
+from Teslagrad2Generator import generate_slot, save_file_text
+from TeslaTwoolsChannel import UpdateChannel
+from TeslaTwoolsNotify import WriteSettler, create_change_notifier
+from TeslaTwoolsStatus import States
+from TeslaTwoolsWatcher import FileWatcher
+
+backends = ["polling"] + (["inotify"] if sys.platform.startswith("linux") else [])
+
+
+def torn_writes(path, versions, chunks: int = 4, pause_secs: float = 0.01):
+    # Rewrite the file with each version in turn, a few bytes at a time, as a slow disk would
+    for text in versions:
+        data = text.encode('utf-8')
+        size = -(-len(data) // chunks)
+        with path.open('wb') as save_file:
+            for start in range(0, len(data), size):
+                if start:
+                    time.sleep(pause_secs)
+                save_file.write(data[start:start + size])
+                save_file.flush()
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_torn_burst_is_parsed_once(tmp_path, backend):
+    rng = random.Random(3)
+    # Generated elsewhere, so the watched file only ever holds what the burst writes
+    generated = tmp_path / 'generated'
+    generated.mkdir()
+    versions = [save_file_text([generate_slot(progress, rng)], generated) for progress in (0.1, 0.2, 0.3)]
+    watcher = FileWatcher(UpdateChannel(), notifier_backend=backend, save_directory=tmp_path, watch_save_file=False)
+    parsed = list()
+    analyze = watcher.save_analyzer.analyze
+    watcher.save_analyzer.analyze = lambda data: parsed.append(data) or analyze(data)
+    try:
+        writer = threading.Thread(target=torn_writes, args=(watcher.save_path, versions))
+        writer.start()
+        # The watch wakes up on the first torn write and waits out the rest of the burst
+        while not watcher.save_path.exists() or not watcher.save_path.stat().st_size:
+            time.sleep(0.001)
+        watcher.watch()
+        writer.join()
+        assert parsed == [versions[-1].encode('utf-8')]
+        assert watcher.state == States.SAVE_FILE_FOUND
+        assert watcher.counters()["reads coalesced"] > 0
+        assert watcher.counters()["settle budgets exceeded"] == 0
+        # The notifier's pending events for the burst do not cause another parse
+        watcher.watch()
+        assert len(parsed) == 1
+    finally:
+        watcher.stop()
+
+
+def counting_settler(path):
+    # A settler that counts its reads of the file
+    settler = WriteSettler(path)
+    settler.reads = 0
+    read = settler.read
+
+    def counted_read():
+        settler.reads += 1
+        return read()
+    settler.read = counted_read
+    return settler
+
+
+def test_complete_save_is_read_at_once(tmp_path):
+    text = save_file_text([generate_slot(0.5, random.Random(4))], tmp_path)
+    path = tmp_path / 'Saves.yaml'
+    settler = counting_settler(path)
+    started = time.monotonic()
+    assert settler.settle(create_change_notifier(path, backend="polling")) == text.encode('utf-8')
+    assert time.monotonic() - started < settler.settle_interval_secs
+    assert settler.reads == 1
+
+
+def test_unknown_final_field_settles_without_the_budget(tmp_path):
+    text = save_file_text([generate_slot(0.5, random.Random(4))], tmp_path) + "  fieldOfANewerVersion: 1\n"
+    path = tmp_path / 'Saves.yaml'
+    path.write_text(text, encoding='utf-8')
+    settler = counting_settler(path)
+    started = time.monotonic()
+    assert settler.settle(create_change_notifier(path, backend="polling")) == text.encode('utf-8')
+    assert time.monotonic() - started < settler.settle_budget_secs / 2
+    assert settler.budget_exceeded == 0
+    # Handed over once unchanged for an interval, without reading it again
+    assert settler.reads == 1
@@ -0,0 +1,146 @@
+import io
+import random
+from datetime import datetime
+
+import pytest
+import ruamel.yaml
+
+import Teslagrad2Data
+import Teslagrad2Parser
+from Teslagrad2Generator import generate_slot, save_file_text
+
+# Plain scalars in forms the game never writes, which the fast parser must resolve exactly as ruamel.yaml does or
+# hand over to it
+scalars = ("0", "-0", "+12", "007", "-007", "09", "1.6", "-20.3301716", "0.", "5.", "00.5", ".5", "-.5", "+.5",
+           "1e3", "1E3", "-1e3", "1e+3", "1e-3", "5.e3", "1.5E+03", "+0.5e-2", ".5e3", "-.5e3", ".5e+3", "-.5e+3",
+           "0x1F", "-0x1F", "+0x1F", "0x_1F", "0X1F", "0o17", "-0o7", "0o_17", "0O17", "0b101", "-0b1", "0b_1",
+           "0B1", "1_000", "+1_0", "1__0", "1_", "0_7", "1_0.5", "1.5_0", "1e_3", "12e", "1.2.3", "0xG", "_1",
+           ".", "-.", ".inf", "-.Inf", ".NaN", "1:20", "1:20:30", "00:12:34.56", "Neutral", "true", "False", "~",
+           "Attractor-Teleporter--146440836", "2023-05-20 19:47:21Z", "2023-05-20T19:47:21.5230556-05:00")
+
+
+# Reduce parsed values to plain Python types so both parsers can be compared, bools apart from ints
+def plain(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [plain(item) for item in value]
+    for value_type in (int, float, str):
+        if isinstance(value, value_type):
+            return value_type.__name__, value_type(value)
+    if isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day, value.hour, value.minute, value.second,
+                        value.microsecond, value.tzinfo)
+    return value
+
+
+# Re-indent a save file so that sequences sit two spaces inside their parent key
+def indented_text(text: str) -> str:
+    yaml = ruamel.yaml.YAML()
+    yaml.indent(mapping=4, sequence=4, offset=2)
+    stream = io.StringIO()
+    yaml.dump(yaml.load(text), stream)
+    return stream.getvalue()
+
+
+@pytest.fixture(scope="module")
+def base_text(tmp_path_factory):
+    # Small slots, as ruamel.yaml reads every variant too
+    rng = random.Random(2)
+    slots = [generate_slot(progress, rng) for progress in (0.2, 0.6)]
+    return save_file_text(slots, tmp_path_factory.mktemp("saves"))
+
+
+# Save file variants covering the YAML constructs the fast parser accepts or must hand to ruamel.yaml
+def parse_corpus(base_text: str):
+    corpus = {
+        "editor": base_text,
+        "crlf": base_text.replace("\n", "\r\n"),
+        "bom": "\ufeff" + base_text,
+        "empty": "saveDataSlots: []\n",
+        "empty-block": "saveDataSlots:\n",
+        "document-markers": "---\n" + base_text + "...\n",
+        "comment": "# Teslagrad 2\n" + base_text,
+        "indented-sequences": indented_text(base_text),
+        "flow": """saveDataSlots:
+- version: 1.6
+  name: 'Lumina''s Slot'
+  dateModified: 2023-05-20T19:47:21.5230556-05:00
+  timeSpent: 01:02:03.45
+  respawnScene: "Viking Hilltop"
+  respawnFacingRight: True
+  respawnPoint: {x: -20.3301716, y: -163.364365}
+  vikingBlimpPosition: 1e3
+  HulderUnderworldChaseProgression: 3
+  triggersSet: [HulderJumpscare1, 'AxeDoor-East Side 2--932330024', "pin_TimeTrialDoor3"]
+  mapShapesUnlocked: ["'Uncover_Grue Lake '", Uncover_Aqueduct]
+  activitiesUnlocked: &id001 []
+  scrollsPickedUp: [14, 3, 81]
+  scrollsSeenInCollection: *id001
+  savedCharges: [{saveID: Attractor-Teleporter--146440836, charge: Neutral}, {saveID: B--1, charge: Positive}]
+  savedResetInfos: []
+  gameWasCompletedOnce: false
+- version: 1.6
+  name: Slot
+  dateModified: 2023-05-20 19:47:21Z
+  timeSpent: 00:00:01.00
+  respawnPoint:
+    x: .inf
+    y: -0.5
+  triggersSet:
+    - Nested
+  savedCharges:
+  - saveID: C--2
+    charge: Negative
+  - {saveID: D--3, charge: Neutral}
+  savedResetInfos: ~
+  gameWasCompletedOnce:
+""",
+        # Constructs outside the game's subset, which must fall back to ruamel.yaml
+        "fallback-comment": base_text.replace("timeSpent: ", "timeSpent: # played\n    "),
+        "fallback-escape": base_text.replace("name: Slot", 'name: "Slot\\t1"'),
+        "fallback-literal": base_text.replace("name: Slot", "name: |\n    Slot"),
+    }
+    # Numbers in forms the game never writes, in place of the first slot's version
+    for scalar in ("0x1F", "1_000", "-.5e3"):
+        corpus[f"scalar-{scalar}"] = base_text.replace("version: ", f"version: {scalar}\n  oldVersion: ", 1)
+    return corpus
+
+
+@pytest.mark.parametrize("scalar", scalars)
+def test_scalar_matches_ruamel(scalar):
+    reference = ruamel.yaml.YAML().load(f"value: {scalar}\n")["value"]
+    try:
+        value = Teslagrad2Parser.resolve_scalar(scalar)
+    except ValueError:
+        # Handed over to ruamel.yaml
+        return
+    assert plain(value) == plain(reference) or value != value and reference != reference
+
+
+def test_corpus_matches_ruamel(base_text):
+    for name, text in parse_corpus(base_text).items():
+        data = text.encode('utf-8')
+        fast, reference = Teslagrad2Data.SaveFile(), Teslagrad2Data.SaveFile()
+        fast.read(data)
+        reference.read_yaml(data.decode('utf-8-sig'))
+        assert [plain(vars(slot)) for slot in fast.saveDataSlots] == \
+            [plain(vars(slot)) for slot in reference.saveDataSlots], name
+
+
+def test_corpus_fingerprints(base_text):
+    # Fingerprints taken while parsing must match those taken without parsing, wherever the fast parser applies
+    fallbacks = set()
+    for name, text in parse_corpus(base_text).items():
+        text = text.encode('utf-8').decode('utf-8-sig')
+        try:
+            Teslagrad2Parser.parse_save_slots(text, Teslagrad2Data.SaveSlot)
+        except ValueError:
+            fallbacks.add(name)
+            continue
+        save_file = Teslagrad2Data.SaveFile()
+        save_file.read(text.encode('utf-8'))
+        assert save_file.fingerprints == Teslagrad2Parser.slot_fingerprints(text), name
+    assert {name for name in parse_corpus(base_text) if name.startswith(("fallback-", "scalar-"))} <= fallbacks
@@ -0,0 +1,95 @@
+import copy
+import random
+from datetime import timedelta
+
+from Teslagrad2Generator import generate_slot, time_spent_text
+from TeslaTwoolsSplits import Split, SplitIndex, SplitSet, SplitTracker, split_stages
+
+
+def test_match_ignores_case():
+    index = SplitIndex([Split("triggersSet", "RunStart"), Split("scrollsPickedUp", "12"),
+                        Split("blinkUnlocked", "True")])
+    assert index.match([{"TRIGGERSSET": ["runstart"]}]) == {0}
+    assert index.match([{"scrollsPickedUp": ["12"]}, {"blinkUnlocked": "true"}]) == {1, 2}
+    assert index.match([{"triggersSet": ["RunStart2"]}, {"cloakUnlocked": "True"}]) == set()
+
+
+def test_match_dictionaries_by_their_items():
+    index = SplitIndex([Split("savedCharges", "{'saveID': 'Magnet-A', 'charge': 'positive'}"),
+                        Split("savedCharges", "{'saveID': 'Magnet-A'}"),
+                        Split("savedCharges", "{'charge': 'Negative'}"),
+                        Split("savedCharges", "{'saveID': 'Magnet-B'}")])
+    assert index.match([{"savedCharges": [{"saveID": "magnet-a", "charge": "Positive"}]}]) == {0, 1}
+    assert index.match([{"savedCharges": [{"saveID": "Magnet-A", "charge": "Negative"}]}]) == {1, 2}
+    assert index.match([{"savedCharges": [{"saveID": "Magnet-C", "charge": "Negative"}]}]) == {2}
+    # A dictionary split never matches a plain item, nor a dictionary of another event
+    assert index.match([{"savedCharges": ["{'saveID': 'Magnet-B'}"]}]) == set()
+    assert index.match([{"activitiesUnlocked": [{"saveID": "Magnet-B"}]}]) == set()
+
+
+def test_one_event_matches_several_splits():
+    index = SplitIndex([Split("triggersSet", "A"), Split("triggersSet", "B"), Split("triggersSet", "a", "group")])
+    assert index.match([{"triggersSet": ["A"]}]) == {0, 2}
+
+
+def test_stages_group_consecutive_splits():
+    splits = SplitSet.from_rows([(1, "triggersSet", "A", "g"), (2, "triggersSet", "B", "g"), (3, "triggersSet", "C"),
+                                 (4, "triggersSet", "D", "g"), (5, "triggersSet", "E", "h"), (6, "triggersSet", "F")])
+    assert split_stages(list(splits)) == [[0, 1], [2], [3], [4], [5]]
+
+
+def test_group_completes_in_any_order():
+    splits = [Split("triggersSet", "Start"), Split("triggersSet", "A", "g"), Split("triggersSet", "B", "g"),
+              Split("triggersSet", "C", "g"), Split("triggersSet", "End")]
+    tracker = SplitTracker(splits)
+    assert tracker.advance([{"triggersSet": ["Start"]}]) == [0]
+    # The end is not pending until the group is done
+    assert tracker.advance([{"triggersSet": ["C", "End"]}]) == [3]
+    assert tracker.pending == {1, 2}
+    assert tracker.advance([{"triggersSet": ["A"]}]) == [1]
+    assert tracker.advance([{"triggersSet": ["B"]}]) == [2]
+    assert tracker.pending == {4}
+    assert not tracker.completed()
+    assert tracker.advance([{"triggersSet": ["End"]}]) == [4]
+    assert tracker.completed()
+    assert tracker.advance([{"triggersSet": ["Start"]}]) == []
+
+
+def test_one_save_completes_several_stages():
+    splits = [Split("triggersSet", "A"), Split("blinkUnlocked", "True", "g"), Split("triggersSet", "B", "g"),
+              Split("savedCharges", "{'saveID': 'Magnet-A', 'charge': 'Positive'}"), Split("triggersSet", "C")]
+    tracker = SplitTracker(splits)
+    new_events = [{"blinkUnlocked": "True"}, {"triggersSet": ["B", "A"]},
+                  {"savedCharges": [{"saveID": "Magnet-A", "charge": "Positive"}]}]
+    # Stops at the first stage the save does not complete
+    assert tracker.advance(new_events) == [0, 1, 2, 3]
+    assert tracker.pending == {4}
+    assert tracker.advance([{"triggersSet": ["C"]}]) == [4]
+    assert tracker.completed()
+
+
+def test_no_splits_are_completed_at_once():
+    tracker = SplitTracker([])
+    assert tracker.completed()
+    assert tracker.advance([{"triggersSet": ["A"]}]) == []
+
+
+def test_completed_run_is_logged(watcher, play):
+    watcher.load_splits([Split("triggersSet", "RunStart"), Split("triggersSet", "B", "group"),
+                         Split("triggersSet", "A", "group")])
+    versions = [generate_slot(0.1, random.Random(15))]
+    for seconds, triggers in ((5, ["RunStart"]), (10, ["A"]), (20, ["B"])):
+        slot = copy.deepcopy(versions[-1])
+        slot.dateModified += timedelta(seconds=seconds)
+        slot.timeSpent = time_spent_text(slot.playtime() + timedelta(seconds=seconds))
+        slot.triggersSet = slot.triggersSet + triggers
+        versions.append(slot)
+    play([[slot] for slot in versions])
+    lines = [line.split("] ", 1)[1] for line in watcher.activity_log[:] if line.startswith("[")]
+    assert [line for line in lines if line.startswith(("Split", "All"))] == [
+        "Split 'triggersSet: RunStart' Completed",
+        "Split 'triggersSet: A' Completed",
+        "Split 'triggersSet: B' Completed",
+        "All Splits Completed",
+    ]
+    assert watcher.split_tracker.completed()
@@ -0,0 +1,105 @@
+import random
+import threading
+from datetime import datetime, timedelta
+
+import numpy
+
+import Teslagrad2Data
+from Teslagrad2Generator import generate_slot, time_spent_text
+from TeslaTwoolsArchive import RunArchive
+from TeslaTwoolsSplits import Split
+from TeslaTwoolsStatistics import SplitStatistics, segment_times
+
+
+def test_segments_follow_completion_order():
+    # The last two splits are a group, completed in the other order in the first run
+    times = numpy.array([[10.0, 30.0, 20.0], [12.0, 20.0, 25.0], [10.0, 10.0, 20.0]])
+    assert segment_times(times).tolist() == [[10.0, 10.0, 10.0], [12.0, 8.0, 5.0], [10.0, 0.0, 10.0]]
+    statistics = SplitStatistics.from_times(times[:1])
+    assert statistics.add_run(times[1]) == [1, 2]
+    assert statistics.sum_of_best() == 10.0 + 8.0 + 5.0
+    assert statistics.best_run_secs == 25.0
+    assert all(len(row) == 8 for row in statistics.rows())
+
+
+def test_segments_match_archive(tmp_path):
+    archive = RunArchive(tmp_path / 'Runs.sqlite3')
+    try:
+        archive.start_run(None, 1)
+        # Splits as the watcher completes them: position 0, then 2, then 1
+        for position, secs in ((0, 10.0), (2, 20.0), (1, 30.0)):
+            archive.add_splits([(position, "triggersSet", f"T{position}", timedelta(seconds=secs))])
+        archive.complete_run(datetime(2023, 5, 20))
+        archive.close()
+        archive = RunArchive(tmp_path / 'Runs.sqlite3')
+        splits = [("triggersSet", f"T{position}") for position in range(3)]
+        statistics = SplitStatistics.from_times(archive.split_times(splits))
+        assert statistics.best_segments.tolist() == [best for _, _, _, best, _ in archive.best_segments()]
+    finally:
+        archive.close()
+
+
+def checkpoint(slot: Teslagrad2Data.SaveSlot, seconds: float, *triggers: str) -> Teslagrad2Data.SaveSlot:
+    following = Teslagrad2Data.SaveSlot(dict(vars(slot)))
+    following.dateModified = slot.dateModified + timedelta(seconds=seconds)
+    following.timeSpent = time_spent_text(slot.playtime() + timedelta(seconds=seconds))
+    following.triggersSet = slot.triggersSet + list(triggers)
+    return following
+
+
+def test_statistics_read_on_archive_thread(watcher, play, monkeypatch):
+    readers = list()
+    read_split_times = RunArchive.read_split_times
+    monkeypatch.setattr(RunArchive, "read_split_times", staticmethod(
+        lambda connection, splits: readers.append(threading.current_thread()) or read_split_times(connection, splits)))
+    splits = [Split("triggersSet", "RunStart"), Split("triggersSet", "B", "group"), Split("triggersSet", "A", "group")]
+    watcher.archive_open()
+    watcher.load_splits(splits)
+
+    # Two runs in two slots, completing the group in either order
+    rng = random.Random(25)
+    first = generate_slot(0.1, rng)
+    play([[first], [checkpoint(first, 5, "RunStart")], [checkpoint(first, 15, "RunStart", "A")],
+          [checkpoint(first, 30, "RunStart", "A", "B")]])
+    watcher.load_splits(splits)
+    second = generate_slot(0.1, rng)
+    done = checkpoint(first, 30, "RunStart", "A", "B")
+    generation = watcher.splits_generation
+    # The statistics of the first run are read ahead of the second run completing
+    while watcher.split_statistics is None or watcher.split_statistics[0] != generation:
+        threading.Event().wait(0.01)
+    play([[done, second], [done, checkpoint(second, 4, "RunStart")], [done, checkpoint(second, 10, "RunStart", "B")],
+          [done, checkpoint(second, 12, "RunStart", "B", "A")]])
+
+    assert readers and all(reader is watcher.run_archive for reader in readers)
+    statistics = watcher.split_statistics[1]
+    assert statistics.run_count == 2
+    assert (statistics.segments[:statistics.run_count] >= 0).all()
+    assert any("Sum of Best" in line for line in watcher.activity_log[:])
+
+
+def test_imported_run_segments_match_archive(watcher, play, tmp_path):
+    splits = [Split("triggersSet", "RunStart"), Split("triggersSet", "B", "group"), Split("triggersSet", "A", "group")]
+    watcher.save_run_enabled = True
+    watcher.archive_open()
+    watcher.load_splits(splits)
+    # A run completing its group in the other order, then a faster run that is never completed
+    rng = random.Random(24)
+    first = generate_slot(0.1, rng)
+    done = checkpoint(first, 30, "RunStart", "A", "B")
+    play([[], [first], [checkpoint(first, 5, "RunStart")], [checkpoint(first, 15, "RunStart", "A")], [done]])
+    watcher.load_splits(splits)
+    second = generate_slot(0.1, rng)
+    play([[done, second], [done, checkpoint(second, 2, "RunStart")], [done, checkpoint(second, 3, "RunStart", "A")]])
+    watcher.stop()
+
+    live = RunArchive(watcher.run_archive_path)
+    imported = RunArchive(tmp_path / 'Imported.sqlite3')
+    try:
+        assert imported.import_logs(tmp_path) == (1, 0)
+        assert live.best_segments() == imported.best_segments() == [
+            (0, "triggersSet", "RunStart", 5.0, 1), (1, "triggersSet", "B", 15.0, 1),
+            (2, "triggersSet", "A", 10.0, 1)]
+    finally:
+        live.close()
+        imported.close()
@@ -0,0 +1,78 @@
+import os
+import random
+
+from Teslagrad2Generator import generate_slot, next_checkpoint, save_file_text
+from TeslaTwoolsStatus import States
+
+
+def write_save(watcher, slots):
+    # Write the save file and give it a modified time of its own, whatever the file system's resolution
+    save_file_text(slots, watcher.tesla_2_path)
+    mtime_ns = max(os.stat(watcher.save_path).st_mtime_ns, watcher.prev_mtime + 1000000)
+    os.utime(watcher.save_path, ns=(mtime_ns, mtime_ns))
+
+
+def test_game_saves_after_an_edit_are_analyzed(watcher):
+    rng = random.Random(1)
+    slot = generate_slot(0.3, rng)
+    write_save(watcher, [slot])
+    watcher.watch()
+    assert watcher.state == States.SAVE_FILE_FOUND
+
+    # The Save Editor flags its own write, which clears the log and is not diffed
+    watcher.save_file_edited = True
+    slot = next_checkpoint(slot, rng)
+    write_save(watcher, [slot])
+    watcher.watch()
+    assert watcher.state == States.SAVE_FILE_EDITED
+    assert not watcher.save_file_edited
+
+    # Every game save after it is analyzed as usual
+    for _ in range(2):
+        slot = next_checkpoint(slot, rng)
+        write_save(watcher, [slot])
+        watcher.watch()
+        assert watcher.state == States.SAVE_SLOT_UPDATED
+        assert any(event.get("triggersSet") for event in watcher.new_events)
+
+
+def test_unsettled_read_publishes_nothing_new(watcher):
+    rng = random.Random(2)
+    slot = generate_slot(0.3, rng)
+    write_save(watcher, [slot])
+    watcher.watch()
+    slot = next_checkpoint(slot, rng)
+    write_save(watcher, [slot])
+    watcher.watch()
+    assert watcher.state == States.SAVE_SLOT_UPDATED
+
+    # The file vanished while the game was writing it
+    watcher.write_settler.settle = lambda notifier: None
+    write_save(watcher, [next_checkpoint(slot, rng)])
+    watcher.watch()
+    update = watcher.snapshot()
+    assert update.state == States.UNCHANGED
+    assert update.new_events == list()
+
+
+def test_identical_rewrite_is_not_parsed(watcher):
+    slot = generate_slot(0.3, random.Random(3))
+    write_save(watcher, [slot])
+    watcher.watch()
+    parsed = list()
+    analyze = watcher.save_analyzer.analyze
+    watcher.save_analyzer.analyze = lambda data: parsed.append(data) or analyze(data)
+
+    # The game saves again without anything having changed
+    for rewrite in range(1, 3):
+        write_save(watcher, [slot])
+        watcher.watch()
+        assert watcher.state == States.UNCHANGED
+        assert watcher.counters()["identical rewrites skipped"] == rewrite
+    assert parsed == list()
+
+    # The next save that changes something is parsed as usual
+    write_save(watcher, [next_checkpoint(slot, random.Random(4))])
+    watcher.watch()
+    assert watcher.state == States.SAVE_SLOT_UPDATED
+    assert len(parsed) == 1